@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+
+from mutagen.flac import FLAC, Picture
+from mutagen.id3 import ID3, PRIV
+
+from mutagentools.flac import convert_flac_to_id3
+
+import argparse
+import binascii
+import json
+import os
+import random
+import shutil
+
+import mutagentools.flac
+import mutagentools.id3
+
+BLANK_FLAC = os.path.join(os.path.dirname(mutagentools.flac.__file__), 'fixtures', 'blank.flac')
+NO_ID3 = os.path.join(os.path.dirname(mutagentools.id3.__file__), 'fixtures', 'no-id3.mp3')
+SAMPLE_TAGS = os.path.join(os.path.dirname(mutagentools.flac.__file__), 'fixtures', 'sample-flac-tags.json')
+
+FLAC_DIR = 'flac'
+MP3_DIR = 'mp3'
+
+PICTURE_MIMES = ('image/jpeg', 'image/png')
+
+
+FileSpec = namedtuple('FileSpec', ['tags', 'txxx', 'pictures', 'picture_size', 'cdtoc', 'private'])
+FileSpec.__doc__ = """
+The shape of one generated file: the number of sample tags, of custom tags which become TXXX frames, of pictures and
+their size in bytes, whether it has a CDTOC and the number of private Google tags in its MP3 counterpart.
+"""
+
+
+class Limits(namedtuple('Limits', ['tags', 'txxx', 'pictures', 'picture_size', 'cdtoc', 'private'])):
+    """The upper bounds each FileSpec is drawn within; cdtoc is the proportion of files with a CDTOC."""
+
+    def __new__(cls, tags=None, txxx=20, pictures=2, picture_size=256 * 1024, cdtoc=0.5, private=5):
+        return super(Limits, cls).__new__(cls, tags, txxx, pictures, picture_size, cdtoc, private)
+
+
+class Tags(object):
+    """A stand-in for a FLAC file with the given tags and pictures."""
+
+    def __init__(self, tags, pictures=()):
+        self.tags = tags
+        self.pictures = list(pictures)
+
+
+def load_sample_tags():
+    """Loads the sample Vorbis comments which generated tags are drawn from, as lists of values."""
+    with open(SAMPLE_TAGS) as f:
+        sample = json.load(f)
+
+    return { k: v if isinstance(v, list) else [v] for k, v in sample.items() }
+
+
+def random_bytes(rng, size):
+    """Returns size bytes from a random.Random, so that generated pictures are reproducible."""
+    if size == 0:
+        return b''
+
+    return binascii.unhexlify('{:0{}x}'.format(rng.getrandbits(size * 8), size * 2))
+
+
+def random_spec(rng, limits):
+    """Draws a FileSpec within the given Limits."""
+    return FileSpec(
+        tags=rng.randint(0, limits.tags),
+        txxx=rng.randint(0, limits.txxx),
+        pictures=rng.randint(0, limits.pictures),
+        picture_size=rng.randint(1, max(limits.picture_size, 1)),
+        cdtoc=rng.random() < limits.cdtoc,
+        private=rng.randint(0, limits.private),
+    )
+
+
+def random_cdtoc(rng):
+    """Returns a CDTOC of a disc with a random number of tracks, in the hex format written by dBpoweramp."""
+    count = rng.randint(1, 99)
+    addresses, address = [], 150
+
+    for _ in range(count + 1):
+        addresses.append(address)
+        address += rng.randint(5000, 50000)
+
+    return '+'.join('{:X}'.format(i) for i in [count] + addresses)
+
+
+def generate_tags(rng, sample, spec):
+    """Generates a dictionary of Vorbis comments shaped by a FileSpec, in random order."""
+    keys = sorted(k for k in sample.keys() if k != 'cdtoc')
+    subset = rng.sample(keys, min(spec.tags, len(keys)))
+    tags = { k: list(sample[k]) for k in subset }
+
+    for i in range(spec.txxx):
+        tags['custom {}'.format(i)] = ['value {}'.format(rng.randint(0, 1 << 16))]
+
+    if spec.cdtoc:
+        tags['cdtoc'] = [random_cdtoc(rng)]
+
+    items = list(tags.items())
+    rng.shuffle(items)
+
+    return dict(items)
+
+
+def generate_pictures(rng, spec):
+    """Generates the pictures of a FileSpec, of random types and sizes up to its picture size."""
+    result = []
+
+    for i in range(spec.pictures):
+        picture = Picture()
+        picture.type = rng.choice([0, 3, 4, 6])
+        picture.mime = rng.choice(PICTURE_MIMES)
+        picture.desc = u'Picture {}'.format(i)
+        picture.data = random_bytes(rng, rng.randint(1, spec.picture_size))
+        result.append(picture)
+
+    return result
+
+
+def write_flac(path, tags, pictures):
+    """Writes a FLAC file with the given tags and pictures."""
+    shutil.copy(BLANK_FLAC, path)
+
+    flac = FLAC(path)
+
+    for key, value in tags.items():
+        flac[key] = value
+
+    for picture in pictures:
+        flac.add_picture(picture)
+
+    flac.save()
+
+
+def write_mp3(path, frames, private=0):
+    """Writes an MP3 file with the given ID3 frames and a number of private Google tags."""
+    shutil.copy(NO_ID3, path)
+
+    id3 = ID3()
+
+    for frame in frames:
+        id3.add(frame)
+
+    for i in range(private):
+        id3.add(PRIV(owner=u'Google/Key{}'.format(i), data='{:032x}'.format(i).encode('ascii')))
+
+    id3.save(path)
+
+
+def generate_corpus(directory, count, seed=0, limits=None):
+    """
+    Generates count FLAC files under directory/flac, each with an MP3 counterpart at the same relative path under
+    directory/mp3, and returns their FileSpecs.
+
+    The MP3 files carry the tags converted from their FLAC file plus private tags, so the corpus can be used by every
+    function and command. Each file is generated from its own random seed derived from seed and its index, so the same
+    seed always produces the same corpus.
+    """
+    limits = limits or Limits()
+    sample = load_sample_tags()
+    limits = limits._replace(tags=len(sample) if limits.tags is None else limits.tags)
+    specs = []
+
+    for sub in (FLAC_DIR, MP3_DIR):
+        if not os.path.isdir(os.path.join(directory, sub)):
+            os.makedirs(os.path.join(directory, sub))
+
+    for index in range(count):
+        rng = random.Random('{}:{}'.format(seed, index))
+        spec = random_spec(rng, limits)
+        tags, pictures = generate_tags(rng, sample, spec), generate_pictures(rng, spec)
+        name = '{:06d}'.format(index)
+
+        write_flac(os.path.join(directory, FLAC_DIR, name + '.flac'), tags, pictures)
+        write_mp3(os.path.join(directory, MP3_DIR, name + '.mp3'), convert_flac_to_id3(Tags(tags, pictures)),
+            spec.private)
+
+        specs.append(spec)
+
+    return specs
+
+
+def corpus_files(directory, sub):
+    """Returns the sorted paths of the files in one half of a generated corpus."""
+    path = os.path.join(directory, sub)
+
+    return [os.path.join(path, f) for f in sorted(os.listdir(path))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates a deterministic corpus of tagged FLAC and MP3 files.")
+    parser.add_argument('-n', '--number', type=int, default=100, help="Number of files of each format to generate.")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for the corpus.")
+    parser.add_argument('--max-txxx', type=int, default=Limits().txxx, help="Maximum number of custom tags per file.")
+    parser.add_argument('--max-pictures', type=int, default=Limits().pictures,
+        help="Maximum number of pictures per file.")
+    parser.add_argument('--max-picture-size', type=int, default=Limits().picture_size,
+        help="Maximum size of each picture in bytes.")
+    parser.add_argument('--cdtoc', type=float, default=Limits().cdtoc, help="Proportion of files with a CDTOC.")
+    parser.add_argument('--max-private', type=int, default=Limits().private,
+        help="Maximum number of private Google tags per MP3 file.")
+    parser.add_argument('directory', help="Directory to generate the corpus in.")
+    args = parser.parse_args()
+
+    generate_corpus(args.directory, args.number, seed=args.seed, limits=Limits(txxx=args.max_txxx,
+        pictures=args.max_pictures, picture_size=args.max_picture_size, cdtoc=args.cdtoc, private=args.max_private))
+
+
+if __name__ == "__main__":
+    main()
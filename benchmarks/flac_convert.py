@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mutagen.id3 import APIC, Encoding
+
+from mutagentools.flac.convert import (
+    PART_OF_SET,
+    convert_flac_to_id3,
+    convert_generic_to_txxx,
+    convert_encoder_to_txxx,
+    convert_encoded_by_to_txxx,
+    convert_encoder_settings_to_txxx,
+    convert_disc_number_to_tpos,
+    convert_track_number_to_trck,
+    convert_genre_to_tcon,
+    convert_length_to_tlen,
+    convert_mbid_to_ufid,
+    convert_album_to_talb,
+    convert_organization_to_tpub,
+    convert_albumartist_to_tpe2,
+    convert_artist_to_tpe1,
+    convert_date_to_tdrc,
+    convert_title_to_tit2,
+    convert_composer_to_tcom,
+    convert_toc_to_mcdi,
+)
+from mutagentools.utils import contains_any, first, first_of_list, pop_keys
+
+from benchmarks.corpus import Limits, Tags, generate_tags, load_sample_tags, random_spec
+
+import argparse
+import random
+import timeit
+
+
+def legacy_convert_flac_to_id3(flac):
+    """The previous implementation of convert_flac_to_id3, a chain of key checks."""
+    result = []
+    tags = dict(flac.tags)
+
+    tags.pop('crc') if 'crc' in tags.keys() else None
+
+    if contains_any(tags.keys(), 'albumartist', 'album artist'):
+        result.append(convert_albumartist_to_tpe2(first(pop_keys(tags, 'albumartist', 'album artist'))))
+
+    if contains_any(tags.keys(), 'artist', 'author'):
+        result.append(convert_artist_to_tpe1(first(pop_keys(tags, 'artist', 'author'))))
+
+    if 'composer' in tags.keys():
+        result.append(convert_composer_to_tcom(tags.pop('composer')))
+
+    if 'album' in tags.keys():
+        result.append(convert_album_to_talb(tags.pop('album')))
+
+    if 'genre' in tags.keys():
+        result.append(convert_genre_to_tcon(tags.pop('genre'), tags.pop('style') if 'style' in tags.keys() else []))
+
+    if 'discnumber' in tags.keys():
+        result.append(convert_disc_number_to_tpos(first_of_list(tags.pop('discnumber')),
+            first_of_list(first(pop_keys(tags, 'totaldiscs', 'disctotal')))))
+
+    if contains_any(tags.keys(), 'date', 'year'):
+        result.append(convert_date_to_tdrc(first(pop_keys(tags, 'date', 'year'))))
+
+    if 'organization' in tags.keys():
+        result.append(convert_organization_to_tpub(tags.pop('organization')))
+
+    if 'cdtoc' in tags.keys():
+        result.append(convert_toc_to_mcdi(tags.pop('cdtoc')))
+
+    if 'mbid' in tags.keys():
+        result.append(convert_mbid_to_ufid(tags.pop('mbid')))
+
+    if 'title' in tags.keys():
+        result.append(convert_title_to_tit2(tags.pop('title')))
+
+    if 'tracknumber' in tags.keys():
+        tracknumber = first_of_list(tags.pop('tracknumber'))
+        totaltracks = first_of_list(first(pop_keys(tags, 'totaltracks', 'tracktotal')))
+
+        if PART_OF_SET.match(tracknumber):
+            tracknumber, totaltracks = PART_OF_SET.match(tracknumber).groups()
+
+        result.append(convert_track_number_to_trck(tracknumber, totaltracks))
+
+    if 'length' in tags.keys():
+        result.append(convert_length_to_tlen(tags.pop('length')))
+
+    if 'encoder' in tags.keys():
+        result.append(convert_encoder_to_txxx(tags.pop('encoder')))
+
+    if 'encoded by' in tags.keys():
+        result.append(convert_encoded_by_to_txxx(tags.pop('encoded by')))
+
+    if 'encoder settings' in tags.keys():
+        result.append(convert_encoder_settings_to_txxx(tags.pop('encoder settings')))
+
+    for tag in tags:
+        result.append(convert_generic_to_txxx(tag, tags.get(tag)))
+
+    for picture in flac.pictures:
+        result.append(APIC(encoding=Encoding.UTF8, type=picture.type, desc=picture.desc, mime=picture.mime,
+            data=bytes(picture.data)))
+
+    if not 'TPOS' in list(map(lambda t: t.FrameID, result)):
+        result.append(convert_disc_number_to_tpos('1', '1'))
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks convert_flac_to_id3 over a batch of tag sets.")
+    parser.add_argument('-n', '--number', type=int, default=2000, help="Number of tag sets to convert.")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for generating tag sets.")
+    args = parser.parse_args()
+
+    rng, sample = random.Random(args.seed), load_sample_tags()
+    limits = Limits(tags=len(sample), txxx=10, pictures=0)
+
+    batch = [Tags(generate_tags(rng, sample, random_spec(rng, limits))) for _ in range(args.number)]
+
+    for flac in batch:
+        if list(map(repr, legacy_convert_flac_to_id3(flac))) != list(map(repr, convert_flac_to_id3(flac))):
+            raise AssertionError("Output differs from the previous implementation for {!r}".format(flac.tags))
+
+    for name, case in (('legacy', legacy_convert_flac_to_id3), ('convert_flac_to_id3', convert_flac_to_id3)):
+        elapsed = min(timeit.repeat(lambda: [case(flac) for flac in batch], number=1, repeat=3))
+        print("{:<20} {:>10.3f} us/track".format(name, elapsed * 1000000 / args.number))
+
+
+if __name__ == "__main__":
+    main()
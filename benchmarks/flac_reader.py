@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mutagen.flac import FLAC, Picture
+
+from mutagentools.flac import read_metadata, to_json_dict
+
+import argparse
+import os
+import shutil
+import tempfile
+import timeit
+
+import mutagentools.flac
+
+BLANK_FLAC = os.path.join(os.path.dirname(mutagentools.flac.__file__), 'fixtures', 'blank.flac')
+
+
+def create_fixture(path, picture_count, picture_size):
+    """Creates a tagged FLAC file with the given number of pictures of the given size."""
+    shutil.copy(BLANK_FLAC, path)
+
+    f = FLAC(path)
+    f['album'] = 'Album'
+    f['artist'] = ['Artist 1', 'Artist 2']
+    f['title'] = 'Title'
+
+    for i in range(picture_count):
+        picture = Picture()
+        picture.type = 3
+        picture.mime = 'image/jpeg'
+        picture.desc = 'Picture {}'.format(i)
+        picture.data = os.urandom(picture_size)
+        f.add_picture(picture)
+
+    f.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the native FLAC metadata reader with mutagen's FLAC.")
+    parser.add_argument('-n', '--number', type=int, default=200, help="Number of reads per measurement.")
+    parser.add_argument('--pictures', type=int, default=2, help="Number of pictures in the fixture.")
+    parser.add_argument('--picture-size', type=int, default=5 * 1024 * 1024, help="Size of each picture in bytes.")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'fixture.flac')
+
+    try:
+        create_fixture(path, args.pictures, args.picture_size)
+
+        cases = [
+            ('mutagen', lambda: to_json_dict(FLAC(path))),
+            ('native', lambda: to_json_dict(read_metadata(path))),
+            ('mutagen (pictures)', lambda: to_json_dict(FLAC(path), include_pics=True)),
+            ('native (pictures)', lambda: to_json_dict(read_metadata(path, pictures=True), include_pics=True)),
+        ]
+
+        for name, case in cases:
+            elapsed = min(timeit.repeat(case, number=args.number, repeat=3))
+            print("{:<20} {:>10.3f} ms/file".format(name, elapsed * 1000 / args.number))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from base64 import b64encode
+
+from mutagen.id3 import (
+    ID3, APIC, COMM, PRIV, TIT2, TPE1, TXXX, Encoding, PictureType,
+    NumericTextFrame, TextFrame, UrlFrame, BinaryFrame, UFID,
+)
+from mutagen.id3._specs import (
+    BinaryDataSpec, ByteSpec, EncodedTextSpec, IntegerSpec, Latin1TextSpec, SizedIntegerSpec, StringSpec
+)
+
+from mutagentools.id3 import to_json_dict
+from mutagentools.utils import fold_text_keys
+
+import argparse
+import os
+import shutil
+import tempfile
+import timeit
+
+import mutagentools.id3
+
+NO_ID3 = os.path.join(os.path.dirname(mutagentools.id3.__file__), 'fixtures', 'no-id3.mp3')
+
+
+def create_fixture(path, frame_count):
+    """Creates an MP3 file with roughly frame_count TXXX, PRIV and COMM frames."""
+    shutil.copy(NO_ID3, path)
+
+    id3 = ID3()
+    id3.add(TIT2(encoding=Encoding.UTF8, text="Title"))
+    id3.add(TPE1(encoding=Encoding.UTF8, text=["Artist 1", "Artist 2"]))
+    id3.add(APIC(encoding=Encoding.UTF8, mime="image/jpeg", type=PictureType.COVER_FRONT, desc="Cover",
+        data=os.urandom(64 * 1024)))
+
+    for i in range(frame_count // 3):
+        id3.add(TXXX(encoding=Encoding.UTF8, desc="key {}".format(i), text="value {}".format(i)))
+        id3.add(PRIV(owner="Owner {}".format(i), data=os.urandom(32)))
+        id3.add(COMM(encoding=Encoding.UTF8, lang='eng', desc="comment {}".format(i), text="Comment {}".format(i)))
+
+    id3.save(path)
+
+
+def legacy_to_json_dict(id3, include_pics=False, flatten=False):
+    """The previous implementation of to_json_dict, which re-scans every frame once per frame id."""
+    result = {}
+
+    frame_names = set(map(lambda f: f.FrameID, id3.values()))
+
+    if not include_pics:
+        frame_names = set(filter(lambda f: f != 'APIC', frame_names))
+
+    for frame_name in frame_names:
+        frames = list(filter(lambda f: f.FrameID == frame_name, id3.values()))
+        values = result.get(frame_name, [])
+
+        if isinstance(frames[0], TXXX):
+            values = values if isinstance(values, dict) else {}
+            values.update({ f.desc: f.text for f in frames })
+        elif isinstance(frames[0], UFID):
+            values = values if isinstance(values, dict) else {}
+            values.update({ f.owner: f.data.decode('utf-8') for f in frames })
+        elif isinstance(frames[0], NumericTextFrame):
+            values += [int(text) for frame in frames for text in frame.text]
+        elif isinstance(frames[0], TextFrame):
+            values += [str(text) for frame in frames for text in frame.text]
+        elif isinstance(frames[0], UrlFrame):
+            values += [url for frame in frames for url in \
+                ([frame.url] if not isinstance(frame.url, (list, set)) else frame.url)]
+        elif isinstance(frames[0], BinaryFrame):
+            values += [b64encode(frame.data).decode('utf-8') for frame in frames]
+        elif isinstance(frames[0], APIC):
+            values += [{
+                'data': b64encode(frame.data).decode('utf-8'),
+                'desc': frame.desc,
+                'mime': frame.mime,
+                'type': int(frame.type),
+                'type_friendly': str(frame.type).split('.')[-1],
+            } for frame in frames]
+        else:
+            for frame in frames:
+                struct = {}
+
+                for fspec in frame._framespec:
+                    if isinstance(fspec, BinaryDataSpec):
+                        struct[fspec.name] = b64encode(getattr(frame,fspec.name))
+                    elif isinstance(fspec, (EncodedTextSpec, Latin1TextSpec, StringSpec)):
+                        struct[fspec.name] = getattr(frame,fspec.name)
+                    elif isinstance(fspec, (ByteSpec, IntegerSpec, SizedIntegerSpec)):
+                        struct[fspec.name] = int(getattr(frame, fspec.name))
+
+                values.append(struct)
+
+        result[frame_name] = values
+
+    if flatten:
+        fold_text_keys(result)
+        fold_text_keys(result.get('TXXX')) if 'TXXX' in result.keys() else None
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks id3.to_json_dict on a file with many frames.")
+    parser.add_argument('-n', '--number', type=int, default=20, help="Number of exports per measurement.")
+    parser.add_argument('--frames', type=int, default=1500, help="Approximate number of frames in the fixture.")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'fixture.mp3')
+
+    try:
+        create_fixture(path, args.frames)
+        id3 = ID3(path)
+
+        for include_pics in (False, True):
+            if legacy_to_json_dict(id3, include_pics=include_pics, flatten=True) != \
+                    to_json_dict(id3, include_pics=include_pics, flatten=True):
+                raise AssertionError("Output differs from the previous implementation")
+
+        print("{} frames".format(len(id3)))
+
+        for name, case in (('legacy', legacy_to_json_dict), ('to_json_dict', to_json_dict)):
+            elapsed = min(timeit.repeat(lambda: case(id3, flatten=True), number=args.number, repeat=3))
+            print("{:<20} {:>10.3f} ms/file".format(name, elapsed * 1000 / args.number))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
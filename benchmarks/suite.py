@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mutagen.flac import FLAC
+from mutagen.id3 import ID3
+
+from mutagentools.flac import convert_flac_to_id3
+from mutagentools.id3 import strip_private_tags
+from mutagentools.utils import fold_text_keys
+
+from benchmarks.corpus import FLAC_DIR, MP3_DIR, Limits, corpus_files, generate_corpus
+
+import argparse
+import copy
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import mutagen
+import mutagentools.flac
+import mutagentools.id3
+
+
+def measure(func, items, repeat=3, prepare=None):
+    """
+    Calls func on every item, repeat times, and returns the best and mean time of a pass in seconds.
+
+    If prepare is given, it is called before each pass to produce fresh items from the given ones, for functions which
+    modify their input; the time it takes isn't measured.
+    """
+    timings = []
+
+    for _ in range(repeat):
+        batch = prepare(items) if prepare else items
+        started = time.perf_counter()
+
+        for item in batch:
+            func(item)
+
+        timings.append(time.perf_counter() - started)
+
+    return min(timings), sum(timings) / len(timings)
+
+
+def cases(flacs, id3s):
+    """Returns (name, func, items, prepare) for every benchmarked function."""
+    json_dicts = [mutagentools.flac.to_json_dict(f) for f in flacs]
+
+    return [
+        ('flac.to_json_dict', lambda f: mutagentools.flac.to_json_dict(f, flatten=True), flacs, None),
+        ('flac.to_json_dict (pictures)', lambda f: mutagentools.flac.to_json_dict(f, include_pics=True), flacs, None),
+        ('convert_flac_to_id3', convert_flac_to_id3, flacs, None),
+        ('id3.to_json_dict', lambda i: mutagentools.id3.to_json_dict(i, flatten=True), id3s, None),
+        ('id3.to_json_dict (pictures)', lambda i: mutagentools.id3.to_json_dict(i, include_pics=True), id3s, None),
+        ('strip_private_tags', lambda i: strip_private_tags(i, save=False), id3s,
+            lambda items: [copy.deepcopy(i) for i in items]),
+        ('fold_text_keys', fold_text_keys, json_dicts, lambda items: [dict(d) for d in items]),
+    ]
+
+
+def environment():
+    """Describes the interpreter and libraries the benchmarks ran with."""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'mutagen': mutagen.version_string,
+        'platform': platform.platform(),
+    }
+
+
+def run(directory, repeat=3, only=None):
+    """Runs the benchmarks over the corpus in directory, returning a list of result dictionaries."""
+    flacs = [FLAC(path) for path in corpus_files(directory, FLAC_DIR)]
+    id3s = [ID3(path) for path in corpus_files(directory, MP3_DIR)]
+    results = []
+
+    for name, func, items, prepare in cases(flacs, id3s):
+        if only and not any(o in name for o in only):
+            continue
+
+        best, mean = measure(func, items, repeat=repeat, prepare=prepare)
+        results.append({
+            'name': name,
+            'calls': len(items),
+            'repeat': repeat,
+            'best': best,
+            'mean': mean,
+            'per_call_us': best * 1000000 / len(items) if items else 0.0,
+        })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the library's conversion and export functions over a "
+        "generated corpus of FLAC and MP3 files.")
+    parser.add_argument('-n', '--number', type=int, default=200, help="Number of files of each format to generate.")
+    parser.add_argument('-r', '--repeat', type=int, default=3, help="Number of passes over the corpus per benchmark.")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for the corpus.")
+    parser.add_argument('--max-txxx', type=int, default=Limits().txxx, help="Maximum number of custom tags per file.")
+    parser.add_argument('--max-pictures', type=int, default=Limits().pictures,
+        help="Maximum number of pictures per file.")
+    parser.add_argument('--max-picture-size', type=int, default=Limits().picture_size,
+        help="Maximum size of each picture in bytes.")
+    parser.add_argument('--corpus', metavar='DIR',
+        help="Use the corpus previously generated in DIR rather than generating a temporary one.")
+    parser.add_argument('-k', '--only', action='append', metavar='NAME',
+        help="Only run benchmarks whose name contains NAME. May be repeated.")
+    parser.add_argument('-o', '--output', metavar='FILE', help="Write the results as JSON to FILE, or - for stdout.")
+    args = parser.parse_args()
+
+    directory = args.corpus or tempfile.mkdtemp()
+    limits = Limits(txxx=args.max_txxx, pictures=args.max_pictures, picture_size=args.max_picture_size)
+
+    try:
+        if not args.corpus:
+            generate_corpus(directory, args.number, seed=args.seed, limits=limits)
+
+        results = run(directory, repeat=args.repeat, only=args.only)
+    finally:
+        if not args.corpus:
+            shutil.rmtree(directory)
+
+    report = {
+        'environment': environment(),
+        'corpus': {'directory': args.corpus, 'number': None if args.corpus else args.number, 'seed': args.seed,
+            'limits': limits._asdict()},
+        'results': results,
+    }
+
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+        return
+
+    for result in results:
+        print("{:<30} {:>12.3f} us/call".format(result['name'], result['per_call_us']))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from benchmarks.corpus import FLAC_DIR, MP3_DIR, Limits, corpus_files, generate_corpus
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import mutagentools
+
+SETUP_PY = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), 'setup.py')
+CONSOLE_SCRIPT = re.compile(r'''['"]\s*([\w-]+)\s*=\s*([\w.]+):main\s*['"]''')
+
+# the arguments each console script is benchmarked with; {flac_dir} and {mp3_dir} are replaced by the corpus
+# directories, {flac_files} and {mp3_files} by every file in them and {index} by a file next to them
+COMMANDS = {
+    'flac2id3': ['--tree', '{flac_dir}', '{mp3_dir}'],
+    'flacclear': ['{flac_files}'],
+    'flacjson': ['--ndjson', '{flac_files}'],
+    'id3clean': ['{mp3_files}'],
+    'id3clear': ['{mp3_files}'],
+    'id3json': ['--ndjson', '{mp3_files}'],
+    'id3pad': ['{mp3_files}'],
+    'tagindex': ['scan', '{index}', '{flac_dir}', '{mp3_dir}'],
+    'tagexport': ['-c', 'TALB|album,TPE1|artist,TIT2|title,TRCK|tracknumber', '{flac_dir}', '{mp3_dir}'],
+    'mutagentools': ['pipeline', '--tree', '{flac_dir}', '{mp3_dir}'],
+}
+
+# the corpus directories whose files each command processes, which its files per second are counted from; the tree
+# syncs process a FLAC file and its MP3 counterpart as one pair
+PROCESSED = {
+    'flac2id3': [FLAC_DIR],
+    'flacclear': [FLAC_DIR],
+    'flacjson': [FLAC_DIR],
+    'id3clean': [MP3_DIR],
+    'id3clear': [MP3_DIR],
+    'id3json': [MP3_DIR],
+    'id3pad': [MP3_DIR],
+    'tagindex': [FLAC_DIR, MP3_DIR],
+    'tagexport': [FLAC_DIR, MP3_DIR],
+    'mutagentools': [FLAC_DIR],
+}
+
+# runs a command's main function, then reports its peak RSS and the bytes it wrote, including those of the child
+# processes it has reaped, as JSON to the file named by the first argument
+BOOTSTRAP = """
+import atexit, importlib, json, resource, sys
+
+def report(path=sys.argv[1]):
+    usage = [resource.getrusage(w).ru_maxrss for w in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    try:
+        with open('/proc/self/io') as f:
+            written = int(dict(l.split(': ') for l in f.read().splitlines())['wchar'])
+    except (IOError, KeyError, ValueError):
+        written = None
+    with open(path, 'w') as f:
+        json.dump({'peak_rss_kb': max(usage), 'bytes_written': written}, f)
+
+atexit.register(report)
+sys.exit(importlib.import_module(sys.argv[2]).main(sys.argv[3:]))
+"""
+
+# for each metric, whether a larger value is better
+METRICS = {
+    'files_per_sec': True,
+    'peak_rss_kb': False,
+    'bytes_written': False,
+}
+
+
+def console_scripts(setup_py=SETUP_PY):
+    """Returns (name, module) for every console script declared in setup.py, in the order declared."""
+    with open(setup_py) as f:
+        return CONSOLE_SCRIPT.findall(f.read())
+
+
+def expand(arguments, directory):
+    """Replaces the placeholders in a command's arguments with the paths of a corpus."""
+    values = {
+        '{flac_dir}': [os.path.join(directory, FLAC_DIR)],
+        '{mp3_dir}': [os.path.join(directory, MP3_DIR)],
+        '{flac_files}': corpus_files(directory, FLAC_DIR),
+        '{mp3_files}': corpus_files(directory, MP3_DIR),
+        '{index}': [os.path.join(directory, 'index.db')],
+    }
+
+    return [value for argument in arguments for value in values.get(argument, [argument])]
+
+
+def run_command(module, arguments, files):
+    """Runs a command's main function in a new interpreter, returning its measurements."""
+    fd, report = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.path.dirname(os.path.dirname(mutagentools.__file__)),
+        env.get('PYTHONPATH')]))
+
+    try:
+        started = time.time()
+
+        with open(os.devnull, 'w') as devnull:
+            returncode = subprocess.call([sys.executable, '-c', BOOTSTRAP, report, module] + arguments, env=env,
+                stdout=devnull)
+
+        elapsed = time.time() - started
+
+        with open(report) as f:
+            result = json.load(f) if os.path.getsize(report) else {'peak_rss_kb': None, 'bytes_written': None}
+    finally:
+        os.unlink(report)
+
+    result.update({
+        'returncode': returncode,
+        'files': files,
+        'wall_time': elapsed,
+        'files_per_sec': files / elapsed if elapsed > 0 else 0.0,
+    })
+
+    return result
+
+
+def run(corpus, only=None):
+    """Runs every console script over a fresh copy of the corpus, returning a dictionary of results by name."""
+    results = {}
+
+    for name, module in console_scripts():
+        if only and name not in only:
+            continue
+
+        if name not in COMMANDS:
+            sys.stderr.write("No benchmark arguments for {}, skipping.\n".format(name))
+            continue
+
+        directory = tempfile.mkdtemp()
+
+        try:
+            copy = os.path.join(directory, 'corpus')
+            shutil.copytree(corpus, copy)
+
+            files = sum(len(corpus_files(copy, tree)) for tree in PROCESSED[name])
+            results[name] = run_command(module, expand(COMMANDS[name], copy), files)
+        finally:
+            shutil.rmtree(directory)
+
+    return results
+
+
+def format_metric(value, spec):
+    """Formats a measurement with a format spec, or as - if it couldn't be taken on this platform."""
+    return '-' if value is None else format(value, spec)
+
+
+def compare(results, baseline, threshold):
+    """Returns a message for every metric which is more than threshold, a fraction, worse than in the baseline."""
+    regressions = []
+
+    for name in sorted(results):
+        for metric, higher_is_better in sorted(METRICS.items()):
+            value, expected = results[name].get(metric), baseline.get(name, {}).get(metric)
+
+            if value is None or not expected:
+                continue
+
+            change = (value - expected) / float(expected)
+
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append("{} {}: {:.1f} against a baseline of {:.1f} ({:+.1%})".format(name, metric, value,
+                    expected, change))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures the throughput of every console script over a generated "
+        "corpus, optionally failing if it regressed against a baseline.")
+    parser.add_argument('-n', '--number', type=int, default=2000, help="Number of files of each format to generate.")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for the corpus.")
+    parser.add_argument('--max-pictures', type=int, default=1, help="Maximum number of pictures per file.")
+    parser.add_argument('--max-picture-size', type=int, default=64 * 1024,
+        help="Maximum size of each picture in bytes.")
+    parser.add_argument('--corpus', metavar='DIR',
+        help="Use the corpus previously generated in DIR rather than generating a temporary one.")
+    parser.add_argument('-k', '--only', action='append', metavar='COMMAND',
+        help="Only benchmark this command. May be repeated.")
+    parser.add_argument('-o', '--output', metavar='FILE', help="Write the results as JSON to FILE.")
+    parser.add_argument('-b', '--baseline', metavar='FILE', help="Compare the results with those saved in FILE.")
+    parser.add_argument('-t', '--threshold', type=float, default=0.2,
+        help="Fail if any metric is worse than the baseline by more than this fraction (default: 0.2).")
+    args = parser.parse_args()
+
+    directory = args.corpus or tempfile.mkdtemp()
+
+    try:
+        if not args.corpus:
+            generate_corpus(directory, args.number, seed=args.seed, limits=Limits(pictures=args.max_pictures,
+                picture_size=args.max_picture_size))
+
+        results = run(directory, only=args.only)
+    finally:
+        if not args.corpus:
+            shutil.rmtree(directory)
+
+    failed = [name for name in sorted(results) if results[name]['returncode'] != 0]
+
+    for name in sorted(results):
+        result = results[name]
+        print("{:<12} {:>10} files/sec {:>8}s {:>10} KB peak RSS {:>14} bytes written{}".format(name,
+            format_metric(result['files_per_sec'], '.1f'), format_metric(result['wall_time'], '.2f'),
+            format_metric(result['peak_rss_kb'], ''), format_metric(result['bytes_written'], ''),
+            " (exit status {})".format(result['returncode']) if name in failed else ""))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    regressions = []
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+        for regression in regressions:
+            sys.stderr.write("Regression in {}\n".format(regression))
+
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
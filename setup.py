@@ -11,6 +11,7 @@ setup(
     author = "Naftuli Kay",
     author_email = "me@naftuli.wtf",
     url = "https://github.com/naftulikay/mutagen-tools",
+    python_requires = '>=3.6',
     install_requires = [
         'setuptools',
         'six',
@@ -25,6 +26,10 @@ setup(
             'id3clean = mutagentools.cli.id3clean:main',
             'id3clear = mutagentools.cli.id3clear:main',
             'id3json = mutagentools.cli.id3json:main',
+            'id3pad = mutagentools.cli.id3pad:main',
+            'tagindex = mutagentools.cli.tagindex:main',
+            'tagexport = mutagentools.cli.tagexport:main',
+            'mutagentools = mutagentools.cli:main',
         ]
     }
 )
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+
+import os
+import shutil
+import tempfile
+import threading
+
+from mutagentools.profiling import phase
+
+
+# the default number of files whose writes are made durable together
+DEFAULT_BATCH_SIZE = 64
+
+# the files staged by the call in progress in each thread, or None when writes go straight to the files
+_local = threading.local()
+
+
+StagedResult = namedtuple('StagedResult', ['value', 'staged'])
+StagedResult.__doc__ = """
+The return value of a call made with atomic writes along with the (temporary file, file) pairs it staged, to be
+committed by the AtomicWriter.
+"""
+
+
+def temporary_copy(filename):
+    """
+    Copies a file into a new hidden temporary file in the same directory, so that it can be renamed over the original,
+    and returns its name. The copy keeps the original's mode and, where permitted, its owner.
+    """
+    directory, basename = os.path.split(os.path.abspath(filename))
+    fd, temporary = tempfile.mkstemp(prefix='.{}.'.format(basename), suffix='.tmp', dir=directory)
+
+    try:
+        with os.fdopen(fd, 'wb') as dest, open(filename, 'rb') as src:
+            shutil.copyfileobj(src, dest, 1024 * 1024)
+
+        stat = os.stat(filename)
+        os.chmod(temporary, stat.st_mode & 0o7777)
+
+        try:
+            os.chown(temporary, stat.st_uid, stat.st_gid)
+        except (AttributeError, OSError):
+            pass
+    except Exception:
+        os.unlink(temporary)
+        raise
+
+    return temporary
+
+
+def save_file(filename, save):
+    """
+    Calls save with the name of the file it should save to, returning what it returns.
+
+    Usually that is filename itself. While a call wrapped by an AtomicWriter is in progress in this thread, it is
+    instead a temporary copy of it, which the writer renames over filename once the copy is durable. Symbolic links
+    are resolved first, so that the file they point to is replaced rather than the link.
+    """
+    staged = getattr(_local, 'staged', None)
+
+    if staged is None:
+        return save(filename)
+
+    filename = os.path.realpath(filename)
+
+    with phase('copy'):
+        temporary = temporary_copy(filename)
+
+    try:
+        result = save(temporary)
+    except Exception:
+        os.unlink(temporary)
+        raise
+
+    staged.append((temporary, filename))
+
+    return result
+
+
+def discard(staged):
+    """Removes the temporary files of staged (temporary file, file) pairs, ignoring any already gone."""
+    for temporary, filename in staged:
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass
+
+
+def fsync_path(path):
+    """Flushes a file, or a directory's entries, to disk."""
+    fd = os.open(path, os.O_RDONLY)
+
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class Staged(object):
+    """
+    Wraps a function of one file so that the files it saves through save_file are written to temporary copies, and
+    calling it returns a StagedResult.
+
+    Instances are picklable as long as the function is, so can be used with process pools.
+    """
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, item):
+        previous, _local.staged = getattr(_local, 'staged', None), []
+
+        try:
+            try:
+                return StagedResult(self.func(item), _local.staged)
+            except Exception:
+                discard(_local.staged)
+                raise
+        finally:
+            _local.staged = previous
+
+
+class AtomicWriter(object):
+    """
+    Makes the files saved by a batch command replace the originals atomically, so that a crash leaves every file
+    either as it was or as it was saved, never partly written.
+
+    Each file is saved to a temporary copy in its own directory. The copies of batch_size files at a time are flushed
+    to disk, renamed over the originals and then the directories they are in are flushed too, so that a large batch
+    pays for a few flushes per batch rather than several per file. Should the command crash before a batch is
+    committed, only its temporary files are left behind.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+
+    def wrap(self, func):
+        """Wraps a function of one file so that calling it returns a StagedResult to pass to commit."""
+        return Staged(func)
+
+    def call(self, func, item):
+        """Calls a function of one file, committing the files it saves straight away, and returns its value."""
+        result = self.wrap(func)(item)
+        errors = self.commit([result.staged])
+
+        if errors:
+            raise errors[0]
+
+        return result.value
+
+    def commit(self, batch):
+        """
+        Commits a batch of files, given as the list of (temporary file, file) pairs staged by each call.
+
+        Returns the exception each call's files failed to be committed with, by index into the batch. Those of a failed
+        call's files which weren't yet renamed are left as they were. Should a directory fail to be flushed, the calls
+        whose files were renamed into it fail too, as their renames may not survive a crash.
+        """
+        errors, directories = {}, {}
+
+        with phase('sync'):
+            # flush every copy before any is renamed, so that no rename can be persisted ahead of its file's data
+            for index, staged in enumerate(batch):
+                for temporary, filename in staged:
+                    try:
+                        fsync_path(temporary)
+                    except Exception as e:
+                        errors.setdefault(index, e)
+
+            for index, staged in enumerate(batch):
+                if index in errors:
+                    discard(staged)
+                    continue
+
+                for position, (temporary, filename) in enumerate(staged):
+                    try:
+                        os.replace(temporary, filename)
+                        directories.setdefault(os.path.dirname(os.path.abspath(filename)), []).append(index)
+                    except Exception as e:
+                        errors[index] = e
+                        discard(staged[position:])
+                        break
+
+            for directory in sorted(directories):
+                try:
+                    fsync_path(directory)
+                except Exception as e:
+                    for index in directories[directory]:
+                        errors.setdefault(index, e)
+
+        return errors
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mutagentools.atomic import AtomicWriter, fsync_path, save_file
+from mutagentools.cli.batch import run_batch
+
+import errno
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from mock import patch
+
+
+def append_to(filename):
+    """Appends a line to a file through save_file, failing for files named bad."""
+    def save(target):
+        with open(target, 'a') as f:
+            f.write('saved\n')
+
+        if os.path.basename(filename) == 'bad':
+            raise ValueError("bad file")
+
+        return target
+
+    return save_file(filename, save)
+
+
+class AtomicWriterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.files = []
+
+        for name in ('a', 'b', 'bad', 'c'):
+            self.files.append(os.path.join(self.directory, name))
+
+            with open(self.files[-1], 'w') as f:
+                f.write('original\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self, filename):
+        with open(filename) as f:
+            return f.read()
+
+    def test_save_file(self):
+        """Tests that files are saved directly unless a call is wrapped by a writer."""
+        self.assertEqual(self.files[0], append_to(self.files[0]))
+        self.assertEqual('original\nsaved\n', self.read(self.files[0]))
+
+    def test_call(self):
+        """Tests that a wrapped call saves a temporary copy which replaces the file, keeping its mode."""
+        os.chmod(self.files[0], 0o640)
+
+        target = AtomicWriter().call(append_to, self.files[0])
+
+        self.assertNotEqual(self.files[0], target)
+        self.assertEqual(os.path.dirname(self.files[0]), os.path.dirname(target))
+        self.assertFalse(os.path.exists(target))
+        self.assertEqual('original\nsaved\n', self.read(self.files[0]))
+        self.assertEqual(0o640, stat.S_IMODE(os.stat(self.files[0]).st_mode))
+
+    def test_symlink(self):
+        """Tests that a symbolic link is kept as a link, and the file it points to is replaced."""
+        link = os.path.join(self.directory, 'link')
+        os.symlink(self.files[0], link)
+
+        target = AtomicWriter().call(append_to, link)
+
+        self.assertEqual(os.path.dirname(self.files[0]), os.path.dirname(target))
+        self.assertTrue(os.path.islink(link))
+        self.assertEqual(self.files[0], os.readlink(link))
+        self.assertEqual('original\nsaved\n', self.read(self.files[0]))
+
+    def test_failure(self):
+        """Tests that a failed call leaves the file untouched and no temporary file behind."""
+        with self.assertRaises(ValueError):
+            AtomicWriter().call(append_to, self.files[2])
+
+        self.assertEqual('original\n', self.read(self.files[2]))
+        self.assertEqual(['a', 'b', 'bad', 'c'], sorted(os.listdir(self.directory)))
+
+    def test_run_batch(self):
+        """Tests that a batch commits its files in groups, flushing each file and then the directory once a group."""
+        with patch('os.fsync', wraps=os.fsync) as mock_fsync:
+            results = list(run_batch(append_to, self.files, jobs=2, writer=AtomicWriter(batch_size=2)))
+
+        self.assertEqual(self.files, [result.item for result in results])
+        self.assertEqual([None, None, "ValueError: bad file", None], [result.error for result in results])
+        self.assertEqual(['original\nsaved\n', 'original\nsaved\n', 'original\n', 'original\nsaved\n'],
+            [self.read(filename) for filename in self.files])
+        self.assertEqual(['a', 'b', 'bad', 'c'], sorted(os.listdir(self.directory)))
+
+        # three files, and the directory once for each of the two batches
+        self.assertEqual(5, mock_fsync.call_count)
+
+    def test_commit_failure(self):
+        """Tests that a file which can't be renamed is reported as failed without affecting the rest of its batch."""
+        real_replace = os.replace
+
+        def replace(src, dst):
+            if dst == self.files[1]:
+                raise OSError("read-only")
+
+            return real_replace(src, dst)
+
+        with patch('os.replace', side_effect=replace):
+            results = list(run_batch(append_to, self.files[:2], writer=AtomicWriter(batch_size=10)))
+
+        self.assertEqual([None, "OSError: read-only"], [result.error for result in results])
+        self.assertEqual(['original\nsaved\n', 'original\n'], [self.read(filename) for filename in self.files[:2]])
+        self.assertEqual(['a', 'b', 'bad', 'c'], sorted(os.listdir(self.directory)))
+
+    def test_directory_sync_failure(self):
+        """Tests that a directory which can't be flushed fails the calls renamed into it, and the batch is returned."""
+        other = tempfile.mkdtemp(dir=self.directory)
+        files = [self.files[0], os.path.join(other, 'd')]
+
+        with open(files[1], 'w') as f:
+            f.write('original\n')
+
+        real_fsync_path = fsync_path
+
+        def sync(path):
+            if path == self.directory:
+                raise OSError(errno.EIO, "Input/output error")
+
+            return real_fsync_path(path)
+
+        with patch('mutagentools.atomic.fsync_path', side_effect=sync):
+            results = list(run_batch(append_to, files, writer=AtomicWriter(batch_size=10)))
+
+        self.assertEqual(["OSError: [Errno 5] Input/output error", None], [result.error for result in results])
+        # the renames happened, but can't be relied on to survive a crash
+        self.assertEqual(['original\nsaved\n', 'original\nsaved\n'], [self.read(filename) for filename in files])
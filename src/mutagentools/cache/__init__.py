@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mutagentools.jsonstream import json_stream_default
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+
+# the default most the compressed entries of a cache may take up, in bytes
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+# how long to wait for another process writing to the cache, in seconds
+TIMEOUT = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS total (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO total (id, size) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE total SET size = size + NEW.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE total SET size = size - OLD.size WHERE id = 0;
+END;
+"""
+
+# the connection of this process to each cache file, shared by every ExportCache of it, with a lock for each
+_connections = {}
+_connections_lock = threading.Lock()
+
+
+def cache_key(stat, options):
+    """Returns the key of a file's entry from its stat result and the options its tags were rendered with."""
+    return '{}:{}:{}:{}:{}'.format(stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns,
+        json.dumps(options, sort_keys=True))
+
+
+class ExportCache(object):
+    """
+    An on-disk cache of the tags of files as rendered by to_json_dict, compressed with zlib.
+
+    Entries are keyed by the device, inode, size and modification time of a file along with the options its tags were
+    rendered with, so a file which changed is simply missed and its stale entry eventually evicted. When the entries
+    take up more than max_size bytes, the least recently used ones are evicted.
+
+    A cache can be shared by any number of threads and processes: it uses SQLite in write-ahead logging mode, so that
+    readers don't block each other, and every change is its own transaction. Instances can be pickled to be used in
+    worker processes, each of which opens one connection to the file however many instances it unpickles.
+    """
+
+    def __init__(self, filename, max_size=DEFAULT_MAX_SIZE):
+        self.filename = filename
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        # create the schema up front, so that workers never race to, and shrink the cache if it's now too big
+        self.evict()
+
+    def __getstate__(self):
+        return {'filename': self.filename, 'max_size': self.max_size, 'hits': 0, 'misses': 0}
+
+    def _connect(self):
+        """Returns this process's connection to the cache file and the lock serializing its use by threads."""
+        key = (os.getpid(), os.path.abspath(self.filename))
+
+        with _connections_lock:
+            if key not in _connections:
+                connection = sqlite3.connect(self.filename, timeout=TIMEOUT, isolation_level=None,
+                    check_same_thread=False)
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+                connection.executescript(SCHEMA)
+
+                _connections[key] = connection, threading.Lock()
+
+            return _connections[key]
+
+    def get(self, key):
+        """Returns the value cached under a key, marking it as recently used, or None if there isn't one."""
+        connection, lock = self._connect()
+
+        with lock:
+            row = connection.execute("SELECT data FROM entries WHERE key = ?", (key,)).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            connection.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+
+        return json.loads(zlib.decompress(row[0]).decode('utf-8'))
+
+    def put(self, key, path, value):
+        """Caches a JSON-compatible value under a key, evicting the least recently used entries if need be."""
+        data = zlib.compress(json.dumps(value, sort_keys=True, default=json_stream_default).encode('utf-8'))
+
+        if len(data) > self.max_size:
+            return
+
+        connection, lock = self._connect()
+
+        with lock:
+            connection.execute("BEGIN IMMEDIATE")
+
+            try:
+                connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                connection.execute("INSERT INTO entries (key, path, size, accessed, data) VALUES (?, ?, ?, ?, ?)",
+                    (key, path, len(data), time.time(), sqlite3.Binary(data)))
+                self._evict(connection)
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    def evict(self):
+        """Evicts the least recently used entries until the cache takes up no more than max_size bytes."""
+        connection, lock = self._connect()
+
+        with lock:
+            connection.execute("BEGIN IMMEDIATE")
+
+            try:
+                self._evict(connection)
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    def _evict(self, connection):
+        excess = connection.execute("SELECT size FROM total WHERE id = 0").fetchone()[0] - self.max_size
+
+        if excess <= 0:
+            return
+
+        keys = []
+
+        for key, size in connection.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            keys.append((key,))
+            excess -= size
+
+            if excess <= 0:
+                break
+
+        connection.executemany("DELETE FROM entries WHERE key = ?", keys)
+
+    def cached(self, path, options, render):
+        """
+        Returns a file's tags from the cache if it is unchanged since they were cached with the same options.
+
+        Otherwise calls render to render them and caches the result, which is returned as render returned it.
+        """
+        key = cache_key(os.stat(path), options)
+        value = self.get(key)
+
+        if value is None:
+            value = render()
+            self.put(key, path, value)
+
+        return value
+
+    def size(self):
+        """Returns the total size of the compressed entries, in bytes."""
+        connection, lock = self._connect()
+
+        with lock:
+            return connection.execute("SELECT size FROM total WHERE id = 0").fetchone()[0]
+
+    def __len__(self):
+        connection, lock = self._connect()
+
+        with lock:
+            return connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        """Closes this process's connection to the cache file."""
+        with _connections_lock:
+            connection, lock = _connections.pop((os.getpid(), os.path.abspath(self.filename)), (None, None))
+
+        if connection is not None:
+            with lock:
+                connection.close()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from mutagentools.cache import ExportCache, cache_key
+from mutagentools.jsonstream import Base64Data
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+
+def render_cached(args):
+    """Renders a value through a cache, returning whether it had to be rendered."""
+    cache, path = args
+    rendered = []
+
+    value = cache.cached(path, ['test'], lambda: rendered.append(True) or {'path': path})
+    assert value == {'path': path}
+
+    return bool(rendered)
+
+
+class ExportCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'cache.db')
+        self.path = os.path.join(self.directory, 'track.mp3')
+
+        with open(self.path, 'wb') as f:
+            f.write(b'audio')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_cached(self):
+        """Tests that values are rendered once per file and options, and again once the file changes."""
+        cache = ExportCache(self.filename)
+        calls = []
+
+        def render():
+            calls.append(True)
+            return {'TIT2': u'Title', 'APIC': [{'data': Base64Data(b'picture')}]}
+
+        try:
+            self.assertEqual(render(), cache.cached(self.path, ['id3', True], render))
+            self.assertEqual({'TIT2': u'Title', 'APIC': [{'data': u'cGljdHVyZQ=='}]}, cache.cached(self.path,
+                ['id3', True], render))
+            self.assertEqual(2, len(calls))
+
+            cache.cached(self.path, ['id3', False], render)
+            self.assertEqual(3, len(calls))
+
+            stat = os.stat(self.path)
+            os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+            cache.cached(self.path, ['id3', True], render)
+            self.assertEqual(4, len(calls))
+
+            self.assertEqual((1, 3), (cache.hits, cache.misses))
+        finally:
+            cache.close()
+
+        # entries survive reopening
+        cache = ExportCache(self.filename)
+
+        try:
+            self.assertIsNotNone(cache.get(cache_key(os.stat(self.path), ['id3', True])))
+        finally:
+            cache.close()
+
+    def test_eviction(self):
+        """Tests that the least recently used entries are evicted once the cache is too big."""
+        cache = ExportCache(self.filename, max_size=2500)
+
+        try:
+            for key in ('a', 'b', 'c'):
+                cache.put(key, key, {'data': Base64Data(os.urandom(700))})
+
+            self.assertEqual(3, len(cache))
+            self.assertIsNotNone(cache.get('a'))
+
+            cache.put('d', 'd', {'data': Base64Data(os.urandom(700))})
+
+            self.assertEqual(3, len(cache))
+            self.assertIsNone(cache.get('b'))
+            self.assertIsNotNone(cache.get('a'))
+            self.assertLessEqual(cache.size(), 2500)
+
+            # too big to cache at all
+            cache.put('e', 'e', {'data': Base64Data(os.urandom(5000))})
+            self.assertIsNone(cache.get('e'))
+        finally:
+            cache.close()
+
+        # shrinking the cache evicts straight away
+        cache = ExportCache(self.filename, max_size=1000)
+
+        try:
+            self.assertEqual(1, len(cache))
+        finally:
+            cache.close()
+
+    def test_concurrent(self):
+        """Tests that a cache can be shared by threads and, pickled, by processes."""
+        paths = []
+
+        for n in range(20):
+            paths.append(os.path.join(self.directory, '{}.mp3'.format(n)))
+
+            with open(paths[-1], 'wb') as f:
+                f.write(b'audio')
+
+        cache = ExportCache(self.filename)
+
+        try:
+            self.assertEqual(cache.filename, pickle.loads(pickle.dumps(cache)).filename)
+
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                self.assertEqual([True] * 10, list(executor.map(render_cached, [(cache, p) for p in paths[:10]])))
+
+            with ProcessPoolExecutor(max_workers=3) as executor:
+                self.assertEqual([False] * 10 + [True] * 10, list(executor.map(render_cached,
+                    [(cache, p) for p in paths])))
+
+            self.assertEqual(20, len(cache))
+        finally:
+            cache.close()
@@ -1,13 +1,45 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from mutagentools.cli import (
+from collections import OrderedDict
+
+import argparse
+import importlib
+import sys
+
+
+# subcommands of the mutagentools command, the modules whose main function implements them and their help; modules
+# are only imported when their subcommand is run, so that starting any command doesn't pay for importing them all
+COMMANDS = OrderedDict([
     # flac tools
-    flac2id3,
-    flacclear,
-    flacjson,
+    ('flac2id3', ('mutagentools.cli.flac2id3', "Convert FLAC tags into ID3 tags on MP3 files.")),
+    ('flacclear', ('mutagentools.cli.flacclear', "Remove all tags and pictures from FLAC files.")),
+    ('flacjson', ('mutagentools.cli.flacjson', "Export FLAC tags as JSON.")),
     # id3 tools
-    id3clean,
-    id3clear,
-    id3json,
-)
+    ('id3clean', ('mutagentools.cli.id3clean', "Remove private identifying tags from MP3 files.")),
+    ('id3clear', ('mutagentools.cli.id3clear', "Remove all ID3 tags from MP3 files.")),
+    ('id3json', ('mutagentools.cli.id3json', "Export ID3 tags as JSON.")),
+    ('id3pad', ('mutagentools.cli.id3pad', "Resize the padding of ID3 tags.")),
+    # library tools
+    ('tagindex', ('mutagentools.cli.tagindex', "Index the tags of a music library in SQLite and query them.")),
+    ('tagexport', ('mutagentools.cli.tagexport', "Export chosen tags of a music library as a CSV or TSV table.")),
+    ('pipeline', ('mutagentools.cli.pipeline', "Run MP3 files through several stages, saving each at most once.")),
+    # daemon
+    ('serve', ('mutagentools.cli.serve', "Answer tag requests over a Unix socket from a warm interpreter.")),
+    ('client', ('mutagentools.cli.client', "Send requests to a running server, printing what the tool would.")),
+])
+
+
+def main(args=sys.argv[1:]):
+    parser = argparse.ArgumentParser(prog='mutagentools', description="Runs a mutagentools subcommand.",
+        formatter_class=argparse.RawDescriptionHelpFormatter, epilog="commands:\n" + "\n".join("  {:<12}{}".format(
+            name, help) for name, (_, help) in COMMANDS.items()))
+    parser.add_argument('command', choices=list(COMMANDS), metavar='COMMAND', help="Subcommand to run.")
+    parser.add_argument('args', nargs=argparse.REMAINDER, help="Arguments to the subcommand.")
+    args = parser.parse_args(args)
+
+    return importlib.import_module(COMMANDS[args.command][0]).main(args.args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import deque, namedtuple
+
+import itertools
+import os
+import sys
+
+from mutagentools.profiling import Profiler, activate
+
+
+BatchResult = namedtuple('BatchResult', ['item', 'value', 'error'])
+BatchResult.__doc__ = """The outcome of one item of a batch: the return value, or an error message if it failed."""
+
+
+def add_jobs_arguments(parser, default=1):
+    """Adds the -j/--jobs and --processes options shared by all batch commands to an argument parser."""
+    parser.add_argument('-j', '--jobs', type=int, default=default,
+        help="Number of files to process concurrently (default: {}).".format(default))
+    parser.add_argument('--processes', action='store_true',
+        help="Use worker processes rather than threads for --jobs, for CPU-bound work.")
+
+
+def check_jobs_arguments(parser, args):
+    """Validates the options added by add_jobs_arguments."""
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+
+def add_input_arguments(parser, name, help):
+    """
+    Adds a positional argument of files named name, along with the -r/--recursive and --from-file options giving
+    more, to an argument parser.
+    """
+    parser.add_argument('-r', '--recursive', action='append', default=[], metavar='DIR',
+        help="Also process every matching file under DIR, walked recursively. May be repeated.")
+    parser.add_argument('--from-file', metavar='FILE',
+        help="Also process the NUL-delimited paths in FILE, or stdin if FILE is -, as they are read, as in "
+            "find -print0.")
+    parser.add_argument(name, nargs='*', help=help)
+
+
+def inputs_from_arguments(parser, args, name, extensions):
+    """
+    Returns an iterator over the files given by the options added by add_input_arguments: the named files, then the
+    files with the given extensions under each --recursive directory, then those read from --from-file.
+
+    Directories are walked and paths read lazily, as the iterator is consumed, so that however many files there are
+    they are never all held in memory.
+    """
+    files = getattr(args, name)
+
+    if not (files or args.recursive or args.from_file):
+        parser.error("no files given; pass {}, -r/--recursive DIR or --from-file FILE".format(name))
+
+    for directory in args.recursive:
+        if not os.path.isdir(directory):
+            parser.error("not a directory: {}".format(directory))
+
+    if args.from_file and args.from_file != '-' and not os.path.isfile(args.from_file):
+        parser.error("no such file: {}".format(args.from_file))
+
+    return itertools.chain(files, _walk_inputs(args.recursive, extensions), _read_inputs(args.from_file))
+
+
+def _walk_inputs(directories, extensions):
+    # imported here as only some runs walk directories
+    from mutagentools.paths import walk_files
+
+    for directory in directories:
+        for path in walk_files(directory, extensions):
+            yield path
+
+
+def _read_inputs(filename):
+    if not filename:
+        return
+
+    from mutagentools.paths import read_paths
+
+    if filename == '-':
+        for path in read_paths(sys.stdin.buffer):
+            yield path
+
+        return
+
+    with open(filename, 'rb') as stream:
+        for path in read_paths(stream):
+            yield path
+
+
+def add_profile_arguments(parser):
+    """Adds the --profile options shared by all commands to an argument parser."""
+    parser.add_argument('--profile', action='store_true',
+        help="Report timing histograms of each phase of processing a file to stderr when done.")
+    parser.add_argument('--profile-output', metavar='FILE', help="Write the timing histograms as JSON to FILE.")
+    parser.add_argument('--profile-dump', metavar='DIR',
+        help="Profile each file with cProfile and write the statistics of the slowest files into DIR. Requires "
+            "--processes when --jobs is more than 1.")
+    parser.add_argument('--profile-memory', action='store_true',
+        help="Also trace each file's allocations with tracemalloc, writing snapshots of the slowest files into "
+            "--profile-dump.")
+    parser.add_argument('--profile-slowest', type=int, default=5, metavar='N',
+        help="Number of slowest files to report and dump (default: 5).")
+
+
+def profiler_from_arguments(parser, args, processes=False):
+    """
+    Returns a Profiler for the options added by add_profile_arguments, or None if profiling wasn't asked for.
+
+    The profiler is made active in the calling thread, so that phases timed there are recorded in it too.
+    """
+    if not (args.profile or args.profile_output or args.profile_dump):
+        if args.profile_memory:
+            parser.error("--profile-memory requires --profile-dump")
+
+        return None
+
+    if args.profile_memory and not args.profile_dump:
+        parser.error("--profile-memory requires --profile-dump")
+
+    if args.profile_dump and args.jobs > 1 and not processes:
+        # only one cProfile profiler may be active in a process as of Python 3.12, and tracemalloc traces the whole
+        # process, so neither can tell concurrent files apart in threads
+        parser.error("--profile-dump requires --processes when --jobs is more than 1")
+
+    profiler = Profiler(slowest=args.profile_slowest, cprofile=bool(args.profile_dump), memory=args.profile_memory)
+    activate(profiler)
+
+    return profiler
+
+
+def add_cache_arguments(parser):
+    """Adds the --cache options of the commands exporting tags as JSON to an argument parser."""
+    parser.add_argument('--cache', metavar='FILE',
+        help="Cache the rendered tags of each file in FILE, created if it doesn't exist, and reuse them for as long as "
+            "the file is unchanged. Can't be used with --pictures or --pictures-dir.")
+    parser.add_argument('--cache-size', type=int, default=256, metavar='MB',
+        help="Evict the least recently used entries when the cache grows beyond this size (default: 256 MB).")
+
+
+def cache_from_arguments(parser, args):
+    """Returns an ExportCache for the options added by add_cache_arguments, or None if caching wasn't asked for."""
+    if not args.cache:
+        return None
+
+    if getattr(args, 'pictures_dir', None):
+        # cached entries wouldn't write their pictures into the directory
+        parser.error("--cache can't be used with --pictures-dir")
+
+    if getattr(args, 'pictures', False):
+        # cached pictures would be held and written whole rather than streamed from the file
+        parser.error("--cache can't be used with --pictures")
+
+    if args.cache_size < 1:
+        parser.error("--cache-size must be at least 1")
+
+    # imported here as only a few commands cache, and only when asked to
+    from mutagentools.cache import ExportCache
+
+    return ExportCache(args.cache, max_size=args.cache_size * 1024 * 1024)
+
+
+def add_write_arguments(parser):
+    """Adds the --atomic options shared by the commands which modify files to an argument parser."""
+    parser.add_argument('--atomic', action='store_true',
+        help="Save each file to a temporary copy and rename it over the original, so that a crash never leaves a "
+            "file partly written.")
+    parser.add_argument('--sync-batch', type=int, default=64, metavar='N',
+        help="With --atomic, flush files to disk and rename them N at a time (default: 64).")
+
+
+def writer_from_arguments(parser, args):
+    """Returns an AtomicWriter for the options added by add_write_arguments, or None unless --atomic was given."""
+    if args.sync_batch < 1:
+        parser.error("--sync-batch must be at least 1")
+
+    if not args.atomic:
+        return None
+
+    # imported here as only a few commands write, and only atomically when asked to
+    from mutagentools.atomic import AtomicWriter
+
+    return AtomicWriter(batch_size=args.sync_batch)
+
+
+def add_journal_arguments(parser):
+    """Adds the --journal options shared by the commands which modify files to an argument parser."""
+    parser.add_argument('--journal', metavar='FILE',
+        help="Append the path, outcome and time of each file processed to FILE as a line of JSON.")
+    parser.add_argument('--resume', action='store_true',
+        help="Skip files the --journal records as done by an earlier run; failed files are tried again.")
+
+
+def journal_from_arguments(parser, args, key=None):
+    """Returns a Journal for the options added by add_journal_arguments, or None if no journal was asked for."""
+    if not args.journal:
+        if args.resume:
+            parser.error("--resume requires --journal")
+
+        return None
+
+    # imported here as only a few commands journal, and only when asked to
+    from mutagentools.journal import Journal
+
+    return Journal(args.journal, resume=args.resume, key=key)
+
+
+def close_journal(journal):
+    """Closes a Journal, if any, reporting to stderr how many files it had already recorded as done."""
+    if journal is None:
+        return
+
+    if journal.skipped:
+        sys.stderr.write("Skipped {} file(s) already done according to {}.\n".format(journal.skipped,
+            journal.filename))
+
+    journal.close()
+
+
+def report_profile(profiler, args):
+    """Writes out a Profiler's results as asked for by the options added by add_profile_arguments."""
+    if profiler is None:
+        return
+
+    if args.profile:
+        profiler.write_text(sys.stderr)
+
+    if args.profile_output:
+        profiler.write_json(args.profile_output)
+
+    if args.profile_dump:
+        profiler.dump(args.profile_dump)
+
+
+def format_error(e):
+    """Formats an exception as a one-line error message."""
+    return "{}: {}".format(type(e).__name__, e)
+
+
+def _call(func, item):
+    try:
+        return BatchResult(item, func(item), None)
+    except Exception as e:
+        return BatchResult(item, None, format_error(e))
+
+
+def run_batch(func, items, jobs=1, processes=False, profiler=None, writer=None, journal=None):
+    """
+    Applies func to every item, yielding a BatchResult for each in the order the items were given.
+
+    With more than one job, items are processed concurrently by a pool of threads, or of processes if asked, in which
+    case func and the items must be picklable. Items are consumed lazily and at most twice as many as there are jobs
+    are in flight at once. An exception raised by func is reported in its item's result rather than raised.
+
+    If a Profiler is given, every call is profiled and recorded in it. If an AtomicWriter is given, the files saved by
+    each call are committed by it in batches, and results are only yielded once their files are committed; a result
+    whose files couldn't be committed has the error instead.
+
+    If a Journal is given, items it has recorded as done are skipped, and the outcome of every other item is recorded
+    in it as its result is yielded.
+    """
+    if journal is not None:
+        for result in run_batch(func, journal.pending(items), jobs=jobs, processes=processes, profiler=profiler,
+                writer=writer):
+            journal.record(result)
+            yield result
+
+        return
+
+    if writer is not None:
+        pending = []
+
+        for result in run_batch(writer.wrap(func), items, jobs=jobs, processes=processes, profiler=profiler):
+            pending.append(result)
+
+            if len(pending) >= writer.batch_size:
+                for committed in _commit(writer, pending):
+                    yield committed
+
+                pending = []
+
+        for committed in _commit(writer, pending):
+            yield committed
+
+        return
+
+    if profiler is not None:
+        for result in run_batch(profiler.wrap(func), items, jobs=jobs, processes=processes):
+            yield result._replace(value=profiler.add(result.item, result.value)) if not result.error else result
+
+        return
+
+    if jobs == 1:
+        for item in items:
+            yield _call(func, item)
+
+        return
+
+    # imported here as it takes longer to import than most commands take to process a file
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    executor = (ProcessPoolExecutor if processes else ThreadPoolExecutor)(max_workers=jobs)
+    pending = deque()
+
+    try:
+        for item in items:
+            pending.append(executor.submit(_call, func, item))
+
+            if len(pending) >= jobs * 2:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+        executor.shutdown(wait=True)
+
+
+def _commit(writer, results):
+    """Commits the files staged by a batch of results with an AtomicWriter, returning the results it wrapped."""
+    errors = writer.commit([result.value.staged if not result.error else [] for result in results])
+
+    return [result._replace(value=None, error=format_error(errors[index])) if index in errors
+        else result._replace(value=result.value.value) if not result.error else result
+        for index, result in enumerate(results)]
+
+
+def report_error(result, action="process"):
+    """Writes the error of a failed BatchResult to stderr."""
+    sys.stderr.write("Failed to {} {}: {}\n".format(action, result.item, result.error))
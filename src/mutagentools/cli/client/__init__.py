@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+
+
+# the environment variable naming the socket of a running server, used when --socket isn't given
+SOCKET_VARIABLE = 'MUTAGENTOOLS_SOCKET'
+
+
+def send_requests(path, requests, window=64):
+    """
+    Sends requests, dicts of a command and its arguments, to the server listening on a Unix socket.
+
+    Yields the response to each request in the order the requests were given. Requests are sent from another thread
+    while responses are read, with at most window of them awaiting a response at once.
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.connect(path)
+
+    in_flight = threading.BoundedSemaphore(window)
+    stopped = threading.Event()
+    sent, errors = [0], []
+
+    def send():
+        try:
+            for request_id, request in enumerate(requests):
+                while not in_flight.acquire(timeout=0.1):
+                    if stopped.is_set():
+                        return
+
+                connection.sendall((json.dumps(dict(request, id=request_id)) + "\n").encode('utf-8'))
+                sent[0] += 1
+
+            connection.shutdown(socket.SHUT_WR)
+        except Exception as e:
+            if not stopped.is_set():
+                errors.append(e)
+
+    sender = threading.Thread(target=send)
+    sender.daemon = True
+    sender.start()
+
+    responses, expected = {}, 0
+
+    try:
+        for line in connection.makefile('rb'):
+            response = json.loads(line.decode('utf-8'))
+            responses[response['id']] = response
+            in_flight.release()
+
+            while expected in responses:
+                yield responses.pop(expected)
+                expected += 1
+    finally:
+        stopped.set()
+        connection.close()
+        sender.join()
+
+    if errors:
+        raise errors[0]
+
+    if expected < sent[0]:
+        raise IOError("the server closed the connection before answering every request")
+
+
+def add_export_arguments(parser):
+    """Adds the options of flacjson and id3json to an argument parser."""
+    parser.add_argument('-n', '--no-flatten', action='store_true', help="Don't flatten single-entry arrays.")
+    parser.add_argument('-p', '--pictures', action="store_true", help="Include base64-encoded pictures in output.")
+    parser.add_argument('--pictures-dir', metavar='DIR',
+        help="Write each unique picture once into DIR, named by its content hash, and reference it by hash in the "
+            "output instead of embedding base64 data. Implies --pictures.")
+    parser.add_argument('--ndjson', action='store_true',
+        help="Stream one compact JSON object per line as each file is read instead of a single JSON array.")
+    parser.add_argument('file', nargs='+', help="File(s) to extract information from.")
+
+
+def main(args=sys.argv[1:]):
+    parser = argparse.ArgumentParser(prog='mutagentools client', description="Sends requests to a running "
+        "mutagentools serve daemon, printing the same output as the command line tool the request stands in for.")
+    parser.add_argument('-s', '--socket', default=os.environ.get(SOCKET_VARIABLE), metavar='PATH',
+        help="Path of the server's Unix socket (default: ${}).".format(SOCKET_VARIABLE))
+    subparsers = parser.add_subparsers(dest='command', metavar='COMMAND')
+    subparsers.required = True
+
+    add_export_arguments(subparsers.add_parser('flacjson', help="Render FLAC tags in JSON format."))
+    add_export_arguments(subparsers.add_parser('id3json', help="Render ID3 tags in JSON format."))
+
+    flac2id3 = subparsers.add_parser('flac2id3', help="Copy FLAC Vorbis tags to an ID3 compliant file.")
+    flac2id3.add_argument('-d', '--delete', action='store_true',
+        help="Delete all tags in the destination ID3 file before copying tags over.")
+    flac2id3.add_argument('-v', '--verbose', action='store_true', help="Verbose output.")
+    flac2id3.add_argument('flac_file', help="FLAC file to copy tags from.")
+    flac2id3.add_argument('id3_file', help="ID3 compliant file to copy tags to.")
+
+    id3clean = subparsers.add_parser('id3clean', help="Remove private identifying tags from MP3 files.")
+    id3clean.add_argument('-v', '--verbose', action='store_true', help="Verbose output.")
+    id3clean.add_argument('file', nargs='+', help="MP3 file(s) to strip tracker tags from.")
+
+    args = parser.parse_args(args)
+
+    if not args.socket:
+        parser.error("--socket is required unless ${} is set".format(SOCKET_VARIABLE))
+
+    # the server doesn't share our working directory
+    if args.command == 'flac2id3':
+        requests = [{'command': 'flac2id3', 'flac_file': os.path.abspath(args.flac_file),
+            'id3_file': os.path.abspath(args.id3_file), 'delete': args.delete}]
+        items = [args.flac_file]
+    elif args.command == 'id3clean':
+        requests = ({'command': 'id3clean', 'file': os.path.abspath(f)} for f in args.file)
+        items = args.file
+    else:
+        requests = ({'command': args.command, 'file': os.path.abspath(f), 'flatten': not args.no_flatten,
+            'pictures': args.pictures, 'pictures_dir': args.pictures_dir and os.path.abspath(args.pictures_dir)}
+            for f in args.file)
+        items = args.file
+
+    try:
+        return print_responses(args, items, send_requests(args.socket, requests))
+    except (IOError, OSError) as e:
+        sys.stderr.write("Failed to talk to the server at {}: {}\n".format(args.socket, e))
+        return 2
+
+
+def print_responses(args, items, responses):
+    """Prints responses as the command line tool they stand in for would, returning the exit status."""
+    failed, records = 0, []
+    action = {'flac2id3': "copy tags from", 'id3clean': "strip private tags from"}.get(args.command, "read tags from")
+
+    for item, response in zip(items, responses):
+        if 'error' in response:
+            failed += 1
+            sys.stderr.write("Failed to {} {}: {}\n".format(action, item, response['error']))
+            continue
+
+        result = response['result']
+
+        if args.command == 'flac2id3':
+            if args.verbose and not result['saved']:
+                print("Tags in {} already match {}, not saved.".format(args.id3_file, args.flac_file))
+            elif args.verbose:
+                print("Copied tags from {} to {} ({}).".format(args.flac_file, args.id3_file,
+                    "in place" if result['in_place'] else "rewritten"))
+
+                for change in ('added', 'changed', 'removed'):
+                    for tag in result[change]:
+                        print("  {} Tag {}.".format(change.capitalize(), tag))
+        elif args.command == 'id3clean':
+            if args.verbose and result['removed']:
+                print("Stripped private identifying tags from {} ({}).".format(item,
+                    "in place" if result['in_place'] else "rewritten"))
+
+                for tag in result['removed']:
+                    print("  Removed Tag {}.".format(tag))
+            elif args.verbose:
+                print("No private identifying tags in {}.".format(item))
+        else:
+            # report the file as it was named on the command line, as the tool itself would
+            result['file'] = item
+
+            if args.ndjson:
+                sys.stdout.write(json.dumps(result, sort_keys=True) + "\n")
+                sys.stdout.flush()
+            else:
+                records.append(result)
+
+    if args.command in ('flacjson', 'id3json') and not args.ndjson:
+        print(json.dumps(records, sort_keys=True, indent=2))
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
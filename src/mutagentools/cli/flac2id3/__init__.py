@@ -1,41 +1,280 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+from collections import namedtuple
+
 import argparse
+import functools
+import os
 import sys
+import time
 
-from mutagen.flac import FLAC
 from mutagen.mp3 import MP3
 
-from mutagentools.flac import convert_flac_to_id3
+from mutagentools.atomic import save_file
+from mutagentools.cli.batch import (
+    add_journal_arguments, add_profile_arguments, add_write_arguments, check_jobs_arguments, close_journal,
+    journal_from_arguments, profiler_from_arguments, report_profile, run_batch, writer_from_arguments,
+)
+from mutagentools.flac import convert_flac_to_id3, read_metadata
+from mutagentools.flac.convert import DEFAULT_MAPPING
+from mutagentools.flac.manifest import Manifest, source_fingerprint
+from mutagentools.flac.mapping import load_mapping
+from mutagentools.id3.diff import apply_diff, diff_tags, has_id3v1
+from mutagentools.padding import PaddingPolicy, save_with_padding
+from mutagentools.paths import walk_files
+from mutagentools.pictures import PicturePolicy, parse_picture_type
+from mutagentools.profiling import phase
+
+
+FLAC_EXTENSION = '.flac'
+ID3_EXTENSION = '.mp3'
+
+# options of copy_tags which change the tags written, and so invalidate manifest entries
+TAG_OPTIONS = ('delete', 'picture_policy', 'mapping')
+
+CopyResult = namedtuple('CopyResult', ['diff', 'saved', 'in_place'])
+CopyResult.__doc__ = """
+The outcome of copying tags to an MP3 file: the TagDiff of its frames, whether it was saved and if so whether in place.
+"""
 
 
 def main(args=sys.argv[1:]):
     parser = argparse.ArgumentParser(description="Copies FLAC Vorbis tags to an ID3 compliant file.")
     parser.add_argument('-d', '--delete', action='store_true',
         help="Delete all tags in the destination ID3 file before copying tags over.")
-    parser.add_argument('flac_file', type=argparse.FileType('r'), help="FLAC file to copy tags from.")
-    parser.add_argument('id3_file', type=argparse.FileType('r'), help="ID3 compliant file to copy tags to.")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Verbose output.")
+    parser.add_argument('-t', '--tree', nargs=2, metavar=('SRC_DIR', 'DST_DIR'),
+        help="Copy tags from every FLAC file in SRC_DIR to the MP3 file at the same relative path in DST_DIR.")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+        help="Number of worker processes to use with --tree (default: number of CPUs).")
+    parser.add_argument('--dedupe-pictures', action='store_true',
+        help="Only copy the first of several byte-identical pictures.")
+    parser.add_argument('--picture-type', action='append', type=parse_picture_type, metavar='TYPE',
+        help="Only copy pictures of this type, given as a number or name such as COVER_FRONT. May be repeated.")
+    parser.add_argument('--max-picture-size', type=int, metavar='BYTES',
+        help="Skip pictures larger than this many bytes.")
+    parser.add_argument('--padding', type=int, metavar='BYTES',
+        help="Padding to leave when a tag has to be resized (default: chosen by mutagen).")
+    parser.add_argument('--max-padding', type=int, metavar='BYTES',
+        help="Shrink tags with more than this much padding; by default existing padding is always kept.")
+    parser.add_argument('--mapping', metavar='FILE',
+        help="JSON file of extra Vorbis to ID3 mapping rules, which take precedence over the built-in rules.")
+    parser.add_argument('-m', '--manifest', metavar='FILE',
+        help="Record copied files in this manifest and skip FLAC files whose tags haven't changed since.")
+    parser.add_argument('-f', '--force', action='store_true',
+        help="Copy tags for every file even if the manifest says they are unchanged.")
+    add_profile_arguments(parser)
+    add_write_arguments(parser)
+    add_journal_arguments(parser)
+    parser.add_argument('flac_file', nargs='?', help="FLAC file to copy tags from.")
+    parser.add_argument('id3_file', nargs='?', help="ID3 compliant file to copy tags to.")
     args = parser.parse_args(args)
 
+    picture_policy = None
+
+    if args.dedupe_pictures or args.picture_type or args.max_picture_size is not None:
+        picture_policy = PicturePolicy(dedupe=args.dedupe_pictures, types=args.picture_type,
+            max_size=args.max_picture_size)
+
+    try:
+        mapping = load_mapping(args.mapping, DEFAULT_MAPPING) if args.mapping else None
+    except (IOError, ValueError) as e:
+        parser.error("unable to load mapping file {}: {}".format(args.mapping, e))
+
+    padding = PaddingPolicy(target=args.padding, maximum=args.max_padding)
+
+    if args.force and not args.manifest:
+        parser.error("--force requires --manifest")
+
+    # --tree always uses worker processes
+    profiler = profiler_from_arguments(parser, args, processes=True)
+    writer = writer_from_arguments(parser, args)
+
+    if args.journal and not args.tree:
+        parser.error("--journal requires --tree")
+
+    # pairs are recorded by the MP3 file, which is the one written to
+    journal = journal_from_arguments(parser, args, key=lambda pair: pair[1])
+    manifest = Manifest(args.manifest) if args.manifest else None
+
+    try:
+        if args.tree:
+            if args.flac_file or args.id3_file:
+                parser.error("flac_file and id3_file cannot be used with --tree")
+
+            check_jobs_arguments(parser, args)
+
+            return sync_tree(args.tree[0], args.tree[1], jobs=args.jobs, verbose=args.verbose, manifest=manifest,
+                force=args.force, profiler=profiler, writer=writer, journal=journal, delete=args.delete,
+                picture_policy=picture_policy, mapping=mapping, padding=padding)
+
+        if not (args.flac_file and args.id3_file):
+            parser.error("flac_file and id3_file are required unless --tree is given")
+
+        flac_file, id3_file = args.flac_file, args.id3_file
+        options = sync_options(delete=args.delete, picture_policy=picture_policy, mapping=mapping)
+
+        if manifest and not args.force and manifest.is_current(flac_file, id3_file, options):
+            if args.verbose:
+                print("Tags in {} are unchanged, skipping.".format(flac_file))
+
+            return
+
+        # taken before copying, so that a FLAC file changed during the copy is copied again next time
+        fingerprint = source_fingerprint(flac_file) if manifest else None
+
+        copy = functools.partial(copy_tags, delete=args.delete, picture_policy=picture_policy, mapping=mapping,
+            padding=padding)
+        copy_pair = lambda pair: copy(*pair)
+        call = functools.partial(writer.call, copy_pair) if writer else copy_pair
+        result = profiler.call(call, (flac_file, id3_file)) if profiler else call((flac_file, id3_file))
+
+        if args.verbose:
+            report_copy(flac_file, id3_file, result)
+
+        if manifest:
+            manifest.record(flac_file, id3_file, options, fingerprint=fingerprint)
+    finally:
+        if manifest:
+            manifest.close()
+
+        close_journal(journal)
+        report_profile(profiler, args)
+
+
+def sync_options(**kwargs):
+    """Returns a stable string describing the options tags are copied with, used to invalidate manifest entries."""
+    return ', '.join('{}={!r}'.format(k, kwargs[k]) for k in sorted(kwargs) if kwargs[k] is not None)
+
+
+def copy_tags(flac_file, id3_file, delete=False, picture_policy=None, mapping=None, padding=None):
+    """
+    Copies the tags of a FLAC file to an MP3 file, saving ID3v1 and ID3v2.4 tags, and returns a CopyResult.
+
+    The converted frames are compared with the existing ones and only those which differ are changed. The file isn't
+    saved at all if none differ and it already has ID3v1 and ID3v2.4 tags. Whether it was saved in place using the
+    given padding function is as returned by save_with_padding.
+    """
     # open FLAC file
-    src = FLAC(args.flac_file.name)
+    src = read_metadata(flac_file, pictures=True)
 
     # open MP3/ID3 file
-    dest = MP3(args.id3_file.name)
+    with phase('parse'):
+        dest = MP3(id3_file)
 
     if not dest.tags:
         dest.add_tags()
 
-    # if we are meant to clear the dest tags, clear them
-    dest.tags.clear() if args.delete else None
+    frames = convert_flac_to_id3(src, picture_policy=picture_policy, mapping=mapping)
 
-    # now, copy over the tags
-    list(map(lambda t: dest.tags.add(t), convert_flac_to_id3(src)))
+    # if we are meant to clear the dest tags, everything not copied over is removed
+    diff = diff_tags(dest.tags, frames, delete=delete)
+
+    if not diff and dest.tags.version == (2, 4, 0) and has_id3v1(id3_file):
+        return CopyResult(diff, False, None)
+
+    apply_diff(dest.tags, frames, diff)
 
     # save; writing ID3v1 tags and ID3v2.4 tags
-    dest.tags.save(args.id3_file.name, 2, 4)
+    return CopyResult(diff, True, save_file(id3_file, lambda target: save_with_padding(dest.tags, padding, target, 2,
+        4)))
+
+
+def report_diff(diff):
+    """Prints the frames added, changed and removed by a TagDiff."""
+    for action, keys in (('Added', diff.added), ('Changed', diff.changed), ('Removed', diff.removed)):
+        for key in keys:
+            print("  {} Tag {}.".format(action, key))
+
+
+def report_copy(flac_file, id3_file, result):
+    """Prints the outcome of copying tags, as a CopyResult, and what changed."""
+    if not result.saved:
+        print("Tags in {} already match {}, not saved.".format(id3_file, flac_file))
+        return
+
+    print("Copied tags from {} to {} ({}).".format(flac_file, id3_file, "in place" if result.in_place else "rewritten"))
+    report_diff(result.diff)
+
+
+def find_pairs(src_dir, dst_dir):
+    """Yields (flac_file, id3_file) pairs for every FLAC file in src_dir, matched by relative path in dst_dir."""
+    for flac_file in walk_files(src_dir, [FLAC_EXTENSION]):
+        relative = os.path.relpath(os.path.splitext(flac_file)[0], src_dir)
+
+        yield flac_file, os.path.join(dst_dir, relative + ID3_EXTENSION)
+
+
+def sync_pair(pair, fingerprint=False, **kwargs):
+    """
+    Copies tags for one (flac_file, id3_file) pair.
+
+    Returns the CopyResult of copying the tags, and the manifest Fingerprint of the FLAC file as copied if asked for,
+    taken before copying.
+    """
+    flac_file, id3_file = pair
+
+    result = source_fingerprint(flac_file) if fingerprint else None
+
+    return copy_tags(flac_file, id3_file, **kwargs), result
+
+
+def sync_tree(src_dir, dst_dir, jobs=1, verbose=False, manifest=None, force=False, profiler=None, writer=None,
+        journal=None, **kwargs):
+    """
+    Copies tags for every FLAC/MP3 pair in two parallel directory trees using a pool of worker processes.
+
+    If a Manifest is given, pairs it considers current are skipped unless force is set, and every copied pair is
+    recorded in it. If a Profiler is given, every pair is profiled in it, and if an AtomicWriter is given, the MP3 files
+    are saved atomically with it. If a Journal is given, pairs it records as done are skipped and every other pair is
+    recorded in it. Other keyword arguments are passed through to copy_tags for every pair.
+    """
+    missing, pairs, unchanged = [], [], 0
+    options = sync_options(**{k: v for k, v in kwargs.items() if k in TAG_OPTIONS})
+
+    for flac_file, id3_file in find_pairs(src_dir, dst_dir):
+        if not os.path.isfile(id3_file):
+            missing.append(flac_file)
+        elif manifest and not force and manifest.is_current(flac_file, id3_file, options):
+            unchanged += 1
+        else:
+            pairs.append((flac_file, id3_file))
+
+    for flac_file in missing:
+        sys.stderr.write("No MP3 file found for {}, skipping.\n".format(flac_file))
+
+    worker = functools.partial(sync_pair, fingerprint=manifest is not None, **kwargs)
+    failed, synced, rewritten, in_sync, started = 0, 0, 0, 0, time.time()
+
+    for result in run_batch(worker, pairs, jobs=min(jobs, max(len(pairs), 1)), processes=True,
+            profiler=profiler, writer=writer, journal=journal):
+        flac_file, id3_file = result.item
+        synced += 1
+
+        if result.error:
+            failed += 1
+            sys.stderr.write("Failed to copy tags from {} to {}: {}\n".format(flac_file, id3_file, result.error))
+            continue
+
+        copied, fingerprint = result.value
+        rewritten += 1 if copied.saved and not copied.in_place else 0
+        in_sync += 0 if copied.saved else 1
+
+        if manifest:
+            manifest.record(flac_file, id3_file, options, fingerprint=fingerprint)
+
+        if verbose:
+            report_copy(flac_file, id3_file, copied)
+
+    elapsed = time.time() - started
+
+    sys.stderr.write("Synced {} file(s) in {:.2f}s ({:.1f} files/sec); {} rewritten, {} already in sync, {} unchanged, "
+        "{} failed, {} missing.\n".format(synced - failed, elapsed, synced / elapsed if elapsed > 0 else 0.0,
+        rewritten, in_sync, unchanged, failed, len(missing)))
+
+    return 1 if failed else 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
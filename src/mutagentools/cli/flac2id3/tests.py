@@ -4,12 +4,14 @@
 import mock
 import mutagentools
 import os
+import shutil
+import tempfile
 import unittest
 
 from mock import patch
-from mutagen.id3 import ID3
+from mutagen.id3 import ID3, TPE1, TXXX
 from mutagen.mp3 import MP3
-from mutagentools.cli.flac2id3 import main as flac2id3_main
+from mutagentools.cli.flac2id3 import copy_tags, find_pairs, main as flac2id3_main
 
 FILENAME = os.path.realpath(__file__)
 DIRNAME = os.path.dirname(FILENAME)
@@ -39,7 +41,157 @@ class IntegrationTest(unittest.TestCase):
         flac2id3_main([blank_flac, blank_id3])
 
         # make sure that a save was attempted
-        tags.save.assert_called_with(blank_id3, 2, 4)
+        tags.save.assert_called_with(blank_id3, 2, 4, padding=mock.ANY)
 
         # it should insert TPOS by default, so yeah:
         self.assertEqual(1, len(result))
+
+
+class TreeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.src = tempfile.mkdtemp()
+        self.dst = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.src)
+        shutil.rmtree(self.dst)
+
+    def create_tree(self):
+        """Creates a small FLAC tree and a matching MP3 tree with one MP3 missing."""
+        fixture_flac = os.path.join(DIRNAME, *('../../flac/fixtures/fixture.flac'.split('/')))
+        blank_id3 = os.path.join(DIRNAME, *('../../id3/fixtures/no-id3.mp3'.split('/')))
+
+        for relative in ('a/01.flac', 'a/02.FLAC', 'b/c/03.flac', 'b/04.flac'):
+            os.makedirs(os.path.dirname(os.path.join(self.src, relative)), exist_ok=True)
+            shutil.copy(fixture_flac, os.path.join(self.src, relative))
+
+        for relative in ('a/01.mp3', 'a/02.mp3', 'b/c/03.mp3'):
+            os.makedirs(os.path.dirname(os.path.join(self.dst, relative)), exist_ok=True)
+            shutil.copy(blank_id3, os.path.join(self.dst, relative))
+
+        # non-FLAC files are ignored
+        open(os.path.join(self.src, 'a', 'cover.jpg'), 'w').close()
+
+    def test_find_pairs(self):
+        """Tests that FLAC files are paired with MP3 files by relative path."""
+        self.create_tree()
+
+        pairs = list(find_pairs(self.src, self.dst))
+
+        self.assertEqual([
+            (os.path.join(self.src, 'a', '01.flac'), os.path.join(self.dst, 'a', '01.mp3')),
+            (os.path.join(self.src, 'a', '02.FLAC'), os.path.join(self.dst, 'a', '02.mp3')),
+            (os.path.join(self.src, 'b', '04.flac'), os.path.join(self.dst, 'b', '04.mp3')),
+            (os.path.join(self.src, 'b', 'c', '03.flac'), os.path.join(self.dst, 'b', 'c', '03.mp3')),
+        ], pairs)
+
+    def test_tree(self):
+        """Tests that --tree copies tags to every matched MP3 file using multiple processes."""
+        self.create_tree()
+
+        self.assertEqual(0, flac2id3_main(['--tree', self.src, self.dst, '--jobs', '2']))
+
+        for relative in ('a/01.mp3', 'a/02.mp3', 'b/c/03.mp3'):
+            tags = ID3(os.path.join(self.dst, relative))
+            self.assertEqual(['Album'], tags.get('TALB'))
+            self.assertEqual(['Artist 1', 'Artist 2'], tags.get('TPE1'))
+
+        self.assertFalse(os.path.exists(os.path.join(self.dst, 'b', '04.mp3')))
+
+    def test_tree_atomic(self):
+        """Tests that --atomic copies tags through temporary files which replace the MP3 files."""
+        self.create_tree()
+
+        self.assertEqual(0, flac2id3_main(['--tree', self.src, self.dst, '--jobs', '2', '--atomic', '--sync-batch',
+            '2']))
+
+        for relative in ('a/01.mp3', 'a/02.mp3', 'b/c/03.mp3'):
+            self.assertEqual(['Album'], ID3(os.path.join(self.dst, relative)).get('TALB'))
+
+        self.assertEqual(['01.mp3', '02.mp3'], sorted(os.listdir(os.path.join(self.dst, 'a'))))
+
+    def test_tree_journal(self):
+        """Tests that --resume skips the pairs a --journal records as done."""
+        self.create_tree()
+        journal = os.path.join(self.dst, 'journal.ndjson')
+
+        with open(os.path.join(self.dst, 'a', '01.mp3'), 'wb') as f:
+            f.write(b'garbage')
+
+        self.assertEqual(1, flac2id3_main(['--tree', self.src, self.dst, '-j', '1', '--journal', journal]))
+
+        with patch('mutagentools.cli.flac2id3.copy_tags') as mock_copy_tags:
+            self.assertEqual(0, flac2id3_main(['--tree', self.src, self.dst, '-j', '1', '--journal', journal,
+                '--resume']))
+
+            # only the failed pair is tried again
+            self.assertEqual([mock.call(os.path.join(self.src, 'a', '01.flac'), os.path.join(self.dst, 'a', '01.mp3'),
+                delete=False, picture_policy=None, mapping=None, padding=mock.ANY)], mock_copy_tags.call_args_list)
+
+    def test_tree_failure(self):
+        """Tests that a failing pair is reported without stopping the rest of the tree."""
+        self.create_tree()
+
+        # corrupt one of the destination files
+        with open(os.path.join(self.dst, 'a', '01.mp3'), 'wb') as f:
+            f.write(b'garbage')
+
+        self.assertEqual(1, flac2id3_main(['--tree', self.src, self.dst, '--jobs', '1']))
+        self.assertEqual(['Album'], ID3(os.path.join(self.dst, 'b', 'c', '03.mp3')).get('TALB'))
+
+    def test_tree_manifest(self):
+        """Tests that unchanged files are skipped when a manifest is used, unless forced."""
+        self.create_tree()
+        manifest = os.path.join(self.dst, 'manifest.db')
+
+        self.assertEqual(0, flac2id3_main(['--tree', self.src, self.dst, '-j', '1', '--manifest', manifest]))
+
+        with patch('mutagentools.cli.flac2id3.copy_tags') as mock_copy_tags:
+            self.assertEqual(0, flac2id3_main(['--tree', self.src, self.dst, '-j', '1', '--manifest', manifest]))
+            self.assertFalse(mock_copy_tags.called)
+
+            # changing options invalidates the manifest
+            self.assertEqual(0, flac2id3_main(['--tree', self.src, self.dst, '-j', '1', '--manifest', manifest,
+                '--delete']))
+            self.assertEqual(3, mock_copy_tags.call_count)
+
+            mock_copy_tags.reset_mock()
+            self.assertEqual(0, flac2id3_main(['--tree', self.src, self.dst, '-j', '1', '--manifest', manifest,
+                '--force']))
+            self.assertEqual(3, mock_copy_tags.call_count)
+
+    def test_tree_in_sync(self):
+        """Tests that files whose tags already match aren't saved again, while changed frames are applied."""
+        self.create_tree()
+
+        self.assertEqual(0, flac2id3_main(['--tree', self.src, self.dst, '-j', '1']))
+
+        id3_file = os.path.join(self.dst, 'a', '01.mp3')
+        flac_file = os.path.join(self.src, 'a', '01.flac')
+
+        with patch('mutagen.id3.ID3.save', autospec=True) as mock_save:
+            self.assertEqual(0, flac2id3_main(['--tree', self.src, self.dst, '-j', '1']))
+            self.assertFalse(mock_save.called)
+
+        tags = ID3(id3_file)
+        tags.delall('TALB')
+        tags.add(TPE1(encoding=3, text=['Someone']))
+        tags.add(TXXX(encoding=3, desc='extra', text=['extra']))
+        tags.save(id3_file, v1=2, v2_version=4)
+
+        result = copy_tags(flac_file, id3_file)
+
+        self.assertTrue(result.saved)
+        self.assertEqual(['TALB'], result.diff.added)
+        self.assertEqual(['TPE1'], result.diff.changed)
+        self.assertEqual([], result.diff.removed)
+        self.assertEqual(['extra'], ID3(id3_file).get('TXXX:extra'))
+
+        result = copy_tags(flac_file, id3_file, delete=True)
+
+        self.assertTrue(result.saved)
+        self.assertEqual(['TXXX:extra'], result.diff.removed)
+        self.assertIsNone(ID3(id3_file).get('TXXX:extra'))
+
+        self.assertFalse(copy_tags(flac_file, id3_file, delete=True).saved)
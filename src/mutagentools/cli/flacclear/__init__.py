@@ -2,26 +2,75 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import sys
 
 from mutagen.flac import FLAC
 
+from mutagentools.cli.batch import (
+    add_input_arguments, add_jobs_arguments, add_journal_arguments, add_profile_arguments, add_write_arguments,
+    check_jobs_arguments, close_journal, inputs_from_arguments, journal_from_arguments, profiler_from_arguments,
+    report_error, report_profile, run_batch, writer_from_arguments,
+)
+from mutagentools.atomic import save_file
+from mutagentools.profiling import phase
+from mutagentools.flac.clear import clear_in_place
 
-def main():
+
+def main(args=sys.argv[1:]):
     parser = argparse.ArgumentParser(description="Clear all tags from a FLAC file.")
     parser.add_argument('-v', '--verbose', action='store_true', help="Verbose output.")
-    parser.add_argument('flac_file', type=argparse.FileType('r'), nargs='+',
-        help="FLAC file(s) to remove tags from.")
-    args = parser.parse_args()
+    parser.add_argument('-i', '--in-place', action='store_true',
+        help="Replace tags and pictures with padding without moving audio data, writing only the metadata region.")
+    add_jobs_arguments(parser)
+    add_profile_arguments(parser)
+    add_write_arguments(parser)
+    add_journal_arguments(parser)
+    add_input_arguments(parser, 'flac_file', help="FLAC file(s) to remove tags from.")
+    args = parser.parse_args(args)
+    files = inputs_from_arguments(parser, args, 'flac_file', ('.flac',))
+
+    check_jobs_arguments(parser, args)
+    profiler = profiler_from_arguments(parser, args, processes=args.processes)
+    writer = writer_from_arguments(parser, args)
+    journal = journal_from_arguments(parser, args)
+
+    if writer and args.in_place:
+        # rewriting a copy of the whole file would defeat writing only the metadata region
+        parser.error("--atomic can't be used with --in-place")
+
+    failed, written = 0, 0
+
+    for result in run_batch(clear_in_place if args.in_place else clear_file, files,
+            jobs=args.jobs, processes=args.processes, profiler=profiler, writer=writer, journal=journal):
+        if result.error:
+            failed += 1
+            report_error(result, "remove FLAC tags from")
+        elif args.verbose and args.in_place:
+            written += result.value
+            print("Removed FLAC tags and pictures from {} ({} bytes written).".format(result.item, result.value))
+        elif args.verbose:
+            print("Removed FLAC tags and pictures from {}.".format(result.item))
+
+    if args.verbose and args.in_place:
+        print("Wrote {} bytes in total.".format(written))
+
+    close_journal(journal)
+    report_profile(profiler, args)
+
+    return 1 if failed else 0
+
+
+def clear_file(filename):
+    """Removes all Vorbis comments and pictures from a FLAC file."""
+    with phase('parse'):
+        f = FLAC(filename)
 
-    for flac_file in args.flac_file:
-        if args.verbose:
-            print("Removing FLAC tags and pictures from {}...".format(flac_file.name))
+    f.clear()
+    f.clear_pictures()
 
-        f = FLAC(flac_file.name)
-        f.clear()
-        f.clear_pictures()
-        f.save()
+    with phase('save'):
+        save_file(filename, f.save)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
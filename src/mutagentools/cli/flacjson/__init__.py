@@ -1,32 +1,95 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from mutagentools.flac import to_json_dict
-
-from mutagen.flac import FLAC
+from mutagentools.cli.batch import (
+    add_cache_arguments, add_input_arguments, add_jobs_arguments, add_profile_arguments, cache_from_arguments,
+    check_jobs_arguments, inputs_from_arguments, profiler_from_arguments, report_error, report_profile, run_batch,
+)
+from mutagentools.flac import read_metadata, to_json_dict
+from mutagentools.jsonstream import write_json, write_json_array
+from mutagentools.profiling import phase
 
 import argparse
-import json
+import functools
+import os
+import sys
 
 
-def main():
+def main(args=sys.argv[1:]):
     parser = argparse.ArgumentParser(description="Renders a file's FLAC tags in JSON format.")
     parser.add_argument('-n', '--no-flatten', action='store_true', help="Don't flatten single-entry arrays.")
     parser.add_argument('-p', '--pictures', action="store_true", help="Include base64-encoded pictures in output.")
-    parser.add_argument('flac_file', type=argparse.FileType('r'), nargs='+',
-        help="File(s) to extract information from.")
-    args = parser.parse_args()
+    parser.add_argument('--pictures-dir', metavar='DIR',
+        help="Write each unique picture once into DIR, named by its content hash, and reference it by hash in the "
+            "output instead of embedding base64 data. Implies --pictures.")
+    parser.add_argument('--ndjson', action='store_true',
+        help="Stream one compact JSON object per line as each file is read instead of a single JSON array.")
+    add_cache_arguments(parser)
+    add_jobs_arguments(parser)
+    add_profile_arguments(parser)
+    add_input_arguments(parser, 'flac_file', help="File(s) to extract information from.")
+    args = parser.parse_args(args)
+    files = inputs_from_arguments(parser, args, 'flac_file', ('.flac',))
+
+    check_jobs_arguments(parser, args)
+    profiler = profiler_from_arguments(parser, args, processes=args.processes)
+    cache = cache_from_arguments(parser, args)
+
+    if args.pictures_dir and not os.path.isdir(args.pictures_dir):
+        os.makedirs(args.pictures_dir)
+
+    include_pics = args.pictures or bool(args.pictures_dir)
+    export = functools.partial(export_file, include_pics=include_pics, pictures_dir=args.pictures_dir,
+        flatten=not args.no_flatten, stream_pictures=True, cache=cache)
+
+    failed = []
+
+    def records():
+        for result in run_batch(export, files, jobs=args.jobs,
+                processes=args.processes, profiler=profiler):
+            if result.error:
+                failed.append(result)
+                report_error(result, "read tags from")
+            else:
+                yield result.value
+
+    # pictures are encoded as they are written, and records written as they are read, to keep memory use bounded
+    if args.ndjson:
+        for record in records():
+            with phase('json'):
+                write_json(record, sys.stdout, sort_keys=True)
+
+            sys.stdout.write("\n")
+            sys.stdout.flush()
+    else:
+        write_json_array(records(), sys.stdout, sort_keys=True, indent=2)
+
+        sys.stdout.write("\n")
+
+    if cache is not None:
+        cache.close()
+
+    report_profile(profiler, args)
+
+    return 1 if failed else 0
+
 
-    result = []
+def export_file(filename, include_pics=False, pictures_dir=None, flatten=True, stream_pictures=False, cache=None):
+    """
+    Reads a FLAC file's tags into a JSON-compatible record, with pictures as Base64Data if stream_pictures is set.
 
-    for flac_file in args.flac_file:
-        result.append({
-            'file': flac_file.name,
-            'tags': to_json_dict(FLAC(flac_file.name), include_pics=args.pictures, flatten=not args.no_flatten)
-        })
+    If an ExportCache is given, the tags are taken from it if the file is unchanged since they were cached.
+    """
+    # only read picture payloads from disk if they are going to be output
+    def render():
+        return to_json_dict(read_metadata(filename, pictures=include_pics), include_pics=include_pics,
+            pictures_dir=pictures_dir, flatten=flatten, stream_pictures=stream_pictures)
 
-    print(json.dumps(result, sort_keys=True, indent=2))
+    return {
+        'file': filename,
+        'tags': cache.cached(filename, ['flac', include_pics, flatten], render) if cache is not None else render(),
+    }
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
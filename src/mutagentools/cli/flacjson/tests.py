@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+from mutagentools.cli.flacjson import main as flacjson_main
+
+FILENAME = os.path.realpath(__file__)
+DIRNAME = os.path.dirname(FILENAME)
+
+FIXTURE = os.path.join(DIRNAME, *('../../flac/fixtures/fixture.flac'.split('/')))
+BLANK = os.path.join(DIRNAME, *('../../flac/fixtures/blank.flac'.split('/')))
+
+
+class IntegrationTest(unittest.TestCase):
+
+    def test_json(self):
+        """Tests that the default output is a single JSON array."""
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            flacjson_main([FIXTURE, BLANK])
+
+        result = json.loads(stdout.getvalue())
+
+        self.assertEqual(2, len(result))
+        self.assertEqual('Album', result[0].get('tags').get('album'))
+        self.assertEqual({}, result[1].get('tags'))
+
+    def test_inputs(self):
+        """Tests that files are also taken from directories walked with -r and NUL-delimited paths on stdin."""
+        directory = tempfile.mkdtemp()
+
+        try:
+            shutil.copy(FIXTURE, os.path.join(directory, 'a.FLAC'))
+            open(os.path.join(directory, 'cover.jpg'), 'w').close()
+
+            with patch('sys.stdout', new_callable=io.StringIO) as stdout, \
+                    patch('sys.stdin', io.StringIO()) as stdin:
+                stdin.buffer = io.BytesIO((BLANK + '\0' + FIXTURE + '\0').encode('utf-8'))
+                self.assertEqual(0, flacjson_main(['--ndjson', '-r', directory, '--from-file', '-', BLANK]))
+
+            self.assertEqual([BLANK, os.path.join(directory, 'a.FLAC'), BLANK, FIXTURE],
+                [json.loads(line)['file'] for line in stdout.getvalue().splitlines()])
+
+            with patch('sys.stderr', new_callable=io.StringIO), self.assertRaises(SystemExit):
+                flacjson_main(['--ndjson'])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_ndjson(self):
+        """Tests that --ndjson writes one compact JSON object per line."""
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            flacjson_main(['--ndjson', FIXTURE, BLANK])
+
+        lines = stdout.getvalue().splitlines()
+
+        self.assertEqual(2, len(lines))
+        self.assertEqual({'file': FIXTURE, 'tags': {'album': 'Album', 'artist': ['Artist 1', 'Artist 2']}},
+            json.loads(lines[0]))
+        self.assertEqual({'file': BLANK, 'tags': {}}, json.loads(lines[1]))
+
+    def test_jobs_errors(self):
+        """Tests that output order is kept with several jobs and that unreadable files are reported and skipped."""
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout, \
+                patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            self.assertEqual(1, flacjson_main(['--ndjson', '-j', '3', FIXTURE, FILENAME, BLANK, FIXTURE]))
+
+        self.assertEqual([FIXTURE, BLANK, FIXTURE], [json.loads(l).get('file') for l in stdout.getvalue().splitlines()])
+        self.assertIn(FILENAME, stderr.getvalue())
+
+    def test_cache(self):
+        """Tests that cached tags are output as they were rendered."""
+        directory = tempfile.mkdtemp()
+        cache = os.path.join(directory, 'cache.db')
+
+        try:
+            outputs = []
+
+            for _ in range(2):
+                with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+                    self.assertEqual(0, flacjson_main(['--cache', cache, FIXTURE, BLANK]))
+
+                outputs.append(stdout.getvalue())
+
+            with patch('sys.stdout', new_callable=io.StringIO) as stdout, \
+                    patch('mutagentools.cli.flacjson.read_metadata') as read_metadata:
+                self.assertEqual(0, flacjson_main(['--cache', cache, FIXTURE, BLANK]))
+
+            self.assertEqual(0, read_metadata.call_count)
+            self.assertEqual(outputs[0], outputs[1])
+            self.assertEqual(outputs[0], stdout.getvalue())
+
+            # pictures are streamed from the file, so aren't cached
+            with patch('sys.stderr', new_callable=io.StringIO) as stderr, self.assertRaises(SystemExit):
+                flacjson_main(['--pictures', '--cache', cache, FIXTURE])
+
+            self.assertIn("--cache can't be used with --pictures", stderr.getvalue())
+        finally:
+            shutil.rmtree(directory)
@@ -3,28 +3,84 @@
 
 from mutagen.mp3 import MP3
 
+from mutagentools.atomic import save_file
+from mutagentools.cli.batch import (
+    add_input_arguments, add_jobs_arguments, add_journal_arguments, add_profile_arguments, add_write_arguments,
+    check_jobs_arguments, close_journal, inputs_from_arguments, journal_from_arguments, profiler_from_arguments,
+    report_error, report_profile, run_batch, writer_from_arguments,
+)
+from mutagentools.profiling import phase
 from mutagentools.id3 import strip_private_tags
+from mutagentools.padding import PaddingPolicy, save_with_padding
 
 import argparse
+import functools
+import sys
 
 
-def main():
+def main(args=sys.argv[1:]):
     parser = argparse.ArgumentParser(description="Removes private identifying tags from MP3 files.")
     parser.add_argument('-v', '--verbose', help="Verbose output.", action="store_true")
-    parser.add_argument('id3_file', help="MP3 file(s) to strip tracker tags from.", type=argparse.FileType('r'),
-        nargs="+")
-    args = parser.parse_args()
+    parser.add_argument('--padding', type=int, metavar='BYTES',
+        help="Padding to leave when a tag has to be resized (default: chosen by mutagen).")
+    parser.add_argument('--max-padding', type=int, metavar='BYTES',
+        help="Shrink tags with more than this much padding; by default existing padding is always kept.")
+    add_jobs_arguments(parser)
+    add_profile_arguments(parser)
+    add_write_arguments(parser)
+    add_journal_arguments(parser)
+    add_input_arguments(parser, 'id3_file', help="MP3 file(s) to strip tracker tags from.")
+    args = parser.parse_args(args)
+    files = inputs_from_arguments(parser, args, 'id3_file', ('.mp3',))
 
-    for id3_file in args.id3_file:
-        if args.verbose:
-            print("Stripping private identifying tags from {}...".format(id3_file.name))
+    check_jobs_arguments(parser, args)
+    profiler = profiler_from_arguments(parser, args, processes=args.processes)
+    writer = writer_from_arguments(parser, args)
+    journal = journal_from_arguments(parser, args)
 
-        private_tags = strip_private_tags(MP3(id3_file.name))
+    clean = functools.partial(clean_file, padding=PaddingPolicy(target=args.padding, maximum=args.max_padding))
+    failed = 0
+
+    for result in run_batch(clean, files, jobs=args.jobs,
+            processes=args.processes, profiler=profiler, writer=writer, journal=journal):
+        if result.error:
+            failed += 1
+            report_error(result, "strip private tags from")
+            continue
+
+        private_tags, in_place = result.value
+
+        if args.verbose and private_tags:
+            print("Stripped private identifying tags from {} ({}).".format(result.item,
+                "in place" if in_place else "rewritten"))
 
-        if args.verbose and len(private_tags) > 0:
             for tag in private_tags:
-                print("  Removing Tag {}...".format(tag))
+                print("  Removed Tag {}.".format(tag))
+        elif args.verbose:
+            print("No private identifying tags in {}.".format(result.item))
+
+    close_journal(journal)
+    report_profile(profiler, args)
+
+    return 1 if failed else 0
+
+
+def clean_file(filename, padding=None):
+    """
+    Strips private identifying tags from an MP3 file, saving it only if any were found.
+
+    Returns the keys of the removed tags, and whether the file was saved in place, or None if it wasn't saved.
+    """
+    with phase('parse'):
+        mp3 = MP3(filename)
+
+    private_tags = strip_private_tags(mp3, save=False)
+
+    if not private_tags:
+        return private_tags, None
+
+    return private_tags, save_file(filename, lambda target: save_with_padding(mp3, padding, target))
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
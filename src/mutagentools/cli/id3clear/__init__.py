@@ -2,25 +2,61 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import sys
 
 from mutagen.id3 import ID3
 
+from mutagentools.cli.batch import (
+    add_input_arguments, add_jobs_arguments, add_journal_arguments, add_profile_arguments, add_write_arguments,
+    check_jobs_arguments, close_journal, inputs_from_arguments, journal_from_arguments, profiler_from_arguments,
+    report_error, report_profile, run_batch, writer_from_arguments,
+)
+from mutagentools.atomic import save_file
+from mutagentools.profiling import phase
 
-def main():
+
+def main(args=sys.argv[1:]):
     parser = argparse.ArgumentParser(description="Clear all ID3 tags from a file.")
     parser.add_argument('-v', '--verbose', action='store_true', help="Verbose output.")
-    parser.add_argument('id3_file', type=argparse.FileType('r'), nargs='+',
-        help="ID3 containing file(s) to remove tags from.")
-    args = parser.parse_args()
+    add_jobs_arguments(parser)
+    add_profile_arguments(parser)
+    add_write_arguments(parser)
+    add_journal_arguments(parser)
+    add_input_arguments(parser, 'id3_file', help="ID3 containing file(s) to remove tags from.")
+    args = parser.parse_args(args)
+    files = inputs_from_arguments(parser, args, 'id3_file', ('.mp3',))
+
+    check_jobs_arguments(parser, args)
+    profiler = profiler_from_arguments(parser, args, processes=args.processes)
+    writer = writer_from_arguments(parser, args)
+    journal = journal_from_arguments(parser, args)
+
+    failed = 0
+
+    for result in run_batch(clear_file, files, jobs=args.jobs,
+            processes=args.processes, profiler=profiler, writer=writer, journal=journal):
+        if result.error:
+            failed += 1
+            report_error(result, "remove ID3 tags from")
+        elif args.verbose:
+            print("Removed ID3 tags from {}.".format(result.item))
+
+    close_journal(journal)
+    report_profile(profiler, args)
+
+    return 1 if failed else 0
+
+
+def clear_file(filename):
+    """Removes all ID3 tags from a file."""
+    with phase('parse'):
+        f = ID3(filename)
 
-    for id3_file in args.id3_file:
-        if args.verbose:
-            print("Removing ID3 tags from {}...".format(id3_file.name))
+    f.clear()
 
-        f = ID3(id3_file.name)
-        f.clear()
-        f.save()
+    with phase('save'):
+        save_file(filename, f.save)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
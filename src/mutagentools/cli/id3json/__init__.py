@@ -2,30 +2,99 @@
 # -*- coding: utf-8 -*-
 
 import argparse
-import json
+import functools
+import os
+import sys
 
 from mutagen.mp3 import MP3
+from mutagentools.cli.batch import (
+    add_cache_arguments, add_input_arguments, add_jobs_arguments, add_profile_arguments, cache_from_arguments,
+    check_jobs_arguments, inputs_from_arguments, profiler_from_arguments, report_error, report_profile, run_batch,
+)
 from mutagentools.id3 import to_json_dict
+from mutagentools.jsonstream import write_json, write_json_array
+from mutagentools.profiling import phase
 
 
-def main():
+def main(args=sys.argv[1:]):
     parser = argparse.ArgumentParser(description="Renders a file's ID3 tags in JSON format.")
     parser.add_argument('-n', '--no-flatten', action='store_true', help="Don't flatten single-entry arrays.")
     parser.add_argument('-p', '--pictures', action="store_true", help="Include base64-encoded pictures in output.")
-    parser.add_argument('id3_file', type=argparse.FileType('r'), nargs='+',
-        help="File(s) to extract information from.")
-    args = parser.parse_args()
+    parser.add_argument('--pictures-dir', metavar='DIR',
+        help="Write each unique picture once into DIR, named by its content hash, and reference it by hash in the "
+            "output instead of embedding base64 data. Implies --pictures.")
+    parser.add_argument('--ndjson', action='store_true',
+        help="Stream one compact JSON object per line as each file is read instead of a single JSON array.")
+    add_cache_arguments(parser)
+    add_jobs_arguments(parser)
+    add_profile_arguments(parser)
+    add_input_arguments(parser, 'id3_file', help="File(s) to extract information from.")
+    args = parser.parse_args(args)
+    files = inputs_from_arguments(parser, args, 'id3_file', ('.mp3',))
 
-    result = []
+    check_jobs_arguments(parser, args)
+    profiler = profiler_from_arguments(parser, args, processes=args.processes)
+    cache = cache_from_arguments(parser, args)
 
-    for id3_file in args.id3_file:
-        result.append({
-            'file': id3_file.name,
-            'tags': to_json_dict(MP3(id3_file.name).tags or {}, include_pics=args.pictures, flatten=not args.no_flatten)
-        })
+    if args.pictures_dir and not os.path.isdir(args.pictures_dir):
+        os.makedirs(args.pictures_dir)
 
-    print(json.dumps(result, sort_keys=True, indent=2))
+    export = functools.partial(export_file, include_pics=args.pictures or bool(args.pictures_dir),
+        pictures_dir=args.pictures_dir, flatten=not args.no_flatten, stream_pictures=True, cache=cache)
+
+    failed = []
+
+    def records():
+        for result in run_batch(export, files, jobs=args.jobs,
+                processes=args.processes, profiler=profiler):
+            if result.error:
+                failed.append(result)
+                report_error(result, "read tags from")
+            else:
+                yield result.value
+
+    # pictures are encoded as they are written, and records written as they are read, to keep memory use bounded
+    if args.ndjson:
+        for record in records():
+            with phase('json'):
+                write_json(record, sys.stdout, sort_keys=True)
+
+            sys.stdout.write("\n")
+            sys.stdout.flush()
+    else:
+        write_json_array(records(), sys.stdout, sort_keys=True, indent=2)
+
+        sys.stdout.write("\n")
+
+    if cache is not None:
+        cache.close()
+
+    report_profile(profiler, args)
+
+    return 1 if failed else 0
+
+
+def export_file(filename, include_pics=False, pictures_dir=None, flatten=True, stream_pictures=False, cache=None):
+    """
+    Reads an MP3 file's ID3 tags into a JSON-compatible record, with pictures as Base64Data if stream_pictures is set.
+
+    If an ExportCache is given, the tags are taken from it if the file is unchanged since they were cached.
+    """
+    def render():
+        return to_json_dict(load_tags(filename), include_pics=include_pics, pictures_dir=pictures_dir,
+            flatten=flatten, stream_pictures=stream_pictures)
+
+    return {
+        'file': filename,
+        'tags': cache.cached(filename, ['id3', include_pics, flatten], render) if cache is not None else render(),
+    }
+
+
+def load_tags(filename):
+    """Reads an MP3 file's ID3 tags, or an empty dictionary if it has none."""
+    with phase('parse'):
+        return MP3(filename).tags or {}
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import functools
+import sys
+
+from mutagen.id3 import ID3, ID3NoHeaderError
+
+from mutagentools.cli.batch import (
+    add_input_arguments, add_jobs_arguments, add_journal_arguments, add_profile_arguments, check_jobs_arguments,
+    close_journal, inputs_from_arguments, journal_from_arguments, profiler_from_arguments, report_error, report_profile,
+    run_batch,
+)
+from mutagentools.profiling import phase
+from mutagentools.padding import PaddingPolicy, save_with_padding
+
+
+DEFAULT_PADDING = 16 * 1024
+
+
+def main(args=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description="Gives ID3 tags enough padding for later edits to be made in place.")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Verbose output.")
+    parser.add_argument('-p', '--padding', type=int, default=DEFAULT_PADDING, metavar='BYTES',
+        help="Amount of padding to give each tag (default: {}).".format(DEFAULT_PADDING))
+    parser.add_argument('--max-padding', type=int, metavar='BYTES',
+        help="Also shrink tags with more than this much padding down to --padding.")
+    parser.add_argument('--exact', action='store_true',
+        help="Give every tag exactly --padding bytes of padding, even those which already have more.")
+    add_jobs_arguments(parser)
+    add_profile_arguments(parser)
+    add_journal_arguments(parser)
+    add_input_arguments(parser, 'id3_file', help="MP3 file(s) to pad.")
+    args = parser.parse_args(args)
+    files = inputs_from_arguments(parser, args, 'id3_file', ('.mp3',))
+
+    check_jobs_arguments(parser, args)
+    profiler = profiler_from_arguments(parser, args, processes=args.processes)
+    journal = journal_from_arguments(parser, args)
+
+    if args.padding < 0:
+        parser.error("--padding must not be negative")
+
+    if args.exact:
+        policy = PaddingPolicy(target=args.padding, minimum=args.padding, maximum=args.padding)
+    else:
+        policy = PaddingPolicy(target=args.padding, minimum=args.padding, maximum=args.max_padding)
+
+    failed, rewritten, padded = 0, 0, 0
+
+    for result in run_batch(functools.partial(pad_file, padding=policy), files,
+            jobs=args.jobs, processes=args.processes, profiler=profiler, journal=journal):
+        if result.error:
+            failed += 1
+            report_error(result, "pad")
+            continue
+
+        padded += 1
+        rewritten += 0 if result.value else 1
+
+        if args.verbose:
+            print("Padded {} ({}).".format(result.item, "in place" if result.value else "rewritten"))
+
+    if args.verbose:
+        print("Rewrote {} of {} file(s).".format(rewritten, padded))
+
+    close_journal(journal)
+    report_profile(profiler, args)
+
+    return 1 if failed else 0
+
+
+def pad_file(filename, padding):
+    """Saves a file's ID3 tags, creating them if necessary, with the given padding function."""
+    try:
+        with phase('parse'):
+            tags = ID3(filename)
+    except ID3NoHeaderError:
+        tags = ID3()
+
+    return save_with_padding(tags, padding, filename)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
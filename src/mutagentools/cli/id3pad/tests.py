@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mutagen.id3 import ID3, Encoding, TIT2
+from mutagentools.cli.id3pad import main as id3pad_main
+
+FILENAME = os.path.realpath(__file__)
+DIRNAME = os.path.dirname(FILENAME)
+
+
+class IntegrationTest(unittest.TestCase):
+
+    def test_id3pad(self):
+        """Tests that files are padded once and left alone afterwards."""
+        directory = tempfile.mkdtemp()
+        filename = os.path.join(directory, 'file.mp3')
+        shutil.copy(os.path.join(DIRNAME, *('../../id3/fixtures/no-id3.mp3'.split('/'))), filename)
+
+        try:
+            original_size = os.path.getsize(filename)
+
+            self.assertEqual(0, id3pad_main(['--padding', '4096', filename]))
+            padded_size = os.path.getsize(filename)
+            self.assertLessEqual(original_size + 4096, padded_size)
+
+            # editing the tag afterwards doesn't change the size of the file
+            tags = ID3(filename)
+            tags.add(TIT2(encoding=Encoding.UTF8, text="Title"))
+            tags.save(filename, padding=lambda info: info.padding)
+            self.assertEqual(padded_size, os.path.getsize(filename))
+
+            # padding again with a smaller amount keeps the larger existing padding
+            self.assertEqual(0, id3pad_main(['--padding', '1024', filename]))
+            self.assertEqual(padded_size, os.path.getsize(filename))
+
+            # unless asked to be exact
+            self.assertEqual(0, id3pad_main(['--padding', '1024', '--exact', filename]))
+            self.assertGreater(padded_size, os.path.getsize(filename))
+            self.assertEqual(['Title'], ID3(filename).get('TIT2'))
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+
+import argparse
+import functools
+import os
+import sys
+import time
+
+from mutagen.mp3 import MP3
+
+from mutagentools.cli.batch import (
+    add_input_arguments, add_jobs_arguments, add_profile_arguments, check_jobs_arguments, inputs_from_arguments,
+    profiler_from_arguments, report_error, report_profile, run_batch,
+)
+from mutagentools.cli.flac2id3 import find_pairs
+from mutagentools.flac import convert_flac_to_id3, read_metadata
+from mutagentools.flac.convert import DEFAULT_MAPPING
+from mutagentools.flac.mapping import load_mapping
+from mutagentools.id3 import strip_private_tags, to_json_dict
+from mutagentools.id3.diff import apply_diff, diff_tags, has_id3v1
+from mutagentools.jsonstream import write_json
+from mutagentools.padding import PaddingPolicy, save_with_padding
+from mutagentools.pictures import PicturePolicy, parse_picture_type
+from mutagentools.profiling import phase
+
+
+PipelineOptions = namedtuple('PipelineOptions', ['picture_policy', 'mapping', 'padding', 'include_pics', 'flatten'])
+PipelineOptions.__doc__ = """Options for the stages of a pipeline, shared by every file."""
+
+PipelineResult = namedtuple('PipelineResult', ['record', 'removed', 'saved', 'in_place'])
+PipelineResult.__doc__ = """
+The outcome of running a file through a pipeline: its exported record if there was an export stage, the keys of the
+private tags stripped from it, whether it was saved and if so whether in place.
+"""
+
+
+class PipelineFile(object):
+    """The state of one file as it passes through the stages of a pipeline."""
+
+    def __init__(self, flac_file, id3_file, tags):
+        self.flac_file = flac_file
+        self.id3_file = id3_file
+        self.tags = tags
+        self.modified = False
+        self.record = None
+        self.removed = []
+
+
+def clear_stage(f, options):
+    """Removes every tag."""
+    if len(f.tags):
+        f.tags.clear()
+        f.modified = True
+
+
+def convert_stage(f, options):
+    """
+    Adds the tags converted from the file's FLAC counterpart, replacing tags of the same kind. Only frames which differ
+    are changed, and the file is only marked modified if any do, or if its tags aren't ID3v2.4 or it has no ID3v1 tags
+    yet, as with flac2id3.
+    """
+    if f.flac_file is None:
+        raise ValueError("No FLAC file to convert tags from for {}".format(f.id3_file))
+
+    frames = convert_flac_to_id3(read_metadata(f.flac_file, pictures=True), picture_policy=options.picture_policy,
+        mapping=options.mapping)
+    diff = diff_tags(f.tags, frames)
+
+    apply_diff(f.tags, frames, diff)
+
+    f.modified = f.modified or bool(diff) or f.tags.version != (2, 4, 0) or not has_id3v1(f.id3_file)
+
+
+def strip_stage(f, options):
+    """Removes private identifying tags."""
+    removed = strip_private_tags(f.tags, save=False)
+
+    f.removed.extend(removed)
+    f.modified = f.modified or bool(removed)
+
+
+def export_stage(f, options):
+    """Renders the tags as they are at this point of the pipeline into a JSON-compatible record."""
+    f.record = {
+        'file': f.id3_file,
+        'tags': to_json_dict(f.tags, include_pics=options.include_pics, flatten=options.flatten, stream_pictures=True),
+    }
+
+
+STAGES = {
+    'clear': clear_stage,
+    'convert': convert_stage,
+    'strip': strip_stage,
+    'export': export_stage,
+}
+
+# stages in the order they're usually run in
+STAGE_ORDER = ('clear', 'convert', 'strip', 'export')
+
+
+def parse_stages(value):
+    """Parses a comma-separated list of stage names."""
+    stages = tuple(s.strip() for s in value.split(',') if s.strip())
+
+    for stage in stages:
+        if stage not in STAGES:
+            raise argparse.ArgumentTypeError("unknown stage {!r}; choose from {}".format(stage,
+                ', '.join(STAGE_ORDER)))
+
+    if not stages:
+        raise argparse.ArgumentTypeError("at least one stage is required")
+
+    return stages
+
+
+def main(args=sys.argv[1:]):
+    parser = argparse.ArgumentParser(prog='mutagentools pipeline', description="Runs MP3 files through an ordered "
+        "list of stages, reading each file once and saving it at most once at the end.")
+    parser.add_argument('-s', '--stages', type=parse_stages,
+        help="Comma-separated stages to run in order, from {} (default: {} with --tree, otherwise {}).".format(
+            ', '.join(STAGE_ORDER), ','.join(STAGE_ORDER[1:]), ','.join(STAGE_ORDER[2:])))
+    parser.add_argument('-v', '--verbose', action='store_true', help="Verbose output, written to stderr.")
+    parser.add_argument('-t', '--tree', nargs=2, metavar=('SRC_DIR', 'DST_DIR'),
+        help="Run every MP3 file in DST_DIR which has a FLAC file at the same relative path in SRC_DIR through the "
+            "pipeline. Required by the convert stage.")
+    parser.add_argument('--dedupe-pictures', action='store_true',
+        help="Only convert the first of several byte-identical pictures.")
+    parser.add_argument('--picture-type', action='append', type=parse_picture_type, metavar='TYPE',
+        help="Only convert pictures of this type, given as a number or name such as COVER_FRONT. May be repeated.")
+    parser.add_argument('--max-picture-size', type=int, metavar='BYTES',
+        help="Skip pictures larger than this many bytes when converting.")
+    parser.add_argument('--mapping', metavar='FILE',
+        help="JSON file of extra Vorbis to ID3 mapping rules, which take precedence over the built-in rules.")
+    parser.add_argument('--padding', type=int, metavar='BYTES',
+        help="Padding to leave when a tag has to be resized (default: chosen by mutagen).")
+    parser.add_argument('--max-padding', type=int, metavar='BYTES',
+        help="Shrink tags with more than this much padding; by default existing padding is always kept.")
+    parser.add_argument('-n', '--no-flatten', action='store_true', help="Don't flatten single-entry arrays on export.")
+    parser.add_argument('-p', '--pictures', action='store_true', help="Include base64-encoded pictures on export.")
+    add_jobs_arguments(parser)
+    add_profile_arguments(parser)
+    add_input_arguments(parser, 'id3_file', help="MP3 file(s) to run through the pipeline.")
+    args = parser.parse_args(args)
+
+    check_jobs_arguments(parser, args)
+
+    if bool(args.tree) == bool(args.id3_file or args.recursive or args.from_file):
+        parser.error("give either --tree or MP3 files, but not both")
+
+    if args.stages is None:
+        # only a tree has FLAC files to convert from
+        args.stages = STAGE_ORDER[1:] if args.tree else STAGE_ORDER[2:]
+
+    if 'convert' in args.stages and not args.tree:
+        parser.error("the convert stage requires --tree")
+
+    picture_policy = None
+
+    if args.dedupe_pictures or args.picture_type or args.max_picture_size is not None:
+        picture_policy = PicturePolicy(dedupe=args.dedupe_pictures, types=args.picture_type,
+            max_size=args.max_picture_size)
+
+    try:
+        mapping = load_mapping(args.mapping, DEFAULT_MAPPING) if args.mapping else None
+    except (IOError, ValueError) as e:
+        parser.error("unable to load mapping file {}: {}".format(args.mapping, e))
+
+    options = PipelineOptions(picture_policy=picture_policy, mapping=mapping,
+        padding=PaddingPolicy(target=args.padding, maximum=args.max_padding), include_pics=args.pictures,
+        flatten=not args.no_flatten)
+    profiler = profiler_from_arguments(parser, args, processes=args.processes)
+
+    if args.tree:
+        items = pairs_with_mp3(args.tree[0], args.tree[1])
+    else:
+        items = ((None, f) for f in inputs_from_arguments(parser, args, 'id3_file', ('.mp3',)))
+
+    worker = functools.partial(run_pipeline, stages=args.stages, options=options)
+    counts = {'files': 0, 'saved': 0, 'rewritten': 0, 'failed': 0}
+    started = time.time()
+
+    for result in run_batch(worker, items, jobs=args.jobs, processes=args.processes, profiler=profiler):
+        flac_file, id3_file = result.item
+
+        if result.error:
+            counts['failed'] += 1
+            report_error(result._replace(item=id3_file), "run pipeline on")
+            continue
+
+        counts['files'] += 1
+        counts['saved'] += 1 if result.value.saved else 0
+        counts['rewritten'] += 1 if result.value.saved and not result.value.in_place else 0
+
+        if result.value.record is not None:
+            with phase('json'):
+                write_json(result.value.record, sys.stdout, sort_keys=True)
+
+            sys.stdout.write("\n")
+            sys.stdout.flush()
+
+        if args.verbose:
+            sys.stderr.write("Ran {} through {}{}.\n".format(id3_file, ', '.join(args.stages),
+                " ({})".format("saved in place" if result.value.in_place else "rewritten") if result.value.saved
+                else ""))
+
+            for tag in result.value.removed:
+                sys.stderr.write("  Removed Tag {}.\n".format(tag))
+
+    elapsed = time.time() - started
+
+    sys.stderr.write("Processed {} file(s) in {:.2f}s ({:.1f} files/sec); {} saved, {} rewritten, {} failed.\n".format(
+        counts['files'], elapsed, counts['files'] / elapsed if elapsed > 0 else 0.0, counts['saved'],
+        counts['rewritten'], counts['failed']))
+
+    report_profile(profiler, args)
+
+    return 1 if counts['failed'] else 0
+
+
+def pairs_with_mp3(src_dir, dst_dir):
+    """Yields the (flac_file, id3_file) pairs of two parallel trees, reporting FLAC files without an MP3 file."""
+    for flac_file, id3_file in find_pairs(src_dir, dst_dir):
+        if os.path.isfile(id3_file):
+            yield flac_file, id3_file
+        else:
+            sys.stderr.write("No MP3 file found for {}, skipping.\n".format(flac_file))
+
+
+def run_pipeline(item, stages, options):
+    """
+    Runs one (flac_file, id3_file) pair through the given stages, in order, and returns a PipelineResult.
+
+    The MP3 file is read once, every stage works on its tags in memory, and the tags are saved once at the end if any
+    stage changed them. flac_file may be None if no stage needs it.
+    """
+    flac_file, id3_file = item
+
+    with phase('parse'):
+        mp3 = MP3(id3_file)
+
+    if mp3.tags is None:
+        mp3.add_tags()
+
+    f = PipelineFile(flac_file, id3_file, mp3.tags)
+
+    for stage in stages:
+        STAGES[stage](f, options)
+
+    in_place = None
+
+    if f.modified:
+        # write ID3v1 tags along with converted tags, as flac2id3 does; otherwise only update existing ones
+        in_place = save_with_padding(mp3.tags, options.padding, id3_file, 2 if 'convert' in stages else 1, 4)
+
+    return PipelineResult(f.record, f.removed, f.modified, in_place)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+from mutagen.id3 import ID3, PRIV, TIT2, Encoding, delete
+from io import StringIO
+
+from mutagentools.cli import main as mutagentools_main
+from mutagentools.cli.pipeline import main as pipeline_main
+
+FILENAME = os.path.realpath(__file__)
+DIRNAME = os.path.dirname(FILENAME)
+
+
+class IntegrationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.src = tempfile.mkdtemp()
+        self.dst = tempfile.mkdtemp()
+
+        shutil.copy(os.path.join(DIRNAME, *('../../flac/fixtures/fixture.flac'.split('/'))),
+            os.path.join(self.src, 'track.flac'))
+
+        self.mp3 = os.path.join(self.dst, 'track.mp3')
+        shutil.copy(os.path.join(DIRNAME, *('../../id3/fixtures/no-id3.mp3'.split('/'))), self.mp3)
+
+        tags = ID3()
+        tags.add(TIT2(encoding=Encoding.UTF8, text="Old Title"))
+        tags.add(PRIV(owner="Google/StoreId", data=b"id"))
+        tags.save(self.mp3)
+
+    def tearDown(self):
+        shutil.rmtree(self.src)
+        shutil.rmtree(self.dst)
+
+    def run_pipeline(self, args):
+        with patch('sys.stdout', new_callable=StringIO) as stdout, patch('sys.stderr', new_callable=StringIO), \
+                patch('mutagen.id3.ID3.save', autospec=True, side_effect=ID3.save) as save:
+            self.assertEqual(0, mutagentools_main(['pipeline'] + args))
+
+        return [json.loads(line) for line in stdout.getvalue().splitlines()], save.call_count
+
+    def test_pipeline(self):
+        """Tests that converting, stripping and exporting saves each file once."""
+        records, saves = self.run_pipeline(['--tree', self.src, self.dst])
+
+        self.assertEqual(1, saves)
+        self.assertEqual(1, len(records))
+        self.assertEqual(self.mp3, records[0]['file'])
+        self.assertEqual('Album', records[0]['tags']['TALB'])
+        self.assertNotIn('PRIV', records[0]['tags'])
+
+        tags = ID3(self.mp3)
+        self.assertEqual(['Album'], tags['TALB'].text)
+        self.assertEqual([], tags.getall('PRIV'))
+
+    def test_pipeline_in_sync(self):
+        """Tests that converting saves files missing ID3v1 tags and leaves files already in sync alone."""
+        self.assertEqual(1, self.run_pipeline(['--tree', self.src, self.dst])[1])
+        self.assertEqual(0, self.run_pipeline(['--tree', self.src, self.dst])[1])
+
+        delete(self.mp3, delete_v1=True, delete_v2=False)
+
+        self.assertEqual(1, self.run_pipeline(['--tree', self.src, self.dst])[1])
+        self.assertEqual(0, self.run_pipeline(['--tree', self.src, self.dst])[1])
+
+    def test_pipeline_order(self):
+        """Tests that stages run in the order given and files which aren't changed aren't saved."""
+        records, saves = self.run_pipeline(['-s', 'export,strip,export', self.mp3])
+
+        self.assertEqual(1, saves)
+        # only the record of the last export stage is output
+        self.assertEqual([self.mp3], [r['file'] for r in records])
+        self.assertNotIn('PRIV', records[0]['tags'])
+
+        records, saves = self.run_pipeline(['-s', 'strip,export', self.mp3])
+
+        self.assertEqual(0, saves)
+        self.assertEqual('Old Title', records[0]['tags']['TIT2'])
+
+    def test_pipeline_default_stages(self):
+        """Tests that without --tree the default stages strip and export the files given."""
+        records, saves = self.run_pipeline([self.mp3])
+
+        self.assertEqual(1, saves)
+        self.assertEqual([self.mp3], [r['file'] for r in records])
+        self.assertEqual('Old Title', records[0]['tags']['TIT2'])
+        self.assertNotIn('PRIV', records[0]['tags'])
+
+    def test_pipeline_arguments(self):
+        """Tests that the convert stage requires FLAC files to convert from."""
+        with patch('sys.stderr', new_callable=StringIO):
+            self.assertRaises(SystemExit, pipeline_main, ['-s', 'convert', self.mp3])
+            self.assertRaises(SystemExit, pipeline_main, ['-s', 'bogus', self.mp3])
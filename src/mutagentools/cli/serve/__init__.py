@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from concurrent.futures import ThreadPoolExecutor
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+
+from mutagentools.cli.batch import format_error
+from mutagentools.cli.flac2id3 import copy_tags
+from mutagentools.cli.flacjson import export_file as export_flac
+from mutagentools.cli.id3clean import clean_file
+from mutagentools.cli.id3json import export_file as export_id3
+from mutagentools.utils import json_default
+
+
+def flacjson_request(request):
+    """Renders a FLAC file's tags as flacjson does."""
+    include_pics = request.get('pictures', False) or bool(request.get('pictures_dir'))
+
+    return export_flac(request['file'], include_pics=include_pics, pictures_dir=request.get('pictures_dir'),
+        flatten=request.get('flatten', True))
+
+
+def id3json_request(request):
+    """Renders an MP3 file's ID3 tags as id3json does."""
+    include_pics = request.get('pictures', False) or bool(request.get('pictures_dir'))
+
+    return export_id3(request['file'], include_pics=include_pics, pictures_dir=request.get('pictures_dir'),
+        flatten=request.get('flatten', True))
+
+
+def flac2id3_request(request):
+    """Copies the tags of a FLAC file to an MP3 file as flac2id3 does."""
+    result = copy_tags(request['flac_file'], request['id3_file'], delete=request.get('delete', False))
+
+    return {'saved': result.saved, 'in_place': result.in_place, 'added': result.diff.added,
+        'changed': result.diff.changed, 'removed': result.diff.removed}
+
+
+def id3clean_request(request):
+    """Strips private identifying tags from an MP3 file as id3clean does."""
+    removed, in_place = clean_file(request['file'])
+
+    return {'removed': removed, 'in_place': in_place}
+
+
+# the commands the server answers, by the name of the command line tool they stand in for
+COMMANDS = {
+    'flacjson': flacjson_request,
+    'id3json': id3json_request,
+    'flac2id3': flac2id3_request,
+    'id3clean': id3clean_request,
+}
+
+
+def handle_request(line):
+    """
+    Answers one line of a request, a JSON object with a command and its arguments, returning the response as a dict.
+
+    The response echoes the request's id, and has either the command's result or an error message if it failed.
+    """
+    request_id = None
+
+    try:
+        request = json.loads(line)
+        request_id = request.get('id')
+        command = COMMANDS.get(request.get('command'))
+
+        if command is None:
+            raise ValueError("unknown command {!r}; choose from {}".format(request.get('command'),
+                ', '.join(sorted(COMMANDS))))
+
+        return {'id': request_id, 'result': command(request)}
+    except Exception as e:
+        return {'id': request_id, 'error': format_error(e)}
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Answers the newline-delimited JSON requests of one connection.
+
+    Requests are handed to the server's pool of workers as they are read and each response is written as soon as it
+    is ready, so responses may come back out of order and should be matched to requests by id. At most twice as many
+    requests as there are workers are in flight per connection; further requests are read once some are answered.
+    """
+
+    def handle(self):
+        lock = threading.Lock()
+        in_flight = threading.BoundedSemaphore(self.server.jobs * 2)
+        pending = []
+
+        def respond(future):
+            response = future.result()
+
+            try:
+                try:
+                    line = json.dumps(response, sort_keys=True, default=json_default)
+                except (TypeError, ValueError) as e:
+                    line = json.dumps({'id': response['id'], 'error': format_error(e)})
+
+                with lock:
+                    self.wfile.write((line + "\n").encode('utf-8'))
+                    self.wfile.flush()
+            except (IOError, OSError):
+                pass
+            finally:
+                in_flight.release()
+
+        for line in self.rfile:
+            if not line.strip():
+                continue
+
+            in_flight.acquire()
+            pending.append(self.server.executor.submit(handle_request, line.decode('utf-8')))
+            pending[-1].add_done_callback(respond)
+
+        # answer everything before the connection is closed
+        for _ in range(self.server.jobs * 2):
+            in_flight.acquire()
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """A Unix socket server answering requests from any number of connections with a shared pool of workers."""
+
+    daemon_threads = True
+
+    def __init__(self, path, jobs=1):
+        self.jobs = jobs
+        self.executor = ThreadPoolExecutor(max_workers=jobs)
+        socketserver.UnixStreamServer.__init__(self, path, RequestHandler)
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        self.executor.shutdown(wait=True)
+
+
+def remove_stale_socket(path):
+    """Removes a socket file left behind by a server which is no longer running, failing if one still is."""
+    if not os.path.exists(path):
+        return
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        probe.connect(path)
+    except socket.error:
+        os.unlink(path)
+    else:
+        raise IOError("a server is already listening on {}".format(path))
+    finally:
+        probe.close()
+
+
+def main(args=sys.argv[1:]):
+    parser = argparse.ArgumentParser(prog='mutagentools serve', description="Answers tag requests over a Unix socket "
+        "from a warm interpreter, so that reading each file doesn't pay for starting Python and importing mutagen. "
+        "Each line sent to the socket is a JSON object such as {\"id\": 1, \"command\": \"id3json\", \"file\": "
+        "\"/music/a.mp3\"}, and is answered by a line with the same id and either a result or an error.")
+    parser.add_argument('-s', '--socket', required=True, metavar='PATH', help="Path of the Unix socket to listen on.")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+        help="Number of requests to answer concurrently (default: number of CPUs).")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Verbose output, written to stderr.")
+    args = parser.parse_args(args)
+
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    try:
+        remove_stale_socket(args.socket)
+    except IOError as e:
+        parser.error(str(e))
+
+    server = Server(args.socket, jobs=args.jobs)
+
+    def terminate(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, terminate)
+
+    if args.verbose:
+        sys.stderr.write("Serving {} with {} worker(s).\n".format(args.socket, args.jobs))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(args.socket)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from mock import patch
+from mutagen.id3 import ID3, PRIV, TIT2, Encoding
+from io import StringIO
+
+from mutagentools.cli import main as mutagentools_main
+from mutagentools.cli.client import send_requests
+from mutagentools.cli.id3json import export_file
+from mutagentools.cli.serve import Server, handle_request, remove_stale_socket
+
+FILENAME = os.path.realpath(__file__)
+DIRNAME = os.path.dirname(FILENAME)
+
+
+class ServerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.socket = os.path.join(self.directory, 'socket')
+
+        self.flac = os.path.join(self.directory, 'track.flac')
+        shutil.copy(os.path.join(DIRNAME, *('../../flac/fixtures/fixture.flac'.split('/'))), self.flac)
+
+        self.mp3 = os.path.join(self.directory, 'track.mp3')
+        shutil.copy(os.path.join(DIRNAME, *('../../id3/fixtures/no-id3.mp3'.split('/'))), self.mp3)
+
+        tags = ID3()
+        tags.add(TIT2(encoding=Encoding.UTF8, text="Title"))
+        tags.add(PRIV(owner="Google/StoreId", data=b"id"))
+        tags.save(self.mp3)
+
+        self.server = Server(self.socket, jobs=3)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def test_handle_request(self):
+        """Tests that requests are answered with their id and either a result or an error."""
+        self.assertEqual({'id': 7, 'result': export_file(self.mp3)}, handle_request(json.dumps({'id': 7,
+            'command': 'id3json', 'file': self.mp3})))
+        self.assertEqual({'id': 8, 'error': "ValueError: unknown command 'id3pad'; choose from flac2id3, flacjson, "
+            "id3clean, id3json"}, handle_request('{"id": 8, "command": "id3pad"}'))
+        self.assertEqual(None, handle_request('not json')['id'])
+
+    def test_send_requests(self):
+        """Tests that many concurrent requests are answered and returned in order."""
+        requests = [{'command': 'id3json' if n % 2 else 'flacjson', 'file': self.mp3 if n % 2 else self.flac}
+            for n in range(50)] + [{'command': 'id3json', 'file': os.path.join(self.directory, 'missing.mp3')}]
+        responses = list(send_requests(self.socket, iter(requests), window=4))
+
+        self.assertEqual(list(range(51)), [r['id'] for r in responses])
+        self.assertEqual(['Title'] * 25, [r['result']['tags']['TIT2'] for r in responses[1:50:2]])
+        self.assertEqual(['Album'] * 25, [r['result']['tags']['album'] for r in responses[0:50:2]])
+        self.assertIn('error', responses[-1])
+
+    def test_client(self):
+        """Tests that the client prints what the command line tool it stands in for would."""
+        with patch('sys.stdout', new_callable=StringIO) as stdout:
+            self.assertEqual(0, mutagentools_main(['client', '--socket', self.socket, 'id3clean', '-v', self.mp3]))
+
+        self.assertEqual("Stripped private identifying tags from {} (in place).\n  Removed Tag PRIV:Google/StoreId:"
+            "id.\n".format(self.mp3), stdout.getvalue())
+        self.assertEqual([], ID3(self.mp3).getall('PRIV'))
+
+        with patch('sys.stdout', new_callable=StringIO) as stdout:
+            self.assertEqual(0, mutagentools_main(['client', '--socket', self.socket, 'id3json', '--ndjson',
+                self.mp3]))
+
+        self.assertEqual([export_file(self.mp3)], [json.loads(l) for l in stdout.getvalue().splitlines()])
+
+    def test_remove_stale_socket(self):
+        """Tests that a socket with a server listening on it is kept."""
+        self.assertRaises(IOError, remove_stale_socket, self.socket)
+        self.assertTrue(os.path.exists(self.socket))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import csv
+import functools
+import sys
+
+from mutagentools.cli.batch import (
+    add_cache_arguments, add_input_arguments, add_jobs_arguments, add_profile_arguments, cache_from_arguments,
+    check_jobs_arguments, inputs_from_arguments, profiler_from_arguments, report_error, report_profile, run_batch,
+)
+from mutagentools.cli.flacjson import export_file as export_flac
+from mutagentools.cli.id3json import export_file as export_id3
+from mutagentools.index import FORMATS, file_format, find_files, tag_rows
+
+
+# how each format's tags are rendered, by the format index.file_format gives
+EXPORTS = {
+    'flac': export_flac,
+    'mp3': export_id3,
+}
+
+
+def parse_columns(value):
+    """
+    Parses a comma-separated list of columns, returning a tuple of keys for each.
+
+    A column is a key, or several alternative keys separated by |, such as TALB|album, the first of which a file has
+    being used.
+    """
+    columns = [tuple(key.strip() for key in column.split('|')) for column in value.split(',') if column.strip()]
+
+    if not columns or any(not all(column) for column in columns):
+        raise argparse.ArgumentTypeError("invalid column list: {!r}".format(value))
+
+    return columns
+
+
+def main(args=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description="Exports chosen tags of FLAC and MP3 files as a CSV or TSV table, "
+        "one row per file. Tags are keyed as tagindex keys them: FLAC keys are lowercase, ID3 frame ids uppercase, "
+        "and structured ID3 frames are keyed by owner or description, as in TXXX:comment.")
+    parser.add_argument('-c', '--columns', action='append', type=parse_columns, required=True, metavar='KEYS',
+        help="Comma-separated keys to export as columns, after the file name, in order. A column may be several "
+            "alternative keys separated by |, such as TALB|album. May be repeated.")
+    parser.add_argument('--tsv', action='store_true', help="Separate fields by tabs instead of commas.")
+    parser.add_argument('-s', '--separator', default='; ',
+        help="Separator to join the values of a tag with several values (default: '; ').")
+    parser.add_argument('--no-header', action='store_true', help="Don't write a header row.")
+    add_cache_arguments(parser)
+    add_jobs_arguments(parser)
+    add_profile_arguments(parser)
+    add_input_arguments(parser, 'path', help="File(s) or directories to export, walked recursively.")
+    args = parser.parse_args(args)
+    paths = find_files(inputs_from_arguments(parser, args, 'path', FORMATS))
+
+    check_jobs_arguments(parser, args)
+    profiler = profiler_from_arguments(parser, args, processes=args.processes)
+    cache = cache_from_arguments(parser, args)
+
+    columns = [column for group in args.columns for column in group]
+    writer = csv.writer(sys.stdout, delimiter='\t' if args.tsv else ',', lineterminator='\n')
+    export = functools.partial(export_row, columns=columns, separator=args.separator, cache=cache)
+    failed = 0
+
+    if not args.no_header:
+        writer.writerow(['file'] + ['|'.join(column) for column in columns])
+
+    # files are found, read and written out a row at a time, so memory use doesn't grow with the library
+    for result in run_batch(export, paths, jobs=args.jobs, processes=args.processes,
+            profiler=profiler):
+        if result.error:
+            failed += 1
+            report_error(result, "export tags from")
+        else:
+            writer.writerow(result.value)
+
+    if cache is not None:
+        cache.close()
+
+    report_profile(profiler, args)
+
+    return 1 if failed else 0
+
+
+def export_row(path, columns, separator='; ', cache=None):
+    """
+    Returns the row of a file: its path followed by the value of each column, empty if the file has none of its keys.
+
+    Tags are rendered, and flattened, as flacjson or id3json render them, using the ExportCache if one is given. The
+    values of a tag with several are joined by separator.
+    """
+    export = EXPORTS.get(file_format(path))
+
+    if export is None:
+        raise ValueError("Unsupported file type: {}".format(path))
+
+    values = {}
+
+    for key, value in tag_rows(export(path, flatten=True, cache=cache)['tags']):
+        if value is not None:
+            values.setdefault(key, []).append(value)
+
+    return [path] + [next((separator.join(values[key]) for key in column if key in values), '') for column in columns]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mutagen.id3 import ID3, Encoding, TALB, TPE1, TXXX
+
+from mutagentools.cli.tagexport import main as tagexport_main, parse_columns
+
+import argparse
+import csv
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+DIRNAME = os.path.dirname(os.path.realpath(__file__))
+FIXTURE = os.path.join(DIRNAME, *('../../flac/fixtures/fixture.flac'.split('/')))
+BLANK_ID3 = os.path.join(DIRNAME, *('../../id3/fixtures/no-id3.mp3'.split('/')))
+
+
+class TagExportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.flac_file = os.path.join(self.directory, 'a.flac')
+        self.mp3_file = os.path.join(self.directory, 'b.mp3')
+
+        shutil.copy(FIXTURE, self.flac_file)
+        shutil.copy(BLANK_ID3, self.mp3_file)
+
+        tags = ID3()
+        tags.add(TALB(encoding=Encoding.UTF8, text=['Other Album']))
+        tags.add(TPE1(encoding=Encoding.UTF8, text=['One', 'Two, Three']))
+        tags.add(TXXX(encoding=Encoding.UTF8, desc='comment', text=['Nice']))
+        tags.save(self.mp3_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def export(self, *args):
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.assertEqual(0, tagexport_main(list(args)))
+
+        return stdout.getvalue()
+
+    def test_parse_columns(self):
+        """Tests that columns are split into their alternative keys."""
+        self.assertEqual([('TALB', 'album'), ('TXXX:comment',)], parse_columns('TALB|album, TXXX:comment'))
+
+        with self.assertRaises(argparse.ArgumentTypeError):
+            parse_columns('TALB|,TPE1')
+
+    def test_csv(self):
+        """Tests that a directory is exported with a row per file, joining multiple values."""
+        output = self.export('-c', 'TALB|album,TPE1|artist', '-c', 'TXXX:comment', '-j', '2', self.directory)
+
+        self.assertEqual([
+            ['file', 'TALB|album', 'TPE1|artist', 'TXXX:comment'],
+            [self.flac_file, 'Album', 'Artist 1; Artist 2', ''],
+            [self.mp3_file, 'Other Album', 'One; Two, Three', 'Nice'],
+        ], list(csv.reader(io.StringIO(output))))
+
+    def test_tsv(self):
+        """Tests that --tsv separates fields by tabs and --no-header leaves out the header."""
+        output = self.export('--tsv', '--no-header', '-s', '/', '-c', 'TPE1', self.mp3_file)
+
+        self.assertEqual("{}\tOne/Two, Three\n".format(self.mp3_file), output)
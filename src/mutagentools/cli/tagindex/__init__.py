@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from mutagentools.cli.batch import (
+    add_jobs_arguments, add_profile_arguments, check_jobs_arguments, profiler_from_arguments, report_error,
+    report_profile, run_batch,
+)
+from mutagentools.index import FORMATS, TagIndex, find_files, read_tags
+from mutagentools.profiling import phase
+
+
+def main(args=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description="Indexes the tags of a music library in SQLite and queries them.")
+    subparsers = parser.add_subparsers(dest='command', metavar='COMMAND')
+    subparsers.required = True
+
+    scan = subparsers.add_parser('scan', help="Add or update files in the index.",
+        description="Adds FLAC and MP3 files to the index, re-reading only files which changed since the last scan "
+            "and removing files under the given directories which no longer exist.")
+    scan.add_argument('-v', '--verbose', action='store_true', help="Verbose output.")
+    add_jobs_arguments(scan)
+    add_profile_arguments(scan)
+    scan.add_argument('index', help="Index database file, created if it doesn't exist.")
+    scan.add_argument('path', nargs='+', help="File(s) or directories to index.")
+
+    query = subparsers.add_parser('query', help="List indexed files matching tag predicates.",
+        description="Lists indexed files matching all the given predicates. Keys and values are GLOB patterns, and "
+            "are case sensitive: FLAC keys are lowercase and ID3 frame ids uppercase. Structured ID3 frames are keyed "
+            "by owner or description, as in PRIV:Google/StoreId or TXXX:comment.")
+    query.add_argument('--has', action='append', default=[], metavar='KEY', help="Files with a tag matching KEY.")
+    query.add_argument('--missing', action='append', default=[], metavar='KEY',
+        help="Files without any tag matching KEY.")
+    query.add_argument('--where', action='append', default=[], metavar='KEY=VALUE', type=parse_where,
+        help="Files with a tag matching KEY whose value matches VALUE.")
+    query.add_argument('--format', choices=sorted(FORMATS.values()), help="Only files of this format.")
+    query.add_argument('--count', action='store_true', help="Print the number of matching files instead.")
+    query.add_argument('--json', action='store_true',
+        help="Print one JSON object per line with each file's indexed tags instead of its path.")
+    query.add_argument('index', help="Index database file.")
+
+    args = parser.parse_args(args)
+
+    if args.command == 'scan':
+        check_jobs_arguments(scan, args)
+        profiler = profiler_from_arguments(scan, args, processes=args.processes)
+
+        try:
+            return scan_paths(args.index, args.path, jobs=args.jobs, processes=args.processes, verbose=args.verbose,
+                profiler=profiler)
+        finally:
+            report_profile(profiler, args)
+
+    if not os.path.isfile(args.index):
+        query.error("no index at {}".format(args.index))
+
+    index = TagIndex(args.index)
+
+    try:
+        paths = index.query(has=args.has, missing=args.missing, where=args.where, format=args.format)
+
+        if args.count:
+            print(sum(1 for _ in paths))
+            return 0
+
+        for path in paths:
+            if args.json:
+                print(json.dumps({'file': path, 'tags': index.tags(path)}, sort_keys=True))
+            else:
+                print(path)
+    finally:
+        index.close()
+
+    return 0
+
+
+def parse_where(value):
+    """Parses a KEY=VALUE predicate."""
+    if '=' not in value:
+        raise argparse.ArgumentTypeError("expected KEY=VALUE: {}".format(value))
+
+    return tuple(value.split('=', 1))
+
+
+def read_file(entry):
+    """Reads the tags of a (path, size, mtime_ns) entry, returning them with the format of the file."""
+    return read_tags(entry[0])
+
+
+def scan_paths(filename, paths, jobs=1, processes=False, verbose=False, profiler=None):
+    """
+    Brings the index up to date with the given files and directories.
+
+    Files whose size and modification time are unchanged are skipped, the rest are read using a pool of jobs workers,
+    and files which were indexed under one of the given directories but no longer exist are removed. Files which
+    can't be read keep what was indexed for them. If a Profiler is given, every file read is profiled in it.
+    """
+    index = TagIndex(filename)
+    roots = [os.path.abspath(p) for p in paths]
+    counts = {'updated': 0, 'unchanged': 0, 'failed': 0}
+    started = time.time()
+
+    def changed():
+        for path in find_files(roots):
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                counts['failed'] += 1
+                sys.stderr.write("Failed to index {}: {}\n".format(path, e))
+
+                if not isinstance(e, FileNotFoundError):
+                    index.mark_seen(path)
+
+                continue
+
+            if index.is_current(path, stat.st_size, stat.st_mtime_ns):
+                counts['unchanged'] += 1
+            else:
+                yield path, stat.st_size, stat.st_mtime_ns
+
+    try:
+        index.begin_scan()
+
+        for result in run_batch(read_file, changed(), jobs=jobs, processes=processes, profiler=profiler):
+            if result.error:
+                counts['failed'] += 1
+                report_error(result._replace(item=result.item[0]), "index")
+                index.mark_seen(result.item[0])
+                continue
+
+            path, size, mtime_ns = result.item
+            format, tags = result.value
+
+            with phase('save'):
+                index.update(path, format, size, mtime_ns, tags)
+
+            counts['updated'] += 1
+
+            if verbose:
+                print("Indexed {}.".format(path))
+
+        removed = index.remove_unseen(roots)
+    finally:
+        index.close()
+
+    elapsed = time.time() - started
+
+    sys.stderr.write("Indexed {} file(s) in {:.2f}s; {} unchanged, {} removed, {} failed.\n".format(counts['updated'],
+        elapsed, counts['unchanged'], removed, counts['failed']))
+
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+from io import StringIO
+
+from mutagentools.cli.tagindex import main as tagindex_main
+
+FILENAME = os.path.realpath(__file__)
+DIRNAME = os.path.dirname(FILENAME)
+
+
+class IntegrationTest(unittest.TestCase):
+
+    def test_tagindex(self):
+        """Tests scanning a directory and querying the index."""
+        directory = tempfile.mkdtemp()
+        library = os.path.join(directory, 'library')
+        index = os.path.join(directory, 'index.db')
+
+        os.makedirs(library)
+        shutil.copy(os.path.join(DIRNAME, *('../../flac/fixtures/fixture.flac'.split('/'))), library)
+        shutil.copy(os.path.join(DIRNAME, *('../../id3/fixtures/no-id3.mp3'.split('/'))), library)
+
+        try:
+            with patch('sys.stderr', new_callable=StringIO) as stderr:
+                self.assertEqual(0, tagindex_main(['scan', '-j', '2', index, library]))
+                self.assertEqual(0, tagindex_main(['scan', index, library]))
+
+            self.assertIn("Indexed 2 file(s)", stderr.getvalue())
+            self.assertIn("Indexed 0 file(s)", stderr.getvalue())
+
+            # a changed file which can't be read again stays indexed
+            os.utime(os.path.join(library, 'no-id3.mp3'), (0, 0))
+
+            with patch('sys.stderr', new_callable=StringIO) as stderr, \
+                    patch('mutagentools.cli.tagindex.read_file', side_effect=IOError("unreadable")):
+                self.assertEqual(1, tagindex_main(['scan', index, library]))
+
+            self.assertIn("0 removed, 1 failed", stderr.getvalue())
+
+            with patch('sys.stdout', new_callable=StringIO) as stdout:
+                self.assertEqual(0, tagindex_main(['query', '--missing', 'TPOS', '--format', 'mp3', index]))
+
+            self.assertEqual([os.path.join(library, 'no-id3.mp3')], stdout.getvalue().splitlines())
+
+            with patch('sys.stdout', new_callable=StringIO) as stdout:
+                self.assertEqual(0, tagindex_main(['query', '--count', '--where', 'album=Album', index]))
+
+            self.assertEqual("1", stdout.getvalue().strip())
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mutagentools.cli.batch import BatchResult, run_batch
+from mutagentools.cli.id3json import main as id3json_main
+from mutagentools.profiling import Profiler, phase
+
+import io
+import itertools
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from mock import patch
+
+
+BLANK_ID3 = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'id3', 'fixtures', 'no-id3.mp3')
+
+# the most the mutagentools command may take to import, in microseconds; measured at around 25ms, most of it argparse
+IMPORT_BUDGET_US = 75000
+
+
+def slow_square(n):
+    """Squares a number, taking longer for smaller numbers so that results complete out of order."""
+    time.sleep(0.01 * (5 - n) if n < 5 else 0)
+    return n * n
+
+
+def fail_on_three(n):
+    if n == 3:
+        raise ValueError("three")
+
+    return n
+
+
+def timed_square(n):
+    with phase('parse'):
+        return n * n
+
+
+class BatchTestCase(unittest.TestCase):
+
+    def test_run_batch_order(self):
+        """Tests that results come back in input order regardless of completion order."""
+        for jobs, processes in ((1, False), (4, False), (2, True)):
+            self.assertEqual([(n, n * n) for n in range(8)], [(r.item, r.value) for r in run_batch(slow_square,
+                range(8), jobs=jobs, processes=processes)])
+
+    def test_run_batch_errors(self):
+        """Tests that a failing item is reported without aborting the batch."""
+        for jobs in (1, 3):
+            results = list(run_batch(fail_on_three, range(5), jobs=jobs))
+
+            self.assertEqual([0, 1, 2, None, 4], [r.value for r in results])
+            self.assertEqual(BatchResult(3, None, "ValueError: three"), results[3])
+
+    def test_run_batch_lazy(self):
+        """Tests that items are consumed lazily, with a bounded number in flight."""
+        consumed = itertools.count()
+        lock = threading.Lock()
+
+        def items():
+            for n in itertools.count():
+                with lock:
+                    next(consumed)
+
+                yield n
+
+        results = run_batch(lambda n: n, items(), jobs=2)
+
+        self.assertEqual([0, 1, 2], [next(results).value for _ in range(3)])
+        self.assertLessEqual(next(consumed), 8)
+
+        results.close()
+
+    def test_run_batch_profiler(self):
+        """Tests that phases timed in workers are recorded in the profiler, whichever kind of pool is used."""
+        for jobs, processes in ((1, False), (3, False), (2, True)):
+            profiler = Profiler(slowest=2)
+
+            self.assertEqual([0, 1, 4, 9, 16], [r.value for r in run_batch(timed_square, range(5), jobs=jobs,
+                processes=processes, profiler=profiler)])
+            self.assertEqual(5, profiler.histograms['parse'].count)
+            self.assertEqual(5, profiler.files.count)
+            self.assertEqual(2, len(profiler.slowest_files()))
+
+
+class ProfileArgumentsTestCase(unittest.TestCase):
+
+    def test_profile_dump_threads(self):
+        """Tests that --profile-dump is refused with several threads, as cProfile can only run one at a time."""
+        directory = tempfile.mkdtemp()
+
+        try:
+            with patch('sys.stderr', new_callable=io.StringIO) as stderr, self.assertRaises(SystemExit):
+                id3json_main(['--profile-dump', directory, '-j', '2', BLANK_ID3, BLANK_ID3])
+
+            self.assertIn("--profile-dump requires --processes", stderr.getvalue())
+
+            with patch('sys.stdout', new_callable=io.StringIO), patch('sys.stderr', new_callable=io.StringIO):
+                self.assertEqual(0, id3json_main(['--profile-dump', directory, '-j', '2', '--processes', BLANK_ID3,
+                    BLANK_ID3]))
+
+            self.assertTrue(os.listdir(directory))
+        finally:
+            shutil.rmtree(directory)
+
+
+@unittest.skipUnless(sys.version_info >= (3, 7), "-X importtime requires Python 3.7")
+class ImportTimeTestCase(unittest.TestCase):
+
+    def import_times(self, module):
+        """Imports a module in a new interpreter, returning the cumulative import time of each module it imported."""
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+        output = subprocess.check_output([sys.executable, '-X', 'importtime', '-c', 'import {}'.format(module)],
+            env=env, stderr=subprocess.STDOUT, universal_newlines=True)
+        times = {}
+
+        for line in output.splitlines():
+            if line.startswith('import time:') and '|' in line:
+                _, cumulative, name = line.split('|')
+
+                if cumulative.strip().isdigit():
+                    times[name.strip()] = int(cumulative)
+
+        return times
+
+    def test_dispatcher_imports_lazily(self):
+        """Tests that the mutagentools command imports neither mutagen nor any subcommand until one is run."""
+        times = self.import_times('mutagentools.cli')
+
+        self.assertIn('mutagentools.cli', times)
+        self.assertEqual([], sorted(name for name in times if name.split('.')[0] in ('mutagen', 'six') or
+            name.startswith('mutagentools.cli.')))
+        self.assertLess(times['mutagentools.cli'], IMPORT_BUDGET_US)
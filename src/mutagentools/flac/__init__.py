@@ -6,11 +6,26 @@ from base64 import b64encode
 from mutagen.id3 import PictureType
 
 from mutagentools.flac.convert import convert_flac_to_id3
+from mutagentools.flac.reader import read_metadata
+from mutagentools.jsonstream import Base64Data
+from mutagentools.pictures import picture_reference
+from mutagentools.profiling import phase
 from mutagentools.utils import fold_text_keys
 
 
-def to_json_dict(flac, include_pics=False, flatten=False):
-    """Outputs FLAC tags in a JSON-compatible format."""
+def to_json_dict(flac, include_pics=False, flatten=False, pictures_dir=None, stream_pictures=False):
+    """
+    Outputs FLAC tags in a JSON-compatible format.
+
+    If pictures_dir is given, pictures are written once into that directory by content hash and referenced by hash
+    and size rather than embedded as base64 data. If stream_pictures is set, picture data is given as Base64Data, to
+    be encoded while it is written by write_json, rather than as a base64 string.
+    """
+    with phase('to_json'):
+        return _to_json_dict(flac, include_pics, flatten, pictures_dir, stream_pictures)
+
+
+def _to_json_dict(flac, include_pics, flatten, pictures_dir, stream_pictures):
     result = {}
 
     # flac is so damn easy
@@ -21,13 +36,22 @@ def to_json_dict(flac, include_pics=False, flatten=False):
     if include_pics and len(flac.pictures) > 0:
         result['pictures'] = []
         for picture in flac.pictures:
-            result['pictures'].append({
-                'data': b64encode(picture.data).decode('utf-8'),
+            entry = {
                 'desc': picture.desc,
                 'mime': picture.mime,
                 'type': picture.type,
                 'type_friendly': str(PictureType(picture.type)).split('.')[-1]
-            })
+            }
+
+            if pictures_dir:
+                entry.update(picture_reference(pictures_dir, picture.data, picture.mime))
+            elif stream_pictures:
+                entry['data'] = Base64Data(picture.data)
+            else:
+                with phase('base64'):
+                    entry['data'] = b64encode(picture.data).decode('utf-8')
+
+            result['pictures'].append(entry)
 
     # flatten if need be
     if flatten:
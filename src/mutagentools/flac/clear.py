@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mutagentools.flac.reader import (
+    BLOCK_HEADER_SIZE,
+    MAX_BLOCK_LENGTH,
+    PADDING,
+    PICTURE,
+    VORBIS_COMMENT,
+    iter_block_headers,
+    read_exactly,
+)
+from mutagentools.profiling import phase
+
+import struct
+
+
+ZERO_CHUNK_SIZE = 64 * 1024
+
+
+def block_header(type, length, last=False):
+    """Encodes a metadata block header."""
+    return struct.pack('>I', (0x80000000 if last else 0) | (type << 24) | length)
+
+
+def padding_lengths(total):
+    """
+    Splits a number of bytes, including block headers, into the payload lengths of one or more PADDING blocks.
+
+    Several blocks are only needed when the total exceeds the largest possible block.
+    """
+    result = []
+
+    while total > 0:
+        if total < BLOCK_HEADER_SIZE:
+            raise ValueError("Cannot fill {} bytes with a PADDING block".format(total))
+
+        if total - BLOCK_HEADER_SIZE <= MAX_BLOCK_LENGTH:
+            length = total - BLOCK_HEADER_SIZE
+        elif total - BLOCK_HEADER_SIZE - MAX_BLOCK_LENGTH >= BLOCK_HEADER_SIZE:
+            length = MAX_BLOCK_LENGTH
+        else:
+            # leave room for the header of the next block
+            length = MAX_BLOCK_LENGTH - BLOCK_HEADER_SIZE
+
+        result.append(length)
+        total -= BLOCK_HEADER_SIZE + length
+
+    return result
+
+
+def clear_in_place(filename):
+    """
+    Removes all Vorbis comments and pictures from a FLAC file without moving its audio frames.
+
+    The VORBIS_COMMENT, PICTURE and existing PADDING blocks are replaced by PADDING of the same total size at the end
+    of the metadata, and any remaining blocks following a removed block are moved up. Only the metadata region of the
+    file is written to. Returns the number of bytes written, which is zero if there was nothing to remove.
+    """
+    with phase('open'):
+        f = open(filename, 'r+b')
+
+    with f:
+        with phase('parse'):
+            blocks = list(iter_block_headers(f))
+
+        if not any(block.type in (VORBIS_COMMENT, PICTURE) for block in blocks):
+            return 0
+
+        with phase('save'):
+            kept = [block for block in blocks if block.type not in (VORBIS_COMMENT, PICTURE, PADDING)]
+            position, end = blocks[0].offset, blocks[-1].offset + BLOCK_HEADER_SIZE + blocks[-1].length
+            written = 0
+
+            for block in kept:
+                # blocks only ever move towards the start of the file, so never overwrite one yet to be moved
+                if block.offset != position or block.last:
+                    f.seek(block.offset + BLOCK_HEADER_SIZE)
+                    payload = read_exactly(f, block.length)
+
+                    f.seek(position)
+                    f.write(block_header(block.type, block.length) + payload)
+                    written += BLOCK_HEADER_SIZE + block.length
+
+                position += BLOCK_HEADER_SIZE + block.length
+
+            f.seek(position)
+            lengths = padding_lengths(end - position)
+            zeros = b'\x00' * ZERO_CHUNK_SIZE
+
+            for index, length in enumerate(lengths):
+                f.write(block_header(PADDING, length, last=index == len(lengths) - 1))
+                written += BLOCK_HEADER_SIZE
+
+                remaining = length
+
+                while remaining > 0:
+                    chunk = min(remaining, ZERO_CHUNK_SIZE)
+                    f.write(zeros[:chunk] if chunk < ZERO_CHUNK_SIZE else zeros)
+                    remaining -= chunk
+
+                written += length
+
+    return written
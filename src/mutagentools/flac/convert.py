@@ -5,12 +5,9 @@ from mutagen.id3 import (
     APIC, ID3, MCDI, TALB, TCON, TCOM, TDRC, TIT2, TLEN, TPE1, TPE2, TPOS, TPUB, TRCK, TXXX, UFID, Encoding
 )
 
-from mutagentools.utils import (
-    contains_any,
-    first,
-    first_of_list,
-    pop_keys,
-)
+from mutagentools.flac.mapping import Mapping, Rule
+from mutagentools.profiling import phase
+from mutagentools.utils import first_of_list
 
 import re
 import six
@@ -20,93 +17,47 @@ import struct
 PART_OF_SET = re.compile(r'^(?P<number>\d+)/(?P<total>\d+)$')
 
 
-def convert_flac_to_id3(flac):
-    """Convert FLAC tags to ID3 tags."""
-    result = []
-    tags = dict(flac.tags)
-
-    # remove crc because we don't care about the original FLAC's CRC
-    tags.pop('crc') if 'crc' in tags.keys() else None
-
-    # artist related tags
-    if contains_any(tags.keys(), 'albumartist', 'album artist'):
-        result.append(convert_albumartist_to_tpe2(first(pop_keys(tags, 'albumartist', 'album artist'))))
-
-    if contains_any(tags.keys(), 'artist', 'author'):
-        result.append(convert_artist_to_tpe1(first(pop_keys(tags, 'artist', 'author'))))
-
-    if 'composer' in tags.keys():
-        result.append(convert_composer_to_tcom(tags.pop('composer')))
+def convert_flac_to_id3(flac, picture_policy=None, mapping=None):
+    """
+    Convert FLAC tags to ID3 tags.
 
-    # album related tags
-    if 'album' in tags.keys():
-        result.append(convert_album_to_talb(tags.pop('album')))
+    Vorbis comments are converted using the given Mapping, or DEFAULT_MAPPING. If a PicturePolicy is given, only the
+    pictures it keeps are converted into APIC tags.
+    """
+    with phase('convert'):
+        result = (mapping or DEFAULT_MAPPING).convert(dict(flac.tags or {}))
 
-    if 'genre' in tags.keys():
-        result.append(convert_genre_to_tcon(tags.pop('genre'), tags.pop('style') if 'style' in tags.keys() else []))
-
-    if 'discnumber' in tags.keys():
-        result.append(convert_disc_number_to_tpos(first_of_list(tags.pop('discnumber')),
-            first_of_list(first(pop_keys(tags, 'totaldiscs', 'disctotal')))))
-
-    if contains_any(tags.keys(), 'date', 'year'):
-        result.append(convert_date_to_tdrc(first(pop_keys(tags, 'date', 'year'))))
-
-    if 'organization' in tags.keys():
-        result.append(convert_organization_to_tpub(tags.pop('organization')))
-
-    if 'cdtoc' in tags.keys():
-        result.append(convert_toc_to_mcdi(tags.pop('cdtoc')))
-
-    if 'mbid' in tags.keys():
-        result.append(convert_mbid_to_ufid(tags.pop('mbid')))
-
-    # track related tags
-    if 'title' in tags.keys():
-        result.append(convert_title_to_tit2(tags.pop('title')))
+        # add the pictures
+        for picture in (picture_policy.apply(flac.pictures) if picture_policy else flac.pictures):
+            result.append(APIC(
+                encoding=Encoding.UTF8,
+                type=picture.type,
+                desc=picture.desc,
+                mime=picture.mime,
+                data=bytes(picture.data))
+            )
 
-    if 'tracknumber' in tags.keys():
-        tracknumber = first_of_list(tags.pop('tracknumber'))
-        totaltracks = first_of_list(first(pop_keys(tags, 'totaltracks', 'tracktotal')))
+        # if there is no disc number, add one manually
+        if not any(frame.FrameID == 'TPOS' for frame in result):
+            result.append(convert_disc_number_to_tpos('1', '1'))
 
-        if PART_OF_SET.match(tracknumber):
-            # it's a complicated dude
-            tracknumber, totaltracks = PART_OF_SET.match(tracknumber).groups()
-
-        result.append(convert_track_number_to_trck(tracknumber, totaltracks))
-
-    if 'length' in tags.keys():
-        result.append(convert_length_to_tlen(tags.pop('length')))
-
-    # encoding tags
-    if 'encoder' in tags.keys():
-        result.append(convert_encoder_to_txxx(tags.pop('encoder')))
+    return result
 
-    if 'encoded by' in tags.keys():
-        result.append(convert_encoded_by_to_txxx(tags.pop('encoded by')))
 
-    if 'encoder settings' in tags.keys():
-        result.append(convert_encoder_settings_to_txxx(tags.pop('encoder settings')))
+def convert_disc_tags(flac_discnumber, flac_totaldiscs=None):
+    """Converts FLAC disc number and total discs tags, which may be lists, into a TPOS tag."""
+    return convert_disc_number_to_tpos(first_of_list(flac_discnumber), first_of_list(flac_totaldiscs))
 
-    # catch the rest in txxx
-    for tag in tags:
-        result.append(convert_generic_to_txxx(tag, tags.get(tag)))
 
-    # add the pictures
-    for picture in flac.pictures:
-        result.append(APIC(
-            encoding=Encoding.UTF8,
-            type=picture.type,
-            desc=picture.desc,
-            mime=picture.mime,
-            data=bytes(picture.data))
-        )
+def convert_track_tags(flac_tracknumber, flac_totaltracks=None):
+    """Converts FLAC track number and total tracks tags, which may be lists or '%d/%d', into a TRCK tag."""
+    tracknumber, totaltracks = first_of_list(flac_tracknumber), first_of_list(flac_totaltracks)
 
-    # if there is no disc number, add one manually
-    if not 'TPOS' in list(map(lambda t: t.FrameID, result)):
-        result.append(convert_disc_number_to_tpos('1', '1'))
+    if PART_OF_SET.match(tracknumber):
+        # it's a complicated dude
+        tracknumber, totaltracks = PART_OF_SET.match(tracknumber).groups()
 
-    return result
+    return convert_track_number_to_trck(tracknumber, totaltracks)
 
 
 def convert_generic_to_txxx(flac_key, flac_value):
@@ -252,3 +203,32 @@ def convert_toc_to_mcdi(flac_toc):
 
     # flatten out all of the bytes for the various entries and produce one long byte stream
     return MCDI(data=b''.join([track_count] + track_addresses))
+
+
+# the order of the rules is the order in which the tags are output, followed by any remaining tags as TXXX tags
+DEFAULT_RULES = [
+    # remove crc because we don't care about the original FLAC's CRC
+    Rule(['crc'], None),
+    # artist related tags
+    Rule(['albumartist', 'album artist'], convert_albumartist_to_tpe2),
+    Rule(['artist', 'author'], convert_artist_to_tpe1),
+    Rule(['composer'], convert_composer_to_tcom),
+    # album related tags
+    Rule(['album'], convert_album_to_talb),
+    Rule(['genre'], convert_genre_to_tcon, extras=[['style']]),
+    Rule(['discnumber'], convert_disc_tags, extras=[['totaldiscs', 'disctotal']]),
+    Rule(['date', 'year'], convert_date_to_tdrc),
+    Rule(['organization'], convert_organization_to_tpub),
+    Rule(['cdtoc'], convert_toc_to_mcdi),
+    Rule(['mbid'], convert_mbid_to_ufid),
+    # track related tags
+    Rule(['title'], convert_title_to_tit2),
+    Rule(['tracknumber'], convert_track_tags, extras=[['totaltracks', 'tracktotal']]),
+    Rule(['length'], convert_length_to_tlen),
+    # encoding tags
+    Rule(['encoder'], convert_encoder_to_txxx),
+    Rule(['encoded by'], convert_encoded_by_to_txxx),
+    Rule(['encoder settings'], convert_encoder_settings_to_txxx),
+]
+
+DEFAULT_MAPPING = Mapping(DEFAULT_RULES, fallback=convert_generic_to_txxx, name='default')
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+
+from mutagentools.flac.reader import metadata_digest
+
+import os
+import sqlite3
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    options TEXT NOT NULL
+)
+"""
+
+
+Fingerprint = namedtuple('Fingerprint', ['size', 'mtime_ns', 'digest'])
+Fingerprint.__doc__ = """
+The size, modification time and metadata digest of a FLAC file, as recorded in a Manifest.
+"""
+
+
+def source_fingerprint(source):
+    """
+    Returns the Fingerprint of a FLAC file.
+
+    The file is stat'ed before it is digested, so that should it change in between, the size or modification time
+    recorded is the older one and the next check digests it again rather than trusting a stale digest.
+    """
+    stat = os.stat(source)
+
+    return Fingerprint(stat.st_size, stat.st_mtime_ns, metadata_digest(source))
+
+
+class Manifest(object):
+    """
+    An on-disk record of which FLAC files have been copied to which destinations.
+
+    Each source is stored with its size, modification time and a digest of its tag and picture blocks, along with the
+    destination it was copied to and the options used. A source is current if none of these have changed, and its
+    destination still exists; if only the size or modification time changed, the digest decides.
+    """
+
+    def __init__(self, filename, commit_interval=1000):
+        self.filename = filename
+        self.commit_interval = commit_interval
+        self.pending = 0
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+
+    def is_current(self, source, destination, options=''):
+        """Returns whether the source has been copied to the destination with the same options and is unchanged."""
+        row = self.connection.execute("SELECT size, mtime_ns, digest, destination, options FROM sources "
+            "WHERE source = ?", (source,)).fetchone()
+
+        if row is None:
+            return False
+
+        size, mtime_ns, digest, recorded_destination, recorded_options = row
+
+        if recorded_destination != destination or recorded_options != options or not os.path.exists(destination):
+            return False
+
+        stat = os.stat(source)
+
+        if (stat.st_size, stat.st_mtime_ns) == (size, mtime_ns):
+            return True
+
+        # the file was touched; only the tags and pictures matter
+        if metadata_digest(source) != digest:
+            return False
+
+        self.connection.execute("UPDATE sources SET size = ?, mtime_ns = ? WHERE source = ?",
+            (stat.st_size, stat.st_mtime_ns, source))
+        self._committed()
+
+        return True
+
+    def record(self, source, destination, options='', fingerprint=None):
+        """
+        Records that the source has been copied to the destination.
+
+        The Fingerprint should be taken before the tags are copied, so that a source changed during the copy isn't
+        recorded as current; it is taken now if not given.
+        """
+        size, mtime_ns, digest = fingerprint or source_fingerprint(source)
+
+        self.connection.execute("INSERT OR REPLACE INTO sources (source, size, mtime_ns, digest, destination, "
+            "options) VALUES (?, ?, ?, ?, ?, ?)", (source, size, mtime_ns, digest, destination, options))
+        self._committed()
+
+    def _committed(self):
+        self.pending += 1
+
+        if self.pending >= self.commit_interval:
+            self.commit()
+
+    def commit(self):
+        """Commits pending changes to disk."""
+        self.connection.commit()
+        self.pending = 0
+
+    def close(self):
+        """Commits pending changes and closes the manifest."""
+        self.commit()
+        self.connection.close()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+
+import hashlib
+import json
+
+import mutagen.id3
+
+from mutagen.id3 import Encoding, TextFrame, TXXX
+
+
+class Rule(namedtuple('Rule', ['keys', 'convert', 'extras'])):
+    """
+    Maps one or more Vorbis comment keys onto an ID3 frame.
+
+    keys are alternative source keys in order of priority: the rule applies if any of them is present, the value of
+    the first non-empty one is used and all of them are consumed. extras is a sequence of groups of alternative keys
+    which are only consumed along with the rule; the first non-empty value of each group, or None, is passed to
+    convert after the main value. convert returns an ID3 frame, or is None to drop the keys entirely.
+    """
+
+    def __new__(cls, keys, convert, extras=()):
+        return super(Rule, cls).__new__(cls, tuple(k.lower() for k in keys), convert,
+            tuple(tuple(k.lower() for k in group) for group in extras))
+
+
+class TextFrameConverter(object):
+    """Converts a Vorbis comment value into a text frame of the given frame id."""
+
+    def __init__(self, frame_id):
+        frame_class = getattr(mutagen.id3, frame_id, None)
+
+        if not (isinstance(frame_class, type) and issubclass(frame_class, TextFrame)) or frame_class is TXXX:
+            raise ValueError("Not an ID3 text frame: {}".format(frame_id))
+
+        self.frame_id = frame_id
+        self.frame_class = frame_class
+
+    def __call__(self, value):
+        return self.frame_class(encoding=Encoding.UTF8, text=value)
+
+
+class TXXXConverter(object):
+    """Converts a Vorbis comment value into a TXXX frame with the given description."""
+
+    def __init__(self, desc):
+        self.desc = desc
+
+    def __call__(self, value):
+        return TXXX(encoding=Encoding.UTF8, desc=self.desc, text=value)
+
+
+class Mapping(object):
+    """
+    A compiled table of Rules.
+
+    Every source key is indexed once, so converting a set of tags is a single pass over its keys. Where several rules
+    claim the same key, the earlier rule wins. Keys claimed by no rule are passed to the fallback converter along with
+    their value, in their original order.
+    """
+
+    def __init__(self, rules, fallback, name='custom'):
+        self.rules = list(rules)
+        self.fallback = fallback
+        self.name = name
+        self.index = {}
+
+        for position, rule in enumerate(self.rules):
+            for priority, key in enumerate(rule.keys):
+                self.index.setdefault(key, (position, 0, priority))
+
+            for slot, group in enumerate(rule.extras, 1):
+                for priority, key in enumerate(group):
+                    self.index.setdefault(key, (position, slot, priority))
+
+    def __repr__(self):
+        return "Mapping({!r})".format(self.name)
+
+    def extend(self, rules, name=None):
+        """Returns a new mapping in which the given rules take precedence over this mapping's rules."""
+        return Mapping(list(rules) + self.rules, self.fallback, name=name or "{}+custom".format(self.name))
+
+    def convert(self, tags):
+        """Converts a dictionary of Vorbis comments into a list of ID3 frames."""
+        result, unmatched, matched = [], [], {}
+
+        for order, (key, value) in enumerate(tags.items()):
+            entry = self.index.get(key)
+
+            if entry is None:
+                unmatched.append((order, key, value))
+                continue
+
+            position, slot, priority = entry
+            matched.setdefault(position, {}).setdefault(slot, []).append((priority, order, key, value))
+
+        for position in sorted(matched):
+            rule, slots = self.rules[position], matched[position]
+
+            if 0 not in slots:
+                # extras without their main key aren't consumed by the rule
+                unmatched.extend((order, key, value) for group in slots.values() for _, order, key, value in group)
+                continue
+
+            if rule.convert is None:
+                continue
+
+            values = [self._select(slots.get(slot)) for slot in range(len(rule.extras) + 1)]
+            result.append(rule.convert(*values))
+
+        for order, key, value in sorted(unmatched, key=lambda i: i[0]):
+            result.append(self.fallback(key, value))
+
+        return result
+
+    @staticmethod
+    def _select(candidates):
+        """Returns the first non-empty value by priority among the candidates found for a slot, or None."""
+        if not candidates:
+            return None
+
+        for _, _, _, value in sorted(candidates, key=lambda c: c[0]):
+            if value:
+                return value
+
+        return None
+
+
+def load_rules(filename):
+    """
+    Loads rules from a JSON file.
+
+    The file contains a list of objects, each with a list of source "keys" and one of "frame" (an ID3 text frame id
+    such as "TPUB"), "txxx" (a TXXX description) or "drop" (true to discard the keys).
+    """
+    with open(filename) as f:
+        entries = json.load(f)
+
+    if not isinstance(entries, list):
+        raise ValueError("Mapping file must contain a list of rules")
+
+    rules = []
+
+    for entry in entries:
+        keys = entry.get('keys') if isinstance(entry, dict) else None
+
+        if not keys or not isinstance(keys, list):
+            raise ValueError("Mapping rule must have a list of keys: {!r}".format(entry))
+
+        if 'frame' in entry:
+            rules.append(Rule(keys, TextFrameConverter(entry['frame'])))
+        elif 'txxx' in entry:
+            rules.append(Rule(keys, TXXXConverter(entry['txxx'])))
+        elif entry.get('drop'):
+            rules.append(Rule(keys, None))
+        else:
+            raise ValueError("Mapping rule must have one of frame, txxx or drop: {!r}".format(entry))
+
+    return rules
+
+
+def load_mapping(filename, base):
+    """Loads rules from a JSON file and returns a mapping in which they take precedence over the base mapping."""
+    with open(filename, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+
+    return base.extend(load_rules(filename), name="{}+sha256:{}".format(base.name, digest))
@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+
+from mutagentools.profiling import phase
+
+import hashlib
+import struct
+
+
+FLAC_MARKER = b'fLaC'
+ID3_MARKER = b'ID3'
+
+STREAMINFO = 0
+PADDING = 1
+APPLICATION = 2
+SEEKTABLE = 3
+VORBIS_COMMENT = 4
+CUESHEET = 5
+PICTURE = 6
+
+BLOCK_HEADER_SIZE = 4
+DIGEST_CHUNK_SIZE = 1024 * 1024
+MAX_BLOCK_LENGTH = (1 << 24) - 1
+
+
+class FLACReadError(Exception):
+    """Raised when a file does not contain valid FLAC metadata."""
+
+
+BlockHeader = namedtuple('BlockHeader', ['type', 'offset', 'length', 'last'])
+BlockHeader.__doc__ = """A metadata block header; offset is the position of the header itself in the file."""
+
+
+class StreamInfo(object):
+    """The decoded STREAMINFO block, with the same attribute names as mutagen's StreamInfo."""
+
+    def __init__(self, data):
+        if len(data) < 34:
+            raise FLACReadError("STREAMINFO block is too short")
+
+        self.min_blocksize, self.max_blocksize = struct.unpack('>HH', data[0:4])
+        self.min_framesize = struct.unpack('>I', b'\x00' + data[4:7])[0]
+        self.max_framesize = struct.unpack('>I', b'\x00' + data[7:10])[0]
+
+        # 20 bits of sample rate, 3 bits of channels, 5 bits of bits per sample and 36 bits of total samples
+        packed = struct.unpack('>Q', data[10:18])[0]
+
+        self.sample_rate = packed >> 44
+        self.channels = ((packed >> 41) & 0x07) + 1
+        self.bits_per_sample = ((packed >> 36) & 0x1f) + 1
+        self.total_samples = packed & 0x0fffffffff
+        self.length = self.total_samples / float(self.sample_rate) if self.sample_rate else 0.0
+
+        high, low = struct.unpack('>QQ', data[18:34])
+        self.md5_signature = (high << 64) | low
+
+
+class Picture(object):
+    """A PICTURE block. data is None unless the reader was asked to load picture payloads."""
+
+    def __init__(self, type=0, mime=u'', desc=u'', width=0, height=0, depth=0, colors=0, size=0, data=None):
+        self.type = type
+        self.mime = mime
+        self.desc = desc
+        self.width = width
+        self.height = height
+        self.depth = depth
+        self.colors = colors
+        self.size = size
+        self.data = data
+
+    def __repr__(self):
+        return "<Picture '{}' ({} bytes)>".format(self.mime, self.size)
+
+
+class FLACMetadata(object):
+    """
+    The metadata of a FLAC file.
+
+    Exposes tags and pictures the same way mutagen's FLAC does for to_json_dict and convert_flac_to_id3: tags maps
+    lowercase Vorbis keys to lists of values, and pictures is a list of Picture instances.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.info = None
+        self.vendor = None
+        self.tags = {}
+        self.pictures = []
+        self.blocks = []
+
+
+def _skip_id3(fileobj):
+    """Skips an ID3v2 tag prepended to the FLAC stream, if one is present."""
+    header = fileobj.read(10)
+
+    if len(header) == 10 and header[0:3] == ID3_MARKER:
+        # synchsafe size, plus a footer if the footer flag is set
+        size = 0
+
+        for b in bytearray(header[6:10]):
+            size = (size << 7) | (b & 0x7f)
+
+        fileobj.seek(10 + size + (10 if bytearray(header)[5] & 0x10 else 0))
+    else:
+        fileobj.seek(0)
+
+
+def iter_block_headers(fileobj):
+    """
+    Yields a BlockHeader for each metadata block in an open FLAC file.
+
+    After each header is yielded, the file is positioned at the start of that block's payload. The caller may read
+    from the payload; the next header is found by seeking past it regardless.
+    """
+    _skip_id3(fileobj)
+
+    if fileobj.read(4) != FLAC_MARKER:
+        raise FLACReadError("Not a FLAC file")
+
+    last = False
+
+    while not last:
+        offset = fileobj.tell()
+        header = fileobj.read(BLOCK_HEADER_SIZE)
+
+        if len(header) < BLOCK_HEADER_SIZE:
+            raise FLACReadError("Truncated metadata block header at offset {}".format(offset))
+
+        packed = struct.unpack('>I', header)[0]
+        last = bool(packed & 0x80000000)
+
+        block = BlockHeader(type=(packed >> 24) & 0x7f, offset=offset, length=packed & MAX_BLOCK_LENGTH, last=last)
+
+        yield block
+
+        fileobj.seek(offset + BLOCK_HEADER_SIZE + block.length)
+
+
+def read_exactly(fileobj, length):
+    """Reads exactly length bytes from a file, raising FLACReadError if it ends first."""
+    data = fileobj.read(length)
+
+    if len(data) != length:
+        raise FLACReadError("Unexpected end of file")
+
+    return data
+
+
+def _parse_vorbis_comment(data):
+    """Parses a VORBIS_COMMENT block payload into a vendor string and a dictionary of lowercase keys to values."""
+    tags = {}
+
+    try:
+        vendor_length = struct.unpack('<I', data[0:4])[0]
+        vendor = data[4:4 + vendor_length].decode('utf-8', 'replace')
+        position = 4 + vendor_length
+
+        count = struct.unpack('<I', data[position:position + 4])[0]
+        position += 4
+
+        for _ in range(count):
+            length = struct.unpack('<I', data[position:position + 4])[0]
+            comment = data[position + 4:position + 4 + length].decode('utf-8', 'replace')
+            position += 4 + length
+
+            if '=' not in comment:
+                continue
+
+            key, value = comment.split('=', 1)
+            tags.setdefault(key.lower(), []).append(value)
+    except struct.error:
+        raise FLACReadError("Malformed VORBIS_COMMENT block")
+
+    return vendor, tags
+
+
+def _read_picture(fileobj, length, include_data):
+    """Reads a PICTURE block from the current position, seeking past the payload unless include_data is set."""
+    picture_type, mime_length = struct.unpack('>II', read_exactly(fileobj, 8))
+    mime = read_exactly(fileobj, mime_length).decode('ascii', 'replace')
+
+    desc_length = struct.unpack('>I', read_exactly(fileobj, 4))[0]
+    desc = read_exactly(fileobj, desc_length).decode('utf-8', 'replace')
+
+    width, height, depth, colors, size = struct.unpack('>IIIII', read_exactly(fileobj, 20))
+
+    if 32 + mime_length + desc_length + size > length:
+        raise FLACReadError("Malformed PICTURE block")
+
+    return Picture(type=picture_type, mime=mime, desc=desc, width=width, height=height, depth=depth, colors=colors,
+        size=size, data=read_exactly(fileobj, size) if include_data else None)
+
+
+def read_metadata(filename, pictures=False):
+    """
+    Reads the metadata of a FLAC file without parsing its audio or, unless asked, its picture payloads.
+
+    The result can be passed to to_json_dict, or with pictures=True to convert_flac_to_id3, in place of a mutagen FLAC.
+    """
+    result = FLACMetadata(filename)
+
+    with phase('open'):
+        f = open(filename, 'rb')
+
+    with f, phase('parse'):
+        for block in iter_block_headers(f):
+            result.blocks.append(block)
+
+            if block.type == STREAMINFO:
+                result.info = StreamInfo(read_exactly(f, block.length))
+            elif block.type == VORBIS_COMMENT:
+                vendor, tags = _parse_vorbis_comment(read_exactly(f, block.length))
+                result.vendor = vendor
+
+                for key, values in tags.items():
+                    result.tags.setdefault(key, []).extend(values)
+            elif block.type == PICTURE:
+                result.pictures.append(_read_picture(f, block.length, pictures))
+
+    if result.info is None:
+        raise FLACReadError("No STREAMINFO block found")
+
+    return result
+
+
+def metadata_digest(filename):
+    """
+    Returns a hex SHA-256 digest of the VORBIS_COMMENT and PICTURE blocks of a FLAC file.
+
+    The digest only changes when tags or pictures change, not when audio data or padding do.
+    """
+    digest = hashlib.sha256()
+
+    with open(filename, 'rb') as f:
+        for block in iter_block_headers(f):
+            if block.type not in (VORBIS_COMMENT, PICTURE):
+                continue
+
+            digest.update(struct.pack('>BI', block.type, block.length))
+            remaining = block.length
+
+            while remaining > 0:
+                chunk = read_exactly(f, min(remaining, DIGEST_CHUNK_SIZE))
+                digest.update(chunk)
+                remaining -= len(chunk)
+
+    return digest.hexdigest()
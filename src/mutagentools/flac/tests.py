@@ -9,6 +9,15 @@ from mutagen.id3 import (
 )
 
 from mutagentools.flac import to_json_dict
+from mutagentools.flac.clear import clear_in_place, padding_lengths
+from mutagentools.flac.manifest import Manifest, source_fingerprint
+from mutagentools.flac.mapping import Mapping, Rule, load_mapping, load_rules
+from mutagentools.flac.convert import DEFAULT_MAPPING
+from mutagentools.flac.reader import (
+    BLOCK_HEADER_SIZE, FLACReadError, MAX_BLOCK_LENGTH, PADDING, PICTURE, STREAMINFO, metadata_digest, read_metadata
+)
+from mutagentools.jsonstream import Base64Data
+from mutagentools.pictures import PicturePolicy
 from mutagentools.flac.convert import (
     convert_flac_to_id3,
     convert_generic_to_txxx,
@@ -34,8 +43,10 @@ from mutagentools.flac.convert import (
 import json
 import mock
 import os
+import shutil
 import six
 import struct
+import tempfile
 import unittest
 
 from mock import patch
@@ -82,6 +93,29 @@ class MainTestCase(unittest.TestCase):
         self.assertEqual(op.type, p.get('type'))
         self.assertEqual('COVER_FRONT', p.get('type_friendly'))
 
+        # streamed pictures are left to be encoded as they are written
+        self.assertEqual(Base64Data(op.data), to_json_dict(fixture, include_pics=True,
+            stream_pictures=True)['pictures'][0]['data'])
+
+    def test_to_json_dict_pictures_dir(self):
+        """Tests that pictures are stored by content hash and referenced when a pictures directory is given."""
+        fixture = FLAC(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'fixtures/fixture.flac'))
+        pictures_dir = tempfile.mkdtemp()
+
+        try:
+            result = to_json_dict(fixture, include_pics=True, pictures_dir=pictures_dir)
+            p = result.get('pictures')[0]
+
+            self.assertNotIn('data', p.keys())
+            self.assertEqual(len(fixture.pictures[0].data), p.get('size'))
+            self.assertEqual('image/png', p.get('mime'))
+            self.assertEqual(3, p.get('type'))
+
+            with open(os.path.join(pictures_dir, p.get('hash') + '.png'), 'rb') as f:
+                self.assertEqual(fixture.pictures[0].data, f.read())
+        finally:
+            shutil.rmtree(pictures_dir)
+
     def test_to_json_dict_flatten(self):
         """Tests formatting FLAC metadata as a JSON-compatible flat dictionary."""
         fixture = FLAC(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'fixtures/fixture.flac'))
@@ -104,6 +138,195 @@ class MainTestCase(unittest.TestCase):
         self.assertEqual(1, len(result.get('pictures')))
 
 
+class ReaderTestCase(unittest.TestCase):
+
+    fixture_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'fixtures/fixture.flac')
+
+    def test_read_metadata(self):
+        """Tests that the native reader decodes the same metadata as mutagen."""
+        expected = FLAC(self.fixture_path)
+        result = read_metadata(self.fixture_path)
+
+        self.assertEqual(dict(expected.tags), result.tags)
+        self.assertEqual(expected.tags.vendor, result.vendor)
+
+        for attr in ('sample_rate', 'channels', 'bits_per_sample', 'total_samples', 'length', 'md5_signature'):
+            self.assertEqual(getattr(expected.info, attr), getattr(result.info, attr))
+
+        self.assertEqual(STREAMINFO, result.blocks[0].type)
+        self.assertTrue(result.blocks[-1].last)
+
+        # picture payloads are skipped by default
+        self.assertEqual(1, len(result.pictures))
+        self.assertIsNone(result.pictures[0].data)
+        self.assertEqual(len(expected.pictures[0].data), result.pictures[0].size)
+
+        for attr in ('type', 'mime', 'desc', 'width', 'height', 'depth', 'colors'):
+            self.assertEqual(getattr(expected.pictures[0], attr), getattr(result.pictures[0], attr))
+
+        # and read when asked for
+        self.assertEqual(expected.pictures[0].data, read_metadata(self.fixture_path, pictures=True).pictures[0].data)
+
+    def test_read_metadata_compatible(self):
+        """Tests that to_json_dict and convert_flac_to_id3 produce identical output from either reader."""
+        expected = FLAC(self.fixture_path)
+
+        self.assertEqual(to_json_dict(expected, flatten=True), to_json_dict(read_metadata(self.fixture_path),
+            flatten=True))
+        self.assertEqual(to_json_dict(expected, include_pics=True), to_json_dict(read_metadata(self.fixture_path,
+            pictures=True), include_pics=True))
+        self.assertEqual(list(map(repr, convert_flac_to_id3(expected))),
+            list(map(repr, convert_flac_to_id3(read_metadata(self.fixture_path, pictures=True)))))
+
+    def test_read_metadata_id3_prefix(self):
+        """Tests that an ID3v2 tag in front of the FLAC stream is skipped."""
+        fd, path = tempfile.mkstemp(suffix='.flac')
+
+        try:
+            with os.fdopen(fd, 'wb') as f, open(self.fixture_path, 'rb') as fixture:
+                # ID3v2.4 header with a synchsafe size of 128 bytes of padding
+                f.write(b'ID3\x04\x00\x00\x00\x00\x01\x00' + bytes([0x00] * 128) + fixture.read())
+
+            self.assertEqual(['Album'], read_metadata(path).tags.get('album'))
+            self.assertEqual(PICTURE, read_metadata(path).blocks[2].type)
+        finally:
+            os.unlink(path)
+
+    def test_read_metadata_invalid(self):
+        """Tests that non-FLAC files are rejected."""
+        no_id3 = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../id3/fixtures/no-id3.mp3')
+        self.assertRaises(FLACReadError, read_metadata, no_id3)
+
+
+class ClearTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'fixture.flac')
+
+        shutil.copy(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'fixtures/fixture.flac'), self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_padding_lengths(self):
+        """Tests that padding is split into blocks which exactly fill the given size."""
+        self.assertEqual([], padding_lengths(0))
+        self.assertEqual([0], padding_lengths(BLOCK_HEADER_SIZE))
+        self.assertEqual([96], padding_lengths(100))
+        self.assertEqual([MAX_BLOCK_LENGTH], padding_lengths(MAX_BLOCK_LENGTH + BLOCK_HEADER_SIZE))
+
+        for total in (MAX_BLOCK_LENGTH + BLOCK_HEADER_SIZE + 2, 3 * MAX_BLOCK_LENGTH):
+            lengths = padding_lengths(total)
+
+            self.assertEqual(total, sum(lengths) + BLOCK_HEADER_SIZE * len(lengths))
+            self.assertTrue(all(0 <= length <= MAX_BLOCK_LENGTH for length in lengths))
+
+        self.assertRaises(ValueError, padding_lengths, 2)
+
+    def test_clear_in_place(self):
+        """Tests that tags and pictures are replaced by padding without moving audio data."""
+        before = read_metadata(self.path)
+        end = before.blocks[-1].offset + BLOCK_HEADER_SIZE + before.blocks[-1].length
+
+        with open(self.path, 'rb') as f:
+            original = f.read()
+
+        written = clear_in_place(self.path)
+
+        with open(self.path, 'rb') as f:
+            cleared = f.read()
+
+        # the audio frames are untouched and nothing past the metadata was written
+        self.assertEqual(len(original), len(cleared))
+        self.assertEqual(original[end:], cleared[end:])
+        self.assertTrue(0 < written <= end)
+
+        after = read_metadata(self.path)
+        self.assertEqual({}, after.tags)
+        self.assertEqual([], after.pictures)
+        self.assertEqual(PADDING, after.blocks[-1].type)
+        self.assertTrue(after.blocks[-1].last)
+
+        flac = FLAC(self.path)
+        self.assertFalse(flac.tags)
+        self.assertEqual([], flac.pictures)
+        self.assertEqual(before.info.md5_signature, flac.info.md5_signature)
+
+        # there is nothing left to remove
+        self.assertEqual(0, clear_in_place(self.path))
+
+
+class ManifestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source = os.path.join(self.directory, 'source.flac')
+        self.destination = os.path.join(self.directory, 'destination.mp3')
+
+        shutil.copy(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'fixtures/fixture.flac'), self.source)
+        open(self.destination, 'w').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_metadata_digest(self):
+        """Tests that the metadata digest changes with tags but not with padding."""
+        digest = metadata_digest(self.source)
+
+        f = FLAC(self.source)
+        f.save(padding=lambda info: 4096)
+        self.assertEqual(digest, metadata_digest(self.source))
+
+        f['album'] = 'Another Album'
+        f.save()
+        self.assertNotEqual(digest, metadata_digest(self.source))
+
+    def test_manifest(self):
+        """Tests that the manifest tracks sources, destinations and options."""
+        manifest = Manifest(os.path.join(self.directory, 'manifest.db'))
+
+        self.assertFalse(manifest.is_current(self.source, self.destination, 'a'))
+
+        manifest.record(self.source, self.destination, 'a')
+
+        self.assertTrue(manifest.is_current(self.source, self.destination, 'a'))
+        self.assertFalse(manifest.is_current(self.source, self.destination, 'b'))
+        self.assertFalse(manifest.is_current(self.source, self.destination + '.other', 'a'))
+
+        # touching the file without changing its tags keeps it current
+        os.utime(self.source, (0, 0))
+        self.assertTrue(manifest.is_current(self.source, self.destination, 'a'))
+
+        # changing the tags does not
+        f = FLAC(self.source)
+        f['title'] = 'Title'
+        f.save()
+        self.assertFalse(manifest.is_current(self.source, self.destination, 'a'))
+
+        # and neither does deleting the destination
+        manifest.record(self.source, self.destination, 'a')
+        os.unlink(self.destination)
+        self.assertFalse(manifest.is_current(self.source, self.destination, 'a'))
+
+        manifest.close()
+
+        # entries persist
+        manifest = Manifest(os.path.join(self.directory, 'manifest.db'))
+        open(self.destination, 'w').close()
+        self.assertTrue(manifest.is_current(self.source, self.destination, 'a'))
+
+        # a source changed after its fingerprint was taken, while being copied, isn't current
+        fingerprint = source_fingerprint(self.source)
+        f = FLAC(self.source)
+        f['title'] = 'Changed During Copy'
+        f.save()
+        manifest.record(self.source, self.destination, 'a', fingerprint=fingerprint)
+        self.assertFalse(manifest.is_current(self.source, self.destination, 'a'))
+
+        manifest.close()
+
+
 class FullConversionTestCase(unittest.TestCase):
 
     def test_convert_flac_to_id3(self):
@@ -200,6 +423,27 @@ class FullConversionTestCase(unittest.TestCase):
         self.assertEqual(cover_back.desc, apic_back.desc)
         self.assertEqual(bytes(cover_back.data), apic_back.data)
 
+    def test_convert_flac_to_id3_picture_policy(self):
+        """Tests that a picture policy collapses duplicate pictures and drops oversized ones."""
+        flac_mock = mock.MagicMock()
+        flac_mock.tags = {}
+
+        pictures = []
+
+        for type, desc, data in ((3, 'Front', b'cover'), (0, 'Other', b'cover'), (4, 'Back', b'much larger cover')):
+            picture = Picture()
+            picture.type, picture.desc, picture.mime, picture.data = type, desc, 'image/jpeg', data
+            pictures.append(picture)
+
+        flac_mock.pictures = pictures
+
+        result = convert_flac_to_id3(flac_mock, picture_policy=PicturePolicy(dedupe=True, max_size=8))
+        apic_list = list(filter(lambda t: t.FrameID == 'APIC', result))
+
+        self.assertEqual(1, len(apic_list))
+        self.assertEqual(3, apic_list[0].type)
+        self.assertEqual(b'cover', apic_list[0].data)
+
     def test_convert_flac_to_id3_track(self):
         """
         Test that converting FLAC tags to ID3 tags for complicated tracknumber tags.
@@ -299,6 +543,77 @@ class FullConversionTestCase(unittest.TestCase):
         ))))
 
 
+class MappingTestCase(unittest.TestCase):
+
+    def create_mapping_file(self, rules):
+        fd, path = tempfile.mkstemp(suffix='.json')
+
+        with os.fdopen(fd, 'w') as f:
+            json.dump(rules, f)
+
+        self.addCleanup(os.unlink, path)
+
+        return path
+
+    def test_mapping(self):
+        """Tests rule priority, extras and the fallback for unmatched keys."""
+        mapping = Mapping([
+            Rule(['a', 'b'], lambda v: ('ab', v)),
+            Rule(['c'], lambda v, d: ('c', v, d), extras=[['d', 'e']]),
+            Rule(['x'], None),
+        ], fallback=lambda k, v: ('fallback', k, v))
+
+        # the first non-empty key by priority is used; extras are passed along and dropped keys are discarded
+        self.assertEqual([('ab', 'A'), ('c', 'C', 'E'), ('fallback', 'z', 'Z')],
+            mapping.convert({'z': 'Z', 'e': 'E', 'b': 'B', 'c': 'C', 'a': 'A', 'x': 'X'}))
+        self.assertEqual([('ab', 'B')], mapping.convert({'a': '', 'b': 'B'}))
+
+        # extras without their main key fall back in their original order
+        self.assertEqual([('fallback', 'z', 'Z'), ('fallback', 'd', 'D')], mapping.convert({'z': 'Z', 'd': 'D'}))
+
+    def test_load_rules(self):
+        """Tests loading rules from a JSON file."""
+        path = self.create_mapping_file([
+            {'keys': ['Label', 'publisher'], 'frame': 'TPUB'},
+            {'keys': ['comment'], 'txxx': 'note'},
+            {'keys': ['replaygain_track_gain'], 'drop': True},
+        ])
+
+        rules = load_rules(path)
+
+        self.assertEqual(3, len(rules))
+        self.assertEqual(('label', 'publisher'), rules[0].keys)
+        self.assertEqual(['Label'], rules[0].convert('Label'))
+        self.assertEqual('note', rules[1].convert('Comment').desc)
+        self.assertIsNone(rules[2].convert)
+
+        self.assertRaises(ValueError, load_rules, self.create_mapping_file([{'keys': ['a'], 'frame': 'APIC'}]))
+        self.assertRaises(ValueError, load_rules, self.create_mapping_file([{'keys': ['a'], 'frame': 'TXXX'}]))
+        self.assertRaises(ValueError, load_rules, self.create_mapping_file([{'keys': ['a']}]))
+        self.assertRaises(ValueError, load_rules, self.create_mapping_file({'keys': ['a'], 'drop': True}))
+
+    def test_convert_flac_to_id3_mapping(self):
+        """Tests that rules loaded from a file extend and override the default mapping."""
+        mapping = load_mapping(self.create_mapping_file([
+            {'keys': ['label'], 'frame': 'TPUB'},
+            {'keys': ['organization'], 'txxx': 'organization'},
+            {'keys': ['source'], 'drop': True},
+        ]), DEFAULT_MAPPING)
+
+        flac_mock = mock.MagicMock()
+        flac_mock.tags = {'label': 'Label', 'organization': 'Organization', 'source': 'CD', 'album': 'Album'}
+        flac_mock.pictures = []
+
+        id3 = ID3()
+        list(map(lambda t: id3.add(t), convert_flac_to_id3(flac_mock, mapping=mapping)))
+
+        self.assertEqual(['Label'], id3.get('TPUB'))
+        self.assertEqual(['Organization'], id3.get('TXXX:organization'))
+        self.assertEqual(['Album'], id3.get('TALB'))
+        self.assertNotIn('TXXX:source', id3.keys())
+        self.assertTrue(repr(mapping).startswith("Mapping('default+sha256:"))
+
+
 class IndividualConversionTestCase(unittest.TestCase):
 
     def test_convert_generic_to_txxx(self):
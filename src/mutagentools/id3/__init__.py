@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 from base64 import b64encode
+from collections import OrderedDict
 
 from mutagen.id3 import (
     NumericTextFrame, TextFrame, UrlFrame, BinaryFrame, APIC, TXXX, UFID
@@ -17,69 +18,39 @@ from mutagentools.id3.filters import (
     private_google_tags, non_picture_tags,
 )
 
+from mutagentools.jsonstream import Base64Data
+from mutagentools.pictures import picture_reference
+from mutagentools.profiling import phase
 from mutagentools.utils import fold_text_keys
 
 
-def to_json_dict(id3, include_pics=False, flatten=False):
-    """Outputs ID3 tags in a JSON-compatible format."""
+def to_json_dict(id3, include_pics=False, flatten=False, pictures_dir=None, stream_pictures=False):
+    """
+    Outputs ID3 tags in a JSON-compatible format.
+
+    If pictures_dir is given, APIC data is written once into that directory by content hash and referenced by hash
+    and size rather than embedded as base64 data. If stream_pictures is set, APIC data is given as Base64Data, to be
+    encoded while it is written by write_json, rather than as a base64 string.
+    """
+    with phase('to_json'):
+        return _to_json_dict(id3, include_pics, flatten, pictures_dir, stream_pictures)
+
+
+def _to_json_dict(id3, include_pics, flatten, pictures_dir, stream_pictures):
     result = {}
 
-    frame_names = set(map(lambda f: f.FrameID, id3.values()))
-
-    if not include_pics:
-        # filter pictures if asked
-        frame_names = set(filter(lambda f: f != 'APIC', frame_names))
-
-    for frame_name in frame_names:
-        frames = list(filter(lambda f: f.FrameID == frame_name, id3.values()))
-        values = result.get(frame_name, [])
-
-        if isinstance(frames[0], TXXX):
-            values = values if isinstance(values, dict) else {}
-            values.update({ f.desc: f.text for f in frames })
-        elif isinstance(frames[0], UFID):
-            values = values if isinstance(values, dict) else {}
-            values.update({ f.owner: f.data.decode('utf-8') for f in frames })
-        elif isinstance(frames[0], NumericTextFrame):
-            # integer-representable text frame
-            values += [int(text) for frame in frames for text in frame.text]
-        elif isinstance(frames[0], TextFrame):
-            # generic text string
-            values += [str(text) for frame in frames for text in frame.text]
-        elif isinstance(frames[0], UrlFrame):
-            # url
-            values += [url for frame in frames for url in \
-                ([frame.url] if not isinstance(frame.url, (list, set)) else frame.url)]
-        elif isinstance(frames[0], BinaryFrame):
-            # raw, binary data, encode to base64
-            values += [b64encode(frame.data).decode('utf-8') for frame in frames]
-        elif isinstance(frames[0], APIC):
-            # structured picture tag, encode data to base64
-            values += [{
-                'data': b64encode(frame.data).decode('utf-8'),
-                'desc': frame.desc,
-                'mime': frame.mime,
-                'type': int(frame.type),
-                'type_friendly': str(frame.type).split('.')[-1],
-            } for frame in frames]
-        else:
-            # it's a generic structured frame, break it down
-            for frame in frames:
-                struct = {}
-
-                for fspec in frame._framespec:
-                    if isinstance(fspec, BinaryDataSpec):
-                        struct[fspec.name] = b64encode(getattr(frame,fspec.name))
-                    elif isinstance(fspec, (EncodedTextSpec, Latin1TextSpec, StringSpec)):
-                        struct[fspec.name] = getattr(frame,fspec.name)
-                    elif isinstance(fspec, (ByteSpec, IntegerSpec, SizedIntegerSpec)):
-                        struct[fspec.name] = int(getattr(frame, fspec.name))
-                    else:
-                        pass
-
-                values.append(struct)
-
-        result[frame_name] = values
+    # group frames by frame id in a single pass
+    groups = OrderedDict()
+
+    for frame in id3.values():
+        if not include_pics and frame.FrameID == 'APIC':
+            # filter pictures if asked
+            continue
+
+        groups.setdefault(frame.FrameID, []).append(frame)
+
+    for frame_name, frames in groups.items():
+        result[frame_name] = serializer_for(type(frames[0]))(frames, pictures_dir, stream_pictures)
 
     # if we're supposed to flatten, do it now
     if flatten:
@@ -89,6 +60,91 @@ def to_json_dict(id3, include_pics=False, flatten=False):
     return result
 
 
+_serializers = {}
+
+
+def serializer_for(frame_class):
+    """Returns the cached serializer for a frame class, building it on first use."""
+    serializer = _serializers.get(frame_class)
+
+    if serializer is None:
+        serializer = _serializers[frame_class] = build_serializer(frame_class)
+
+    return serializer
+
+
+def build_serializer(frame_class):
+    """
+    Builds a function which renders a list of frames of the given class into their JSON-compatible value.
+
+    The function takes the frames, a pictures directory, which is only used for APIC frames, and whether to give the
+    data of APIC frames as Base64Data.
+    """
+    if issubclass(frame_class, TXXX):
+        return lambda frames, pictures_dir, stream=False: { f.desc: f.text for f in frames }
+    elif issubclass(frame_class, UFID):
+        return lambda frames, pictures_dir, stream=False: { f.owner: f.data.decode('utf-8') for f in frames }
+    elif issubclass(frame_class, NumericTextFrame):
+        # integer-representable text frame
+        return lambda frames, pictures_dir, stream=False: [int(text) for frame in frames for text in frame.text]
+    elif issubclass(frame_class, TextFrame):
+        # generic text string
+        return lambda frames, pictures_dir, stream=False: [str(text) for frame in frames for text in frame.text]
+    elif issubclass(frame_class, UrlFrame):
+        # url
+        return lambda frames, pictures_dir, stream=False: [url for frame in frames for url in \
+            ([frame.url] if not isinstance(frame.url, (list, set)) else frame.url)]
+    elif issubclass(frame_class, BinaryFrame):
+        # raw, binary data, encode to base64
+        return binary_to_json
+    elif issubclass(frame_class, APIC):
+        # structured picture tag, encode data to base64 or store it by content hash
+        return lambda frames, pictures_dir, stream=False: [picture_to_json_dict(frame, pictures_dir, stream)
+            for frame in frames]
+
+    # it's a generic structured frame, work out how to break it down once
+    fields = []
+
+    for fspec in frame_class._framespec:
+        if isinstance(fspec, BinaryDataSpec):
+            fields.append((fspec.name, b64encode))
+        elif isinstance(fspec, (EncodedTextSpec, Latin1TextSpec, StringSpec)):
+            fields.append((fspec.name, None))
+        elif isinstance(fspec, (ByteSpec, IntegerSpec, SizedIntegerSpec)):
+            fields.append((fspec.name, int))
+
+    return lambda frames, pictures_dir, stream=False: [
+        { name: convert(getattr(frame, name)) if convert else getattr(frame, name) for name, convert in fields }
+        for frame in frames
+    ]
+
+
+def binary_to_json(frames, pictures_dir=None, stream=False):
+    """Renders binary frames as a list of their base64-encoded data."""
+    with phase('base64'):
+        return [b64encode(frame.data).decode('utf-8') for frame in frames]
+
+
+def picture_to_json_dict(frame, pictures_dir=None, stream=False):
+    """Renders an APIC frame into a JSON-compatible dictionary, giving its data as Base64Data if stream is set."""
+    entry = {
+        'desc': frame.desc,
+        'mime': frame.mime,
+        'type': int(frame.type),
+        'type_friendly': str(frame.type).split('.')[-1],
+    }
+
+    if pictures_dir:
+        entry.update(picture_reference(pictures_dir, frame.data, frame.mime))
+    elif stream:
+        entry['data'] = Base64Data(frame.data)
+    else:
+        with phase('base64'):
+            entry['data'] = b64encode(frame.data).decode('utf-8')
+
+    return entry
+
+
 def strip_private_tags(id3, save=True):
     """Removes all private identifying tags from a given ID3 instance."""
     private_tags = list(private_google_tags(id3).keys())
@@ -98,6 +154,7 @@ def strip_private_tags(id3, save=True):
         id3.pop(k)
 
     if save:
-        id3.save()
+        with phase('save'):
+            id3.save()
 
     return private_tags
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import OrderedDict, namedtuple
+
+import os
+
+
+class TagDiff(namedtuple('TagDiff', ['added', 'changed', 'removed'])):
+    """
+    The differences between the frames of a tag and the frames it should have, as sorted lists of the hash keys of
+    the frames to be added, changed and removed. A diff is false if there are no differences.
+    """
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+    __nonzero__ = __bool__
+
+
+def frames_by_key(frames):
+    """Returns frames by hash key, in order; as when adding them to a tag, a later frame replaces an earlier one."""
+    return OrderedDict((frame.HashKey, frame) for frame in frames)
+
+
+def frames_equal(a, b):
+    """Returns whether two frames have the same type and values, ignoring the text encoding they are stored in."""
+    if type(a) is not type(b):
+        return False
+
+    specs = list(type(a)._framespec) + list(getattr(type(a), '_optionalspec', []))
+
+    return all(getattr(a, spec.name, None) == getattr(b, spec.name, None) for spec in specs
+        if spec.name != 'encoding')
+
+
+def diff_tags(tags, frames, delete=False):
+    """
+    Compares the frames of existing tags with the frames they should have, returning a TagDiff.
+
+    Frames are matched by hash key. If delete is set, frames of the tags with no counterpart are to be removed;
+    otherwise they are left alone.
+    """
+    wanted = frames_by_key(frames)
+    existing = dict(tags.items())
+
+    added = sorted(key for key in wanted if key not in existing)
+    changed = sorted(key for key in wanted if key in existing and not frames_equal(existing[key], wanted[key]))
+    removed = sorted(key for key in existing if key not in wanted) if delete else []
+
+    return TagDiff(added, changed, removed)
+
+
+def apply_diff(tags, frames, diff):
+    """Changes tags by a TagDiff of the given frames, touching only the frames which differ."""
+    wanted = frames_by_key(frames)
+
+    for key in diff.removed:
+        del tags[key]
+
+    for key in diff.added + diff.changed:
+        tags.add(wanted[key])
+
+
+def has_id3v1(filename):
+    """Returns whether a file ends with an ID3v1 tag."""
+    with open(filename, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+
+        if f.tell() < 128:
+            return False
+
+        f.seek(-128, os.SEEK_END)
+
+        return f.read(3) == b'TAG'
@@ -8,16 +8,26 @@ from mutagen.id3 import (
 )
 
 from mutagentools.id3 import (
+    serializer_for,
     strip_private_tags,
     to_json_dict,
 )
 
+from mutagentools.id3.diff import (
+    apply_diff,
+    diff_tags,
+    frames_equal,
+)
+
 from mutagentools.id3.filters import (
     private_google_tags,
     non_picture_tags,
 )
 
 import mock
+import os
+import shutil
+import tempfile
 import unittest
 
 from mock import patch
@@ -160,6 +170,38 @@ class MainTestCase(unittest.TestCase):
 
         self.assertEqual({'key': ['value']}, result.get('TXXX'))
 
+    def test_serializer_for(self):
+        """Tests that serializers are built once per frame class."""
+        self.assertIs(serializer_for(PRIV), serializer_for(PRIV))
+        self.assertIsNot(serializer_for(PRIV), serializer_for(TXXX))
+
+        frames = [PRIV(owner="Naftuli", data=b"something"), PRIV(owner="The Dude", data=b"amazing")]
+
+        self.assertEqual([{ 'owner': 'Naftuli', 'data': b64encode(b'something') },
+            { 'owner': 'The Dude', 'data': b64encode(b'amazing') }], serializer_for(PRIV)(frames, None))
+
+    def test_to_json_dict_pictures_dir(self):
+        """Tests that identical pictures are stored once and referenced by content hash."""
+        picture_binary = bytes([0x00] * 32)
+
+        fixture = ID3()
+        fixture.add(APIC(encoding=Encoding.UTF8, mime="image/jpeg", type=PictureType.COVER_FRONT, desc="Cover",
+            data=picture_binary))
+        fixture.add(APIC(encoding=Encoding.UTF8, mime="image/jpeg", type=PictureType.COVER_BACK, desc="Back Cover",
+            data=picture_binary))
+
+        pictures_dir = tempfile.mkdtemp()
+
+        try:
+            result = to_json_dict(fixture, include_pics=True, pictures_dir=pictures_dir)
+
+            self.assertEqual(2, len(result.get('APIC')))
+            self.assertEqual(1, len(set(p.get('hash') for p in result.get('APIC'))))
+            self.assertTrue(all('data' not in p and p.get('size') == 32 for p in result.get('APIC')))
+            self.assertEqual([result.get('APIC')[0].get('hash') + '.jpg'], os.listdir(pictures_dir))
+        finally:
+            shutil.rmtree(pictures_dir)
+
     def test_to_json_dict_flat(self):
         """Tests the flat json dict."""
         fixture = ID3()
@@ -221,3 +263,39 @@ class FilterTestCase(unittest.TestCase):
         self.assertEqual(2, len(keys))
         self.assertIn('PRIV:Google/StoreId:rT9HEn6sL6tN7yhk6oDQfpi1ip6', keys)
         self.assertIn('PRIV:Google/StoreLabelCode:HOD3zSlIr8rjcwXXiS', keys)
+
+
+class DiffTestCase(unittest.TestCase):
+
+    def test_frames_equal(self):
+        """Tests that frames are compared by value, ignoring their text encoding."""
+        self.assertTrue(frames_equal(TIT2(encoding=Encoding.UTF8, text=['a']), TIT2(encoding=Encoding.LATIN1,
+            text=['a'])))
+        self.assertFalse(frames_equal(TIT2(encoding=Encoding.UTF8, text=['a']), TIT2(encoding=Encoding.UTF8,
+            text=['b'])))
+        self.assertFalse(frames_equal(TIT2(encoding=Encoding.UTF8, text=['a']), TPE2(encoding=Encoding.UTF8,
+            text=['a'])))
+        self.assertTrue(frames_equal(PRIV(owner='a', data=b'1'), PRIV(owner='a', data=b'1')))
+        self.assertFalse(frames_equal(PRIV(owner='a', data=b'1'), PRIV(owner='a', data=b'2')))
+
+    def test_diff_tags(self):
+        """Tests that tags are diffed by hash key, and that applying a diff makes them match."""
+        tags = ID3()
+        tags.add(TIT2(encoding=Encoding.UTF8, text=['Title']))
+        tags.add(TPE2(encoding=Encoding.UTF8, text=['Old']))
+        tags.add(TXXX(encoding=Encoding.UTF8, desc='extra', text=['extra']))
+
+        frames = [TIT2(encoding=Encoding.UTF8, text=['Title']), TPE2(encoding=Encoding.UTF8, text=['New']),
+            TBPM(encoding=Encoding.UTF8, text=['120'])]
+
+        diff = diff_tags(tags, frames)
+        self.assertEqual((['TBPM'], ['TPE2'], []), diff)
+        self.assertTrue(diff)
+
+        diff = diff_tags(tags, frames, delete=True)
+        self.assertEqual(['TXXX:extra'], diff.removed)
+
+        apply_diff(tags, frames, diff)
+        self.assertEqual(['TBPM', 'TIT2', 'TPE2'], sorted(tags.keys()))
+        self.assertEqual(['New'], tags.get('TPE2'))
+        self.assertFalse(diff_tags(tags, frames, delete=True))
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mutagen.mp3 import MP3
+
+from mutagentools.flac import read_metadata, to_json_dict as flac_to_json_dict
+from mutagentools.id3 import to_json_dict as id3_to_json_dict
+from mutagentools.paths import walk_files
+from mutagentools.utils import json_default
+
+import json
+import os
+import sqlite3
+import time
+
+
+FORMATS = {
+    '.flac': 'flac',
+    '.mp3': 'mp3',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    format TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    scan INTEGER NOT NULL,
+    tags TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    path TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS tags_key ON tags (key, value);
+CREATE INDEX IF NOT EXISTS tags_path ON tags (path, key);
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL
+);
+"""
+
+
+def file_format(path):
+    """Returns the format of a file from its extension, or None if it isn't one that can be indexed."""
+    return FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def find_files(paths):
+    """Yields every indexable file among the given paths, walking directories recursively in a stable order."""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+
+        for filename in walk_files(path, FORMATS):
+            yield filename
+
+
+def read_tags(path):
+    """Reads a file's tags, without pictures, as to_json_dict renders them, returning the format and the tags."""
+    format = file_format(path)
+
+    if format == 'flac':
+        return format, flac_to_json_dict(read_metadata(path))
+
+    if format == 'mp3':
+        return format, id3_to_json_dict(MP3(path).tags or {})
+
+    raise ValueError("Unsupported file type: {}".format(path))
+
+
+def _text(value):
+    return value if isinstance(value, str) else str(value)
+
+
+def tag_rows(tags):
+    """
+    Yields a (key, value) row for every value in the output of to_json_dict.
+
+    Values of dictionary entries such as TXXX are keyed by entry and description, as in TXXX:comment. Structured
+    frames such as PRIV are keyed by entry and owner or description, as in PRIV:Google/StoreId, with their text if
+    they have any. Values are stored as text.
+    """
+    for key, value in tags.items():
+        if isinstance(value, dict):
+            for qualifier, values in value.items():
+                for item in (values if isinstance(values, list) else [values]):
+                    yield '{}:{}'.format(key, qualifier), _text(item)
+
+            continue
+
+        for item in (value if isinstance(value, list) else [value]):
+            if not isinstance(item, dict):
+                yield key, _text(item)
+                continue
+
+            qualifier = item.get('owner', item.get('desc'))
+            text = item.get('text')
+
+            yield key if qualifier is None else '{}:{}'.format(key, qualifier), \
+                _text(text) if isinstance(text, (str, int)) else None
+
+
+class TagIndex(object):
+    """
+    An SQLite index of the tags of a music library.
+
+    Each file is stored with its format, size, modification time and tags as rendered by to_json_dict, and every tag
+    value is also stored as a (key, value) row so that files can be queried by tag. A file only needs to be read
+    again if its size or modification time changed.
+    """
+
+    def __init__(self, filename, commit_interval=1000):
+        self.filename = filename
+        self.commit_interval = commit_interval
+        self.pending = 0
+        self.scan_id = None
+        self.connection = sqlite3.connect(filename)
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+    def begin_scan(self):
+        """Starts a scan; every file checked or updated from now on is marked as seen by it."""
+        self.scan_id = self.connection.execute("INSERT INTO scans (started) VALUES (?)", (time.time(),)).lastrowid
+
+        return self.scan_id
+
+    def is_current(self, path, size, mtime_ns):
+        """Returns whether the file is indexed with the given size and modification time, marking it as seen if so."""
+        row = self.connection.execute("SELECT size, mtime_ns FROM files WHERE path = ?", (path,)).fetchone()
+
+        if row is None or tuple(row) != (size, mtime_ns):
+            return False
+
+        self.mark_seen(path)
+
+        return True
+
+    def mark_seen(self, path):
+        """
+        Marks a file as seen by the current scan, keeping what is indexed for it, so that a file which couldn't be read
+        again isn't removed as if it no longer existed.
+        """
+        if self.scan_id is not None:
+            self.connection.execute("UPDATE files SET scan = ? WHERE path = ?", (self.scan_id, path))
+            self._committed()
+
+    def update(self, path, format, size, mtime_ns, tags):
+        """Stores the tags of a file, replacing whatever was indexed for it before."""
+        self.connection.execute("INSERT OR REPLACE INTO files (path, format, size, mtime_ns, scan, tags) "
+            "VALUES (?, ?, ?, ?, ?, ?)", (path, format, size, mtime_ns, self.scan_id or 0,
+            json.dumps(tags, sort_keys=True, default=json_default)))
+        self.connection.execute("DELETE FROM tags WHERE path = ?", (path,))
+        self.connection.executemany("INSERT INTO tags (path, key, value) VALUES (?, ?, ?)",
+            ((path, key, value) for key, value in tag_rows(tags)))
+        self._committed()
+
+    def remove(self, path):
+        """Removes a file from the index."""
+        self.connection.execute("DELETE FROM tags WHERE path = ?", (path,))
+        self.connection.execute("DELETE FROM files WHERE path = ?", (path,))
+        self._committed()
+
+    def remove_unseen(self, roots):
+        """
+        Removes files which weren't seen by the current scan from the index, returning how many were removed.
+
+        Only files which are one of the given roots, or within one of them, are removed; files under other paths are
+        left alone.
+        """
+        removed = 0
+
+        for root in roots:
+            prefix = root.rstrip(os.sep) + os.sep
+            paths = [row[0] for row in self.connection.execute("SELECT path FROM files WHERE scan != ? AND "
+                "(path = ? OR substr(path, 1, ?) = ?)", (self.scan_id, root, len(prefix), prefix))]
+
+            for path in paths:
+                self.remove(path)
+
+            removed += len(paths)
+
+        return removed
+
+    def query(self, has=(), missing=(), where=(), format=None):
+        """
+        Yields the path of every indexed file matching all of the given predicates, in order.
+
+        has and missing are GLOB patterns on tag keys, such as PRIV:Google*, which a file must have a tag matching or
+        must have no tag matching. where is a sequence of (key, value) GLOB patterns, which a file must have a tag
+        matching both. format restricts the results to one format.
+        """
+        sql, params = ["SELECT path FROM files AS f WHERE 1"], []
+
+        if format:
+            sql.append("AND format = ?")
+            params.append(format)
+
+        for pattern in has:
+            sql.append("AND EXISTS (SELECT 1 FROM tags AS t WHERE t.path = f.path AND t.key GLOB ?)")
+            params.append(pattern)
+
+        for pattern in missing:
+            sql.append("AND NOT EXISTS (SELECT 1 FROM tags AS t WHERE t.path = f.path AND t.key GLOB ?)")
+            params.append(pattern)
+
+        for key, value in where:
+            sql.append("AND EXISTS (SELECT 1 FROM tags AS t WHERE t.path = f.path AND t.key GLOB ? AND t.value GLOB ?)")
+            params.extend([key, value])
+
+        sql.append("ORDER BY path")
+
+        for row in self.connection.execute(' '.join(sql), params):
+            yield row[0]
+
+    def tags(self, path):
+        """Returns the indexed tags of a file, or None if it isn't indexed."""
+        row = self.connection.execute("SELECT tags FROM files WHERE path = ?", (path,)).fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def _committed(self):
+        self.pending += 1
+
+        if self.pending >= self.commit_interval:
+            self.commit()
+
+    def commit(self):
+        """Commits pending changes to disk."""
+        self.connection.commit()
+        self.pending = 0
+
+    def close(self):
+        """Commits pending changes and closes the index."""
+        self.commit()
+        self.connection.close()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mutagen.id3 import ID3, PRIV, TIT2, TPOS, TXXX, Encoding
+
+from mutagentools.index import TagIndex, find_files, read_tags, tag_rows
+
+import os
+import shutil
+import tempfile
+import unittest
+
+FIXTURES = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+
+
+class TagRowsTestCase(unittest.TestCase):
+
+    def test_tag_rows(self):
+        """Tests that every value becomes a row keyed by frame and owner or description."""
+        rows = sorted(tag_rows({
+            'TPOS': ['1/2'],
+            'TLEN': 1000,
+            'TXXX': {'comment': ['a', 'b']},
+            'PRIV': [{'owner': 'Google/StoreId', 'data': b'c29tZXRoaW5n'}],
+            'COMM': [{'desc': '', 'lang': 'eng', 'text': 'hi'}],
+        }))
+
+        self.assertEqual([
+            ('COMM:', 'hi'),
+            ('PRIV:Google/StoreId', None),
+            ('TLEN', '1000'),
+            ('TPOS', '1/2'),
+            ('TXXX:comment', 'a'),
+            ('TXXX:comment', 'b'),
+        ], rows)
+
+
+class TagIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.library = os.path.join(self.directory, 'library')
+        os.makedirs(os.path.join(self.library, 'album'))
+
+        self.flac = os.path.join(self.library, 'album', 'track.flac')
+        self.mp3 = os.path.join(self.library, 'album', 'track.mp3')
+
+        shutil.copy(os.path.join(FIXTURES, 'flac', 'fixtures', 'fixture.flac'), self.flac)
+        shutil.copy(os.path.join(FIXTURES, 'id3', 'fixtures', 'no-id3.mp3'), self.mp3)
+        open(os.path.join(self.library, 'album', 'cover.jpg'), 'w').close()
+
+        tags = ID3()
+        tags.add(TIT2(encoding=Encoding.UTF8, text="Title"))
+        tags.add(TXXX(encoding=Encoding.UTF8, desc="comment", text="Comment"))
+        tags.add(PRIV(owner="Google/StoreId", data=b"id"))
+        tags.save(self.mp3)
+
+        self.index = TagIndex(os.path.join(self.directory, 'index.db'))
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.directory)
+
+    def add(self, path):
+        stat = os.stat(path)
+        format, tags = read_tags(path)
+        self.index.update(path, format, stat.st_size, stat.st_mtime_ns, tags)
+
+    def test_find_files(self):
+        """Tests that only FLAC and MP3 files are found."""
+        self.assertEqual([self.flac, self.mp3], list(find_files([self.library])))
+
+    def test_query(self):
+        """Tests querying files by tag predicates."""
+        self.add(self.flac)
+        self.add(self.mp3)
+
+        self.assertEqual([self.mp3], list(self.index.query(has=['PRIV:Google*'])))
+        self.assertEqual([self.mp3], list(self.index.query(format='mp3', missing=['TPOS'])))
+        self.assertEqual([self.flac], list(self.index.query(where=[('album', 'Al*')])))
+        self.assertEqual([self.mp3], list(self.index.query(where=[('TXXX:comment', 'Comment')])))
+        self.assertEqual([], list(self.index.query(has=['TIT2'], missing=['TXXX:*'])))
+        self.assertEqual(['Title'], self.index.tags(self.mp3)['TIT2'])
+
+        # updating a file replaces its rows
+        tags = ID3(self.mp3)
+        tags.delall('PRIV')
+        tags.add(TPOS(encoding=Encoding.UTF8, text="1/1"))
+        tags.save()
+        self.add(self.mp3)
+
+        self.assertEqual([], list(self.index.query(has=['PRIV:*'])))
+        self.assertEqual([self.mp3], list(self.index.query(where=[('TPOS', '1/1')])))
+
+    def test_scan(self):
+        """Tests that unchanged files are current and files not seen by a scan are removed."""
+        self.index.begin_scan()
+        self.add(self.flac)
+        self.add(self.mp3)
+
+        stat = os.stat(self.flac)
+        self.assertTrue(self.index.is_current(self.flac, stat.st_size, stat.st_mtime_ns))
+        self.assertFalse(self.index.is_current(self.flac, stat.st_size + 1, stat.st_mtime_ns))
+        self.assertFalse(self.index.is_current(self.flac + '.other', stat.st_size, stat.st_mtime_ns))
+
+        # a file which couldn't be read again is seen, and keeps its tags
+        self.index.begin_scan()
+        self.assertTrue(self.index.is_current(self.flac, stat.st_size, stat.st_mtime_ns))
+        self.index.mark_seen(self.mp3)
+        self.assertEqual(0, self.index.remove_unseen([self.library]))
+
+        # a new scan only sees the FLAC file
+        self.index.begin_scan()
+        self.assertTrue(self.index.is_current(self.flac, stat.st_size, stat.st_mtime_ns))
+
+        self.assertEqual(0, self.index.remove_unseen([os.path.join(self.directory, 'elsewhere')]))
+        self.assertEqual(1, self.index.remove_unseen([self.library]))
+        self.assertEqual([self.flac], list(self.index.query()))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import os
+import time
+
+
+# the outcomes recorded for each file
+DONE = 'done'
+FAILED = 'failed'
+
+
+class Journal(object):
+    """
+    An append-only record of the files a batch command has processed, one line of JSON per file giving its path, its
+    outcome and when it finished, so that a run which dies part way can be resumed.
+
+    Each line is flushed as it is written, so a crash loses at most the files in flight, which are simply processed
+    again. When resuming, files whose latest outcome is done are skipped, while failed files are tried again. A line
+    left incomplete by a crash is ignored.
+
+    Items are recorded by the absolute path key returns for them, which defaults to the item itself.
+    """
+
+    def __init__(self, filename, resume=False, key=None):
+        self.filename = filename
+        self.key = key or (lambda item: item)
+        self.skipped = 0
+        self.done = self._read() if resume else set()
+        self.stream = io.open(filename, 'a', encoding='utf-8')
+
+        # start on a line of our own should the last run have been cut short mid line
+        if self.stream.tell() > 0 and not self._ends_with_newline():
+            self.stream.write("\n")
+
+    def _read(self):
+        """Returns the paths whose latest outcome in the journal is done."""
+        done = set()
+
+        if not os.path.exists(self.filename):
+            return done
+
+        with io.open(self.filename, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+
+                if entry.get('outcome') == DONE:
+                    done.add(entry['path'])
+                else:
+                    done.discard(entry.get('path'))
+
+        return done
+
+    def _ends_with_newline(self):
+        with io.open(self.filename, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+
+            return f.read(1) == b"\n"
+
+    def path(self, item):
+        """Returns the path an item is recorded by."""
+        return os.path.abspath(self.key(item))
+
+    def pending(self, items):
+        """Yields the items not already done, lazily, counting those skipped."""
+        for item in items:
+            if self.path(item) in self.done:
+                self.skipped += 1
+                continue
+
+            yield item
+
+    def record(self, result):
+        """Records the outcome of a BatchResult."""
+        entry = {'path': self.path(result.item), 'outcome': FAILED if result.error else DONE, 'time': time.time()}
+
+        if result.error:
+            entry['error'] = result.error
+
+        self.stream.write(json.dumps(entry, sort_keys=True) + "\n")
+        self.stream.flush()
+
+    def close(self):
+        self.stream.close()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mutagentools.cli.batch import run_batch
+from mutagentools.journal import Journal
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+
+def process(path):
+    """Fails for files named bad, as a corrupt file would."""
+    if os.path.basename(path) == 'bad':
+        raise ValueError("corrupt")
+
+    return path
+
+
+class JournalTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'journal.ndjson')
+        self.paths = [os.path.join(self.directory, name) for name in ('a', 'bad', 'c')]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_journaled(self, paths, resume=False):
+        journal = Journal(self.filename, resume=resume)
+
+        try:
+            return [result.item for result in run_batch(process, paths, journal=journal)], journal.skipped
+        finally:
+            journal.close()
+
+    def test_record(self):
+        """Tests that every processed file is recorded with its outcome, errors included."""
+        self.assertEqual((self.paths, 0), self.run_journaled(self.paths))
+
+        with open(self.filename) as f:
+            entries = [json.loads(line) for line in f]
+
+        self.assertEqual([(path, outcome) for path, outcome in zip(self.paths, ['done', 'failed', 'done'])],
+            [(entry['path'], entry['outcome']) for entry in entries])
+        self.assertEqual("ValueError: corrupt", entries[1]['error'])
+        self.assertTrue(all('time' in entry for entry in entries))
+
+    def test_resume(self):
+        """Tests that resuming skips files done by an earlier run and retries failed ones."""
+        self.run_journaled(self.paths[:2])
+
+        # a line cut short by a crash is ignored
+        with open(self.filename, 'a') as f:
+            f.write('{"path": "')
+
+        self.assertEqual((self.paths[1:], 1), self.run_journaled(self.paths, resume=True))
+        self.assertEqual(([self.paths[1]], 2), self.run_journaled(self.paths, resume=True))
+
+        # without resuming everything is processed again, and the journal appended to
+        self.assertEqual((self.paths, 0), self.run_journaled(self.paths))
+
+        with open(self.filename) as f:
+            self.assertEqual(['{"path": "'], [line.strip() for line in f if not line.strip().endswith('}')])
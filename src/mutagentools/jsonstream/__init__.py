@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from base64 import b64encode
+
+import json
+
+from mutagentools.profiling import phase
+from mutagentools.utils import json_default
+
+
+# bytes of data encoded at a time; a multiple of three, so that chunks are encoded without padding between them
+CHUNK_SIZE = 48 * 1024
+
+
+class Base64Data(object):
+    """
+    Binary data which write_json writes as a base64 string.
+
+    The data is encoded a chunk at a time from a memoryview of it, so neither it nor its encoding is ever copied as a
+    whole.
+    """
+
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __eq__(self, other):
+        return isinstance(other, Base64Data) and self.data == other.data
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'Base64Data(<{} bytes>)'.format(len(self.data))
+
+    def chunks(self, size=CHUNK_SIZE):
+        """Yields the base64 encoding of the data as strings, encoding size bytes, a multiple of three, at a time."""
+        if size <= 0 or size % 3:
+            raise ValueError("chunk size must be a positive multiple of 3: {}".format(size))
+
+        view = memoryview(self.data)
+
+        for offset in range(0, len(view), size):
+            with phase('base64'):
+                chunk = b64encode(view[offset:offset + size]).decode('ascii')
+
+            yield chunk
+
+    def encode(self):
+        """Returns the whole base64 encoding of the data as a string."""
+        return ''.join(self.chunks())
+
+
+def json_stream_default(value):
+    """Encodes values json can't as json_default does, and Base64Data as a whole, for writers which can't stream."""
+    if isinstance(value, Base64Data):
+        return value.encode()
+
+    return json_default(value)
+
+
+def write_json(value, stream, indent=None, sort_keys=False):
+    """
+    Writes a value to a text stream as JSON, exactly as json.dumps would render it given json_stream_default.
+
+    Base64Data values are written a chunk at a time, so that their encoding is never held in memory as a whole.
+    """
+    _write(value, stream.write, ' ' * indent if isinstance(indent, int) else indent, sort_keys, 0)
+
+
+def write_json_array(values, stream, indent=None, sort_keys=False):
+    """
+    Writes an iterable of values to a text stream as a JSON array, as write_json would write a list of them.
+
+    Values are written as they are consumed, so a generator of them is never held in memory as a whole, and the
+    writing of each is timed as the json phase.
+    """
+    indent = ' ' * indent if isinstance(indent, int) else indent
+    _write_items('[', ']', values, stream.write, indent, sort_keys, 0, keyed=False, timed=True)
+
+
+class _Streamed(Exception):
+    """Stops json.dumps at a value which has to be streamed."""
+
+
+def _refuse_streamed(value):
+    if isinstance(value, Base64Data):
+        raise _Streamed()
+
+    return json_default(value)
+
+
+def _write(value, write, indent, sort_keys, level):
+    if isinstance(value, (dict, list, tuple)):
+        # json.dumps is much faster, so let it render anything with nothing to stream in it
+        try:
+            text = json.dumps(value, indent=indent, sort_keys=sort_keys, default=_refuse_streamed)
+        except _Streamed:
+            pass
+        else:
+            write(text.replace('\n', '\n' + indent * level) if indent is not None and level else text)
+            return
+
+    if isinstance(value, Base64Data):
+        write('"')
+
+        for chunk in value.chunks():
+            write(chunk)
+
+        write('"')
+    elif isinstance(value, dict):
+        items = sorted(value.items(), key=lambda item: item[0]) if sort_keys else value.items()
+        _write_items('{', '}', items, write, indent, sort_keys, level, keyed=True)
+    elif isinstance(value, (list, tuple)):
+        _write_items('[', ']', value, write, indent, sort_keys, level, keyed=False)
+    else:
+        write(json.dumps(value, default=json_stream_default))
+
+
+def _write_items(opening, closing, items, write, indent, sort_keys, level, keyed, timed=False):
+    empty = True
+
+    for item in items:
+        if empty:
+            write(opening)
+            empty = False
+        else:
+            write(',' if indent is not None else ', ')
+
+        if indent is not None:
+            write('\n' + indent * (level + 1))
+
+        if keyed:
+            key, item = item
+            write(json.dumps(key if isinstance(key, str) else json.dumps(key).strip('"')) + ': ')
+
+        if timed:
+            with phase('json'):
+                _write(item, write, indent, sort_keys, level + 1)
+        else:
+            _write(item, write, indent, sort_keys, level + 1)
+
+    if empty:
+        write(opening + closing)
+        return
+
+    if indent is not None:
+        write('\n' + indent * level)
+
+    write(closing)
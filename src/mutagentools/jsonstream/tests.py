@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mutagentools.jsonstream import Base64Data, json_stream_default, write_json, write_json_array
+
+from base64 import b64encode
+from io import StringIO
+
+import json
+import os
+import unittest
+
+
+class JSONStreamTestCase(unittest.TestCase):
+
+    def test_chunks(self):
+        """Tests that data encoded a chunk at a time is the same as encoded at once, whatever its length."""
+        for length in (0, 1, 2, 3, 4, 100, 1001):
+            data = os.urandom(length)
+
+            for size in (3, 6, 999):
+                self.assertEqual(b64encode(data).decode('ascii'), ''.join(Base64Data(data).chunks(size)))
+
+        self.assertRaises(ValueError, list, Base64Data(b'data').chunks(4))
+
+    def test_write_json(self):
+        """Tests that values are written exactly as json.dumps renders them."""
+        picture = os.urandom(100 * 1024 + 1)
+        value = {
+            'file': u'tr\xe4ck.flac',
+            'tags': {'album': u'Album', 'artist': [u'One', u'Two'], 'empty': [], 'nothing': {}, 'TRCK': 3,
+                'flag': True, 'none': None, 'ratio': 0.5, 'PRIV': [{'owner': u'Google', 'data': b'aWQ='}]},
+            'pictures': [{'data': Base64Data(picture), 'type': 3}],
+        }
+
+        for indent in (None, 2):
+            for sort_keys in (False, True):
+                stream = StringIO()
+                write_json(value, stream, indent=indent, sort_keys=sort_keys)
+
+                self.assertEqual(json.dumps(value, indent=indent, sort_keys=sort_keys, default=json_stream_default),
+                    stream.getvalue())
+
+        self.assertEqual(b64encode(picture).decode('ascii'), json.loads(stream.getvalue())['pictures'][0]['data'])
+
+    def test_write_json_array(self):
+        """Tests that values are written from a generator as json.dumps renders a list of them."""
+        values = [{'file': u'a', 'data': Base64Data(b'abc')}, {'file': u'b'}]
+
+        for count in (0, 1, 2):
+            stream = StringIO()
+            write_json_array((v for v in values[:count]), stream, indent=2, sort_keys=True)
+
+            self.assertEqual(json.dumps(values[:count], indent=2, sort_keys=True, default=json_stream_default),
+                stream.getvalue())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mutagentools.profiling import phase
+
+
+class PaddingPolicy(object):
+    """
+    A mutagen padding function which keeps tags in place whenever the existing padding allows it.
+
+    If the padding left after saving is between minimum and maximum, it is kept as is, so that the tag is overwritten
+    in place. Otherwise the tag is resized to have target bytes of padding, or mutagen's default amount if no target
+    is given, which requires rewriting the whole file.
+    """
+
+    def __init__(self, target=None, minimum=0, maximum=None):
+        self.target = target
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def __call__(self, info):
+        if info.padding >= self.minimum and (self.maximum is None or info.padding <= self.maximum):
+            return info.padding
+
+        return self.target if self.target is not None else info.get_default_padding()
+
+    def __repr__(self):
+        return "PaddingPolicy(target={!r}, minimum={!r}, maximum={!r})".format(self.target, self.minimum,
+            self.maximum)
+
+
+class PaddingRecorder(object):
+    """Wraps a padding function, recording whether the save it was used for could be done in place."""
+
+    def __init__(self, padding=None):
+        self.padding = padding
+        self.in_place = None
+
+    def __call__(self, info):
+        result = max(0, self.padding(info) if self.padding else info.get_default_padding())
+        self.in_place = result == info.padding
+
+        return result
+
+
+def save_with_padding(tags, padding, *args, **kwargs):
+    """
+    Saves tags using the given padding function, or mutagen's default padding if None.
+
+    Returns True if the tags were overwritten in place, False if the file had to be rewritten, or None if the tags
+    didn't consult the padding function at all.
+    """
+    recorder = PaddingRecorder(padding)
+
+    with phase('save'):
+        tags.save(*args, padding=recorder, **kwargs)
+
+    return recorder.in_place
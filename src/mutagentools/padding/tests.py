@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mutagen._tags import PaddingInfo
+from mutagen.id3 import ID3, Encoding, TIT2, TXXX
+
+from mutagentools.padding import PaddingPolicy, save_with_padding
+
+import os
+import shutil
+import tempfile
+import unittest
+
+NO_ID3 = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'id3', 'fixtures', 'no-id3.mp3')
+
+
+class PaddingPolicyTestCase(unittest.TestCase):
+
+    def test_padding_policy(self):
+        """Tests that existing padding is kept when it is within bounds."""
+        policy = PaddingPolicy(target=1024)
+
+        self.assertEqual(100, policy(PaddingInfo(100, 10000)))
+        self.assertEqual(0, policy(PaddingInfo(0, 10000)))
+        self.assertEqual(1024, policy(PaddingInfo(-10, 10000)))
+
+        policy = PaddingPolicy(target=1024, minimum=512, maximum=4096)
+
+        self.assertEqual(1024, policy(PaddingInfo(100, 10000)))
+        self.assertEqual(2048, policy(PaddingInfo(2048, 10000)))
+        self.assertEqual(1024, policy(PaddingInfo(8192, 10000)))
+
+        # with no target, mutagen's default is used
+        self.assertEqual(PaddingInfo(-10, 10000).get_default_padding(), PaddingPolicy()(PaddingInfo(-10, 10000)))
+
+    def test_save_with_padding(self):
+        """Tests that saves report whether they were made in place."""
+        directory = tempfile.mkdtemp()
+        filename = os.path.join(directory, 'file.mp3')
+        shutil.copy(NO_ID3, filename)
+
+        try:
+            tags = ID3()
+            tags.add(TIT2(encoding=Encoding.UTF8, text="Title"))
+
+            # the file has no tag yet, so it must be rewritten
+            self.assertFalse(save_with_padding(tags, PaddingPolicy(target=1024), filename))
+            size = os.path.getsize(filename)
+
+            # a small change fits within the padding
+            tags = ID3(filename)
+            tags.add(TXXX(encoding=Encoding.UTF8, desc="key", text="value"))
+            self.assertTrue(save_with_padding(tags, PaddingPolicy(target=1024), filename))
+            self.assertEqual(size, os.path.getsize(filename))
+
+            # a large one doesn't
+            tags.add(TXXX(encoding=Encoding.UTF8, desc="large", text="x" * 4096))
+            self.assertFalse(save_with_padding(tags, PaddingPolicy(target=1024), filename))
+            self.assertLess(size, os.path.getsize(filename))
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+
+# how much of a stream of paths is read at a time
+CHUNK_SIZE = 64 * 1024
+
+
+def report_unreadable(directory, error):
+    """Reports a directory which can't be read to stderr."""
+    sys.stderr.write("Failed to read directory {}: {}: {}\n".format(directory, type(error).__name__, error))
+
+
+def walk_files(directory, extensions=None, onerror=report_unreadable):
+    """
+    Yields the path of every file under a directory whose extension, ignoring case, is one of extensions, or every
+    file if extensions is None.
+
+    Directories are read with os.scandir one at a time, so that only the entries of one directory are held in memory
+    at once, and file types come from the directory entries rather than a stat call per file. Each directory's files
+    are yielded in name order before its subdirectories are walked, also in name order, as os.walk would with sorted
+    names. Symbolic links to directories aren't followed.
+
+    A directory which can't be read, say as it isn't readable or was removed during the walk, is passed to onerror with
+    the OSError raised, reporting it to stderr by default, and skipped, as os.walk skips it.
+    """
+    extensions = None if extensions is None else frozenset(extension.lower() for extension in extensions)
+    stack = [directory]
+
+    while stack:
+        subdirectories = []
+        current = stack.pop()
+
+        try:
+            with os.scandir(current) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except OSError as e:
+            onerror(current, e)
+            continue
+
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirectories.append(entry.path)
+            elif extensions is None or os.path.splitext(entry.name)[1].lower() in extensions:
+                yield entry.path
+
+        # walked last in, first out, so push them in reverse to walk them in order
+        stack.extend(reversed(subdirectories))
+
+
+def read_paths(stream, chunk_size=CHUNK_SIZE):
+    """
+    Yields the NUL-delimited paths read from a binary stream, such as the output of find -print0, as they are read.
+
+    Only a chunk of the stream and a partial path are held at once. Paths are decoded as the file system encodes them
+    and empty paths are skipped.
+    """
+    remainder = b''
+
+    while True:
+        chunk = stream.read(chunk_size)
+
+        if not chunk:
+            break
+
+        paths = (remainder + chunk).split(b'\0')
+        remainder = paths.pop()
+
+        for path in paths:
+            if path:
+                yield os.fsdecode(path)
+
+    if remainder:
+        yield os.fsdecode(remainder)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mutagentools.paths import read_paths, walk_files
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+
+class PathsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+        for relative in ('b/c/03.flac', 'b/04.FLAC', 'a/02.flac', 'a/01.flac', 'a/cover.jpg', '00.flac'):
+            os.makedirs(os.path.dirname(os.path.join(self.directory, relative)), exist_ok=True)
+            open(os.path.join(self.directory, relative), 'w').close()
+
+        # links to directories aren't followed
+        os.symlink(os.path.join(self.directory, 'a'), os.path.join(self.directory, 'link'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_walk_files(self):
+        """Tests that files are found in the same order as a sorted os.walk, filtered by extension."""
+        self.assertEqual(['00.flac', 'a/01.flac', 'a/02.flac', 'b/04.FLAC', 'b/c/03.flac'],
+            [os.path.relpath(path, self.directory) for path in walk_files(self.directory, ['.flac'])])
+        self.assertEqual(['00.flac', 'link', 'a/01.flac', 'a/02.flac', 'a/cover.jpg', 'b/04.FLAC', 'b/c/03.flac'],
+            [os.path.relpath(path, self.directory) for path in walk_files(self.directory)])
+
+    def test_walk_files_unreadable(self):
+        """Tests that directories which can't be read are reported and skipped, and the rest still walked."""
+        real_scandir = os.scandir
+        unreadable = os.path.join(self.directory, 'b')
+
+        def scandir(path):
+            if path == unreadable:
+                raise PermissionError(13, "Permission denied", path)
+
+            return real_scandir(path)
+
+        with patch('os.scandir', side_effect=scandir), patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            self.assertEqual(['00.flac', 'a/01.flac', 'a/02.flac'],
+                [os.path.relpath(path, self.directory) for path in walk_files(self.directory, ['.flac'])])
+
+        self.assertIn("Failed to read directory {}: PermissionError".format(unreadable), stderr.getvalue())
+
+        errors = []
+
+        with patch('os.scandir', side_effect=scandir):
+            list(walk_files(self.directory, onerror=lambda directory, error: errors.append(directory)))
+
+        self.assertEqual([unreadable], errors)
+
+    def test_read_paths(self):
+        """Tests that NUL-delimited paths are read whichever chunks they are split across."""
+        data = u'a.mp3\0dir/b é.mp3\0\0c.mp3'.encode('utf-8')
+
+        for chunk_size in (1, 3, 1024):
+            self.assertEqual(['a.mp3', u'dir/b é.mp3', 'c.mp3'], list(read_paths(io.BytesIO(data), chunk_size)))
+
+        self.assertEqual(['a.mp3'], list(read_paths(io.BytesIO(b'a.mp3\0'))))
+        self.assertEqual([], list(read_paths(io.BytesIO(b''))))
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import os
+import tempfile
+
+
+MIME_EXTENSIONS = {
+    'image/bmp': '.bmp',
+    'image/gif': '.gif',
+    'image/jpeg': '.jpg',
+    'image/jpg': '.jpg',
+    'image/png': '.png',
+    'image/tiff': '.tif',
+    'image/webp': '.webp',
+}
+
+DEFAULT_EXTENSION = '.bin'
+
+
+def picture_hash(data):
+    """Returns the hex SHA-256 digest of the given picture data."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def picture_path(directory, digest, mime):
+    """Returns the content-addressed path of a picture with the given digest and mime type."""
+    return os.path.join(directory, digest + MIME_EXTENSIONS.get((mime or '').lower(), DEFAULT_EXTENSION))
+
+
+def store_picture(directory, data, mime):
+    """Writes picture data into a content-addressed directory unless already present, returning its digest."""
+    digest = picture_hash(data)
+    path = picture_path(directory, digest, mime)
+
+    if not os.path.exists(path):
+        # write to a temporary file and rename it into place so that concurrent writers never expose partial files
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+
+            os.rename(temp_path, path)
+        except Exception:
+            os.unlink(temp_path)
+            raise
+
+    return digest
+
+
+def picture_reference(directory, data, mime):
+    """Stores a picture in a content-addressed directory and returns its JSON-compatible reference."""
+    return {
+        'hash': store_picture(directory, data, mime),
+        'size': len(data),
+    }
+
+
+def parse_picture_type(value):
+    """Parses a picture type given either as its number or as its name, e.g. '3' or 'COVER_FRONT'."""
+    from mutagen.id3 import PictureType
+
+    if isinstance(value, int) or str(value).isdigit():
+        return PictureType(int(value))
+
+    try:
+        return getattr(PictureType, str(value).upper().replace('-', '_'))
+    except AttributeError:
+        raise ValueError("Unknown picture type: {}".format(value))
+
+
+class PicturePolicy(object):
+    """Decides which of a file's pictures are kept when converting tags."""
+
+    def __init__(self, dedupe=False, types=None, max_size=None):
+        """
+        Creates a picture policy.
+
+        If dedupe is set, only the first of several byte-identical pictures is kept. If types is given, only pictures
+        of those types are kept. If max_size is given, pictures larger than that many bytes are dropped.
+        """
+        self.dedupe = dedupe
+        self.types = set(int(t) for t in types) if types else None
+        self.max_size = max_size
+
+    def __repr__(self):
+        return "PicturePolicy(dedupe={!r}, types={!r}, max_size={!r})".format(self.dedupe,
+            sorted(self.types) if self.types is not None else None, self.max_size)
+
+    def apply(self, pictures):
+        """Returns the list of pictures which should be kept, in their original order."""
+        result, seen = [], set()
+
+        for picture in pictures:
+            if self.types is not None and int(picture.type) not in self.types:
+                continue
+
+            if self.max_size is not None and len(picture.data) > self.max_size:
+                continue
+
+            if self.dedupe:
+                digest = picture_hash(picture.data)
+
+                if digest in seen:
+                    continue
+
+                seen.add(digest)
+
+            result.append(picture)
+
+        return result
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mutagen.flac import Picture
+from mutagen.id3 import PictureType
+
+from mutagentools.pictures import (
+    PicturePolicy,
+    parse_picture_type,
+    picture_hash,
+    picture_path,
+    picture_reference,
+    store_picture,
+)
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class MainTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_picture_path(self):
+        """Tests that picture paths are named by digest with an extension derived from the mime type."""
+        self.assertEqual(os.path.join('dir', 'abc.jpg'), picture_path('dir', 'abc', 'image/jpeg'))
+        self.assertEqual(os.path.join('dir', 'abc.png'), picture_path('dir', 'abc', 'IMAGE/PNG'))
+        self.assertEqual(os.path.join('dir', 'abc.bin'), picture_path('dir', 'abc', 'application/x-unknown'))
+        self.assertEqual(os.path.join('dir', 'abc.bin'), picture_path('dir', 'abc', None))
+
+    def test_store_picture(self):
+        """Tests that identical pictures are only written once."""
+        data = b'\x89PNG' + bytes([0x00] * 32)
+        digest = hashlib.sha256(data).hexdigest()
+
+        self.assertEqual(digest, picture_hash(data))
+        self.assertEqual(digest, store_picture(self.directory, data, 'image/png'))
+        self.assertEqual(digest, store_picture(self.directory, data, 'image/png'))
+
+        # only the one picture should exist, with no temporary files left behind
+        self.assertEqual([digest + '.png'], os.listdir(self.directory))
+
+        with open(os.path.join(self.directory, digest + '.png'), 'rb') as f:
+            self.assertEqual(data, f.read())
+
+    def test_picture_reference(self):
+        """Tests that references carry the hash and size of the picture."""
+        data = bytes([0x01] * 16)
+
+        self.assertEqual({'hash': picture_hash(data), 'size': 16},
+            picture_reference(self.directory, data, 'image/jpeg'))
+
+
+class PicturePolicyTestCase(unittest.TestCase):
+
+    def create_picture(self, type, data):
+        picture = Picture()
+        picture.type = type
+        picture.mime = 'image/jpeg'
+        picture.data = data
+        return picture
+
+    def test_parse_picture_type(self):
+        """Tests that picture types can be given by number or by name."""
+        self.assertEqual(PictureType.COVER_FRONT, parse_picture_type('3'))
+        self.assertEqual(PictureType.COVER_FRONT, parse_picture_type(3))
+        self.assertEqual(PictureType.COVER_FRONT, parse_picture_type('cover_front'))
+        self.assertEqual(PictureType.COVER_BACK, parse_picture_type('COVER-BACK'))
+        self.assertRaises(ValueError, parse_picture_type, 'NOT_A_TYPE')
+
+    def test_apply(self):
+        """Tests deduplication, type selection and size capping."""
+        front = self.create_picture(3, b'front')
+        duplicate = self.create_picture(0, b'front')
+        back = self.create_picture(4, b'back')
+        large = self.create_picture(3, b'0123456789')
+
+        pictures = [front, duplicate, back, large]
+
+        self.assertEqual(pictures, PicturePolicy().apply(pictures))
+        self.assertEqual([front, back, large], PicturePolicy(dedupe=True).apply(pictures))
+        self.assertEqual([front, large], PicturePolicy(types=[PictureType.COVER_FRONT]).apply(pictures))
+        self.assertEqual([front, duplicate, back], PicturePolicy(max_size=5).apply(pictures))
+        self.assertEqual([front], PicturePolicy(dedupe=True, types=[3, 0], max_size=5).apply(pictures))
@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+
+import heapq
+import itertools
+import json
+import math
+import os
+import threading
+import time
+
+
+# histogram buckets are a quarter of a power of two wide, starting from a microsecond
+BUCKET_BASE = 1e-6
+BUCKETS_PER_DOUBLING = 4
+
+PHASES = ('open', 'parse', 'convert', 'to_json', 'base64', 'json', 'save')
+
+_local = threading.local()
+
+
+class Histogram(object):
+    """
+    A histogram of durations in logarithmic buckets, which takes the same memory however many values it records.
+
+    Percentiles are given as the upper bound of the bucket they fall in, so are accurate to within about a fifth.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        bucket = max(0, int(math.floor(math.log(max(seconds, BUCKET_BASE) / BUCKET_BASE, 2) * BUCKETS_PER_DOUBLING)))
+
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        """Returns the duration below which the given fraction of values fall."""
+        if not self.count:
+            return 0.0
+
+        rank, seen = fraction * self.count, 0
+
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+
+            if seen >= rank:
+                return min(self.max, BUCKET_BASE * 2 ** ((bucket + 1) / float(BUCKETS_PER_DOUBLING)))
+
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'max': self.max,
+        }
+
+
+class _Phase(object):
+    """Times a block of code, recording its duration in a profiler under a phase name."""
+
+    __slots__ = ('profiler', 'name', 'started')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, time.perf_counter() - self.started)
+
+
+class _NoPhase(object):
+    """Stands in for a phase when nothing is being profiled."""
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+def phase(name):
+    """
+    Returns a context manager timing a phase of processing a file for the profiler active in the current thread.
+
+    When no profiler is active, which is the usual case, this does nothing. Phases may be nested, in which case the
+    time of the inner phase is counted in both.
+    """
+    profiler = getattr(_local, 'profiler', None)
+
+    return _Phase(profiler, name) if profiler is not None else _NO_PHASE
+
+
+def activate(profiler):
+    """Makes a profiler, or None, the one phase records into in the current thread."""
+    _local.profiler = profiler
+
+
+class FileTimings(object):
+    """Records the phase durations of a single file, to be sent back to the Profiler from a worker."""
+
+    def __init__(self):
+        self.timings = []
+
+    def record(self, name, seconds):
+        self.timings.append((name, seconds))
+
+
+ProfiledResult = namedtuple('ProfiledResult', ['value', 'timings', 'elapsed', 'stats', 'memory'])
+ProfiledResult.__doc__ = """
+The return value of a profiled call along with its phase timings, its total time and, if asked for, its cProfile
+statistics and a tracemalloc snapshot of its allocations.
+"""
+
+
+class Profiled(object):
+    """
+    Wraps a function of one file so that calls to it are profiled in whatever thread or process they run in.
+
+    Instances are picklable as long as the function is, so can be used with process pools.
+    """
+
+    def __init__(self, func, cprofile=False, memory=False):
+        self.func = func
+        self.cprofile = cprofile
+        self.memory = memory
+
+    def __call__(self, item):
+        # cProfile and tracemalloc are only imported when asked for, so that profiling costs nothing at startup
+        if self.cprofile:
+            import cProfile
+
+        if self.memory:
+            import tracemalloc
+
+        timings, previous = FileTimings(), getattr(_local, 'profiler', None)
+        profile = cProfile.Profile() if self.cprofile else None
+        snapshot = None
+
+        if self.memory:
+            tracemalloc.start()
+
+        _local.profiler = timings
+        started = time.perf_counter()
+
+        try:
+            if profile:
+                profile.enable()
+
+            value = self.func(item)
+        finally:
+            if profile:
+                profile.disable()
+
+            elapsed = time.perf_counter() - started
+            _local.profiler = previous
+
+            if self.memory:
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+
+        stats = None
+
+        if profile:
+            profile.create_stats()
+            stats = profile.stats
+
+        return ProfiledResult(value, timings.timings, elapsed, stats, snapshot)
+
+
+class Profiler(object):
+    """
+    Aggregates per-phase timing histograms across all the files processed by a command.
+
+    The slowest files are kept, along with their cProfile statistics and tracemalloc snapshots when cprofile or
+    memory are set, so that they can be dumped for closer inspection.
+    """
+
+    def __init__(self, slowest=5, cprofile=False, memory=False):
+        self.histograms = {}
+        self.slowest = slowest
+        self.cprofile = cprofile
+        self.memory = memory
+        self.files = Histogram()
+        self._slowest = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+
+            histogram.add(seconds)
+
+    def phase(self, name):
+        """Returns a context manager timing a phase in the current thread directly into this profiler."""
+        return _Phase(self, name)
+
+    def wrap(self, func):
+        """Wraps a function of one file so that calling it returns a ProfiledResult to pass to add."""
+        return Profiled(func, cprofile=self.cprofile, memory=self.memory)
+
+    def add(self, item, result):
+        """Records the ProfiledResult of processing an item and returns its value."""
+        for name, seconds in result.timings:
+            self.record(name, seconds)
+
+        with self._lock:
+            self.files.add(result.elapsed)
+
+            if self.slowest > 0:
+                entry = (result.elapsed, next(self._counter), str(item), result.stats, result.memory)
+
+                if len(self._slowest) < self.slowest:
+                    heapq.heappush(self._slowest, entry)
+                elif entry[0] > self._slowest[0][0]:
+                    heapq.heapreplace(self._slowest, entry)
+
+        return result.value
+
+    def call(self, func, item):
+        """Calls a function of one file, profiling it, and returns its value."""
+        return self.add(item, self.wrap(func)(item))
+
+    def slowest_files(self):
+        """Returns (elapsed, item, stats, memory) for the slowest files, slowest first."""
+        return [(elapsed, item, stats, memory) for elapsed, _, item, stats, memory in sorted(self._slowest,
+            reverse=True)]
+
+    def summary(self):
+        """Returns the histograms of every phase, of whole files and the slowest files as a JSON-compatible dict."""
+        phases = sorted(self.histograms, key=lambda n: (PHASES.index(n) if n in PHASES else len(PHASES), n))
+
+        return {
+            'phases': [dict(self.histograms[name].summary(), phase=name) for name in phases],
+            'files': self.files.summary(),
+            'slowest': [{'file': item, 'elapsed': elapsed} for elapsed, item, _, _ in self.slowest_files()],
+        }
+
+    def write_text(self, stream):
+        """Writes the summary as a table."""
+        stream.write("{:<10} {:>8} {:>12} {:>12} {:>12} {:>12}\n".format('phase', 'count', 'total (s)', 'p50 (ms)',
+            'p95 (ms)', 'max (ms)'))
+
+        for name, histogram in [(s['phase'], s) for s in self.summary()['phases']] + [('file', self.files.summary())]:
+            stream.write("{:<10} {:>8} {:>12.3f} {:>12.3f} {:>12.3f} {:>12.3f}\n".format(name, histogram['count'],
+                histogram['total'], histogram['p50'] * 1000, histogram['p95'] * 1000, histogram['max'] * 1000))
+
+        for elapsed, item, _, _ in self.slowest_files():
+            stream.write("{:>10.3f} ms  {}\n".format(elapsed * 1000, item))
+
+    def write_json(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(self.summary(), f, indent=2, sort_keys=True)
+
+    def dump(self, directory):
+        """
+        Writes the cProfile statistics and tracemalloc snapshots kept for the slowest files into a directory.
+
+        Statistics are written as NNN.pstats, loadable with pstats.Stats, and snapshots as NNN.tracemalloc, loadable
+        with tracemalloc.Snapshot.load, numbered from the slowest file. Returns the names of the files written.
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        import marshal
+
+        written = []
+
+        for rank, (elapsed, item, stats, memory) in enumerate(self.slowest_files(), 1):
+            if stats is not None:
+                written.append(os.path.join(directory, '{:03d}.pstats'.format(rank)))
+
+                with open(written[-1], 'wb') as f:
+                    marshal.dump(stats, f)
+
+            if memory is not None:
+                written.append(os.path.join(directory, '{:03d}.tracemalloc'.format(rank)))
+                memory.dump(written[-1])
+
+        with open(os.path.join(directory, 'index.json'), 'w') as f:
+            json.dump([{'rank': rank, 'file': item, 'elapsed': elapsed} for rank, (elapsed, item, _, _) in
+                enumerate(self.slowest_files(), 1)], f, indent=2)
+
+        return written
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mutagentools.profiling import Histogram, Profiler, activate, phase
+
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+
+def busy(n):
+    with phase('convert'):
+        with phase('base64'):
+            sum(range(n * 1000))
+
+    return n
+
+
+class HistogramTestCase(unittest.TestCase):
+
+    def test_histogram(self):
+        """Tests that percentiles are within a bucket of the exact values."""
+        histogram = Histogram()
+
+        for i in range(1, 101):
+            histogram.add(i / 1000.0)
+
+        summary = histogram.summary()
+
+        self.assertEqual(100, summary['count'])
+        self.assertAlmostEqual(5.05, summary['total'])
+        self.assertEqual(0.1, summary['max'])
+        self.assertTrue(0.05 <= summary['p50'] <= 0.05 * 1.2)
+        self.assertTrue(0.095 <= summary['p95'] <= 0.1)
+
+    def test_histogram_empty(self):
+        """Tests that an empty histogram summarises to zeroes."""
+        self.assertEqual({'count': 0, 'total': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}, Histogram().summary())
+
+
+class ProfilerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        activate(None)
+        shutil.rmtree(self.directory)
+
+    def test_phase_inactive(self):
+        """Tests that phases do nothing without an active profiler."""
+        activate(None)
+
+        with phase('parse'):
+            pass
+
+    def test_profiler(self):
+        """Tests that nested phases and whole files are recorded, keeping the slowest files."""
+        profiler = Profiler(slowest=2)
+
+        for n in (1, 50, 5):
+            self.assertEqual(n, profiler.call(busy, n))
+
+        activate(profiler)
+
+        with phase('json'):
+            pass
+
+        summary = profiler.summary()
+
+        self.assertEqual(['convert', 'base64', 'json'], [p['phase'] for p in summary['phases']])
+        self.assertEqual([3, 3, 1], [p['count'] for p in summary['phases']])
+        self.assertEqual(3, summary['files']['count'])
+        self.assertEqual(['50', '5'], [f['file'] for f in summary['slowest']])
+
+        profiler.write_json(os.path.join(self.directory, 'profile.json'))
+
+        with open(os.path.join(self.directory, 'profile.json')) as f:
+            self.assertEqual(3, json.load(f)['files']['count'])
+
+    def test_dump(self):
+        """Tests that cProfile statistics and tracemalloc snapshots of the slowest files are dumped."""
+        profiler = Profiler(slowest=1, cprofile=True, memory=True)
+
+        for n in (1, 50):
+            profiler.call(busy, n)
+
+        written = profiler.dump(os.path.join(self.directory, 'dump'))
+
+        self.assertEqual(['001.pstats', '001.tracemalloc'], [os.path.basename(f) for f in written])
+        self.assertTrue(any(name == 'busy' for _, _, name in pstats.Stats(written[0]).stats))
@@ -31,6 +31,14 @@ def fold_text_keys(dct):
             dct[key] = value[0]
 
 
+def json_default(value):
+    """Encodes values json can't, namely the base64 bytes to_json_dict gives for binary fields, as strings."""
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+
+    raise TypeError("Object of type {} is not JSON serializable".format(type(value).__name__))
+
+
 def pop_keys(dct, *key_names):
     """Pops and returns all found keys in the dictionary."""
     return list(
@@ -6,10 +6,11 @@ from mutagentools.utils import (
     first,
     first_of_list,
     fold_text_keys,
+    json_default,
     pop_keys,
 )
 
-
+import json
 import mock
 import unittest
 
@@ -57,6 +58,11 @@ class MainTestCase(unittest.TestCase):
         # key d should not have been flattened
         self.assertEqual([{ 'a': 'b' }], fixture.get('d'))
 
+    def test_json_default(self):
+        """Tests that json_default encodes base64 bytes as strings and rejects anything else."""
+        self.assertEqual('{"data": "c29tZXRoaW5n"}', json.dumps({'data': b'c29tZXRoaW5n'}, default=json_default))
+        self.assertRaises(TypeError, json.dumps, {'data': object()}, default=json_default)
+
     def test_pop_keys(self):
         """Tests that pop_extant pops extant keys."""
         fixture = {